@@ -1,3 +1,55 @@
-from .mips_instruction import *
-from .op_formatting import *
-from .data_segment import *
+from importlib import import_module
+from typing import Any, Dict, List
+
+# Public names -> the module that defines them. Modules are only imported when one of their names is first used,
+# so e.g. `python -m mdma decode` doesn't pay for numpy, asyncio, or multiprocessing.
+_exports: Dict[str, str] = {
+    **dict.fromkeys(['MIPSInstruction', 'decode_word', 'encode_word', 'enable_cache', 'disable_cache', 'cache_info'],
+                    'mips_instruction'),
+    **dict.fromkeys(['OpFormat', 'Registers', 'codes', 'r_format', 'i_format', 'j_format', 's_format', 'op_formats',
+                     'R_FORMAT', 'I_FORMAT', 'J_FORMAT', 'S_FORMAT', 'format_code', 'shift_func_codes', 'op_names',
+                     'func_names', 'register_names', 'register_numbers', 'fp_register_names',
+                     'fp_register_numbers'], 'op_formatting'),
+    'DataSegment': 'data_segment',
+    **dict.fromkeys(['DecodedArray', 'UNKNOWN_FORMAT', 'decode_array', 'encode_many', 'encode_into'], 'batch'),
+    **dict.fromkeys(['DEFAULT_CHUNK_SIZE', 'format_line', 'format_lines', 'words_from_bytes', 'iter_binary_chunks',
+                     'iter_hex_chunks', 'elf_sections', 'elf_text_section', 'detect_format', 'locate_machine_code',
+                     'iter_word_chunks', 'disassemble_stream'], 'disassembler'),
+    **dict.fromkeys(['decode_parallel', 'disassemble_file_parallel', 'collect_stats_parallel'], 'parallel'),
+    **dict.fromkeys(['DEFAULT_TEXT_ADDRESS', 'DEFAULT_DATA_ADDRESS', 'branch_operations', 'AssemblyError',
+                     'AssembledProgram', 'assemble', 'assemble_file'], 'assembler'),
+    'CompactInstruction': 'compact_instruction',
+    **dict.fromkeys(['DEFAULT_SAMPLES', 'DEFAULT_BATCH_SIZE', 'DEFAULT_MAX_MISMATCHES', 'Mismatch', 'VerifyReport',
+                     'space_size', 'operation_words', 'verify_words', 'verify_round_trip'], 'verify'),
+    **dict.fromkeys(['DEFAULT_HOST', 'DEFAULT_PORT', 'LINE_LIMIT', 'LATENCY_WINDOW', 'LatencyStats', 'MDMAServer',
+                     'serve', 'MDMAClient'], 'server'),
+    **dict.fromkeys(['control_flow', 'BasicBlock', 'Edge', 'ControlFlowGraph'], 'cfg'),
+    **dict.fromkeys(['SessionUpdate', 'DisassemblySession'], 'session'),
+    'MappedImage': 'image',
+    **dict.fromkeys(['EXPORT_FORMATS', 'FIELD_NAMES', 'COLUMNS', 'iter_row_batches', 'write_csv', 'arrow_schema',
+                     'write_arrow', 'export_stream'], 'export'),
+    **dict.fromkeys(['InstructionStats', 'collect_stats'], 'stats'),
+    **dict.fromkeys(['PROFILE_ENV_VAR', 'STAGES', 'Profiler', 'StageTimer', 'format_name', 'enable_profiling',
+                     'disable_profiling', 'profile_snapshot'], 'profiling'),
+    **dict.fromkeys(['Symbol', 'SymbolTable', 'load_elf_symbols', 'load_symbol_map', 'load_symbols'], 'symbols'),
+    **dict.fromkeys(['Instruction', 'Pseudo', 'DispatchTable', 'instructions', 'pseudo_instructions', 'opcode_table',
+                     'define_instructions', 'lookup_instruction', 'instruction_mnemonic', 'selector_key',
+                     'decode_instruction', 'encode_instruction', 'expand_pseudo', 'jump_target'], 'isa'),
+    **dict.fromkeys(['OUTPUT_FORMATS', 'DEFAULT_READ_SIZE', 'LineResult', 'process_lines', 'format_results',
+                     'process_stream'], 'pipe'),
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the module defining a public name the first time the name is used"""
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{_exports[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
@@ -1,9 +1,13 @@
+import sys
+import time
 from typing import Optional
 
 from .mips_instruction import MIPSInstruction
-from prettytable import PrettyTable  # type: ignore
 from argparse import ArgumentParser
 
+# The other modules (and optional dependencies like prettytable) are imported by the functions that need them, so a
+# one-shot encode/decode only pays for what it uses
+
 
 def decode(hex_str: str, verbose: bool=False) -> None:
     """Decodes the hex string and prints the machine code, binary, and decoded instruction string
@@ -16,6 +20,7 @@ def decode(hex_str: str, verbose: bool=False) -> None:
     mc = MIPSInstruction(hex_str=hex_str)
     print("Binary:", mc.bin_str)
     if verbose:
+        from prettytable import PrettyTable  # type: ignore
         t = PrettyTable(['SECTION', 'DECIMAL', 'BINARY', 'DECODED'])
         for d in mc.data_segments:
             t.add_row([d.name, d.decimal, d.bin_str, d.human_readable])
@@ -34,6 +39,7 @@ def encode(instr_str: str, verbose: bool=False) -> None:
     print('Instruction String:', instr_str)
     mc = MIPSInstruction(instruction_str=instr_str)
     if verbose:
+        from prettytable import PrettyTable  # type: ignore
         t = PrettyTable(['SECTION', 'DECIMAL', 'BINARY', 'ENCODED'])
         for d in mc.data_segments:
             t.add_row([d.name, d.decimal, d.bin_str, d.human_readable])
@@ -43,6 +49,166 @@ def encode(instr_str: str, verbose: bool=False) -> None:
     print('=======\n')
 
 
+def disassemble(path: Optional[str], input_format: str = 'auto', byteorder: Optional[str] = None,
+                base_address: Optional[int] = None, jobs: int = 1, symbols_path: Optional[str] = None) -> None:
+    """Disassembles a raw binary, hex dump, or ELF file and prints the address, word, and instruction string of each
+    word. Output is flushed after every chunk so it can be piped into other tools.
+
+    :param path: path of the file to be disassembled, or None/'-' to read from stdin
+    :param input_format: one of 'auto', 'binary', 'hex', or 'elf'
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :param base_address: the address of the first word
+    :param jobs: the number of processes to disassemble with. More than one requires a (binary or ELF) file path
+    :param symbols_path: path of an ELF file or nm-style map to show branch and jump destinations as symbols with
+    """
+    from .disassembler import disassemble_stream, DEFAULT_CHUNK_SIZE
+    from .parallel import disassemble_file_parallel
+
+    symbols = None
+    if symbols_path is not None:
+        from .symbols import load_symbols
+        symbols = load_symbols(symbols_path)
+    stream = sys.stdin.buffer if path in [None, '-'] else open(path, 'rb')
+    try:
+        if jobs > 1:
+            chunks = disassemble_file_parallel(path, input_format, byteorder, base_address, jobs,  # type: ignore
+                                               symbols)
+        else:
+            chunks = disassemble_stream(stream, input_format, byteorder, base_address,  # type: ignore
+                                        DEFAULT_CHUNK_SIZE, symbols)
+        for lines in chunks:
+            sys.stdout.write('\n'.join(lines) + '\n')
+            sys.stdout.flush()
+    except BrokenPipeError:  # e.g. piped into head
+        sys.stderr.close()
+    finally:
+        stream.close()
+
+
+def export(path: Optional[str], output_path: Optional[str] = None, file_format: Optional[str] = None,
+           input_format: str = 'auto', byteorder: Optional[str] = None, base_address: Optional[int] = None) -> None:
+    """Decodes a raw binary, hex dump, or ELF file and writes the address, word, format, fields, and mnemonic of each
+    word as CSV, Arrow, or Parquet
+
+    :param path: path of the file to be decoded, or None/'-' to read from stdin
+    :param output_path: path of the file to write, or None/'-' to write CSV to stdout
+    :param file_format: one of 'csv', 'arrow', or 'parquet'. Defaults to the output file's extension, or CSV
+    :param input_format: one of 'auto', 'binary', 'hex', or 'elf'
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :param base_address: the address of the first word
+    """
+    from .export import export_stream, EXPORT_FORMATS
+
+    to_stdout = output_path in [None, '-']
+    if file_format is None:
+        extension = '' if to_stdout else output_path.rsplit('.', 1)[-1].lower()  # type: ignore
+        file_format = extension if extension in EXPORT_FORMATS else 'csv'
+    if to_stdout and file_format != 'csv':
+        sys.exit(f'ERROR: {file_format} can only be written to a file (use -o)')
+
+    stream = sys.stdin.buffer if path in [None, '-'] else open(path, 'rb')
+    try:
+        if file_format == 'csv':
+            output = sys.stdout if to_stdout else open(output_path, 'w', newline='')  # type: ignore
+            try:
+                export_stream(stream, output, 'csv', input_format, byteorder, base_address)  # type: ignore
+            finally:
+                if not to_stdout:
+                    output.close()
+        else:
+            export_stream(stream, output_path, file_format, input_format, byteorder, base_address)  # type: ignore
+    except ImportError as e:
+        sys.exit(f'ERROR: {e}')
+    except BrokenPipeError:  # e.g. piped into head
+        sys.stderr.close()
+    finally:
+        stream.close()
+
+
+def stats(path: Optional[str], input_format: str = 'auto', byteorder: Optional[str] = None, jobs: int = 1,
+          top: Optional[int] = None) -> None:
+    """Counts the instruction mix of a raw binary, hex dump, or ELF file and prints the per-format, per-mnemonic,
+    per-register, and per-immediate histograms as JSON
+
+    :param path: path of the file to be counted, or None/'-' to read from stdin
+    :param input_format: one of 'auto', 'binary', 'hex', or 'elf'
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :param jobs: the number of processes to count with. More than one requires a (binary or ELF) file path
+    :param top: the maximum number of mnemonics, registers, and immediates to print
+    """
+    import json
+    from .disassembler import iter_word_chunks
+    from .parallel import collect_stats_parallel
+    from .stats import collect_stats
+
+    if jobs > 1:
+        result = collect_stats_parallel(path, input_format, byteorder, jobs)  # type: ignore
+    else:
+        stream = sys.stdin.buffer if path in [None, '-'] else open(path, 'rb')
+        try:
+            chunks = iter_word_chunks(stream, input_format, byteorder)  # type: ignore
+            result = collect_stats(words for _, words in chunks)
+        finally:
+            stream.close()
+    print(json.dumps(result.summary(top), indent=2))
+
+
+def assemble(path: Optional[str], output_path: Optional[str] = None, output_format: str = 'auto',
+             byteorder: Optional[str] = None, text_address: Optional[int] = None, section: str = 'text') -> None:
+    """Assembles a MIPS source file and writes one of its sections as a binary or hex image
+
+    :param path: path of the source file, or None/'-' to read from stdin
+    :param output_path: path of the image to write, or None/'-' to write to stdout
+    :param output_format: 'binary', 'hex', or 'auto' (binary when writing to a file, hex when writing to stdout)
+    :param byteorder: the byte order to encode words with, either 'big' or 'little'
+    :param text_address: the address of the start of the .text section
+    :param section: the section to write, either 'text' or 'data'
+    """
+    from .assembler import assemble as assemble_source, assemble_file, AssemblyError, DEFAULT_TEXT_ADDRESS
+
+    to_stdout = output_path in [None, '-']
+    if output_format == 'auto':
+        output_format = 'hex' if to_stdout else 'binary'
+    if text_address is None:  # 0 is a valid address
+        text_address = DEFAULT_TEXT_ADDRESS
+    try:
+        if path in [None, '-']:
+            program = assemble_source(sys.stdin, byteorder or 'big', text_address)
+        else:
+            program = assemble_file(path, byteorder or 'big', text_address)  # type: ignore
+    except AssemblyError as e:
+        sys.exit(f'ERROR: {e}')
+    image = program.hex_image(section).encode() if output_format == 'hex' else getattr(program, section)
+    if to_stdout:
+        sys.stdout.buffer.write(image)
+    else:
+        with open(output_path, 'wb') as f:  # type: ignore
+            f.write(image)
+
+
+def verify(exhaustive: bool = False, samples: Optional[int] = None, workers: int = 1, reference: bool = False) -> None:
+    """Decodes and re-encodes words of every operation, printing a summary and any mismatches. Exits with status 1 if
+    any mismatches were found.
+
+    :param exhaustive: if True, every decodable word of each operation is checked
+    :param samples: the number of random words checked per operation when not exhaustive (default: DEFAULT_SAMPLES)
+    :param workers: the number of processes to check words with
+    :param reference: if True, the integer paths are also checked against MIPSInstruction
+    """
+    from .verify import verify_round_trip, DEFAULT_SAMPLES
+
+    start = time.perf_counter()
+    report = verify_round_trip(exhaustive, samples or DEFAULT_SAMPLES, workers=workers, reference=reference)
+    seconds = time.perf_counter() - start
+    for mismatch in report.mismatches:
+        reencoded = 'None' if mismatch.reencoded is None else f'0x{mismatch.reencoded:08x}'
+        print(f'MISMATCH 0x{mismatch.word:08x} -> {mismatch.instruction_str} -> {reencoded}: {mismatch.reason}')
+    print(f'Checked {report.checked} words in {seconds:.1f}s ({report.checked / seconds:.0f} words/s), '
+          f'{report.mismatch_count} mismatches')
+    if report.mismatch_count:
+        sys.exit(1)
+
+
 def interactive_loop(operation: Optional[str]=None, verbose: bool=False) -> None:
     """The loop that drives "interactive mode" - user enters an operation (if one wasn't specified when starting) and an
     input and the result is printed.
@@ -68,14 +234,91 @@ def interactive_loop(operation: Optional[str]=None, verbose: bool=False) -> None
             print('INVALID OPERATION. Format: {encode, decode} input (e.g. decode 0x00000000)')
 
 
+def batch(operation: Optional[str] = None, output_format: str = 'text') -> None:
+    """Decodes or encodes every line piped into stdin, without prompting, and exits with status 1 if any line failed
+
+    :param operation: 'decode' or 'encode'. If None, each line starts with its operation (e.g. 'decode 0x00000000')
+    :param output_format: one of 'text', 'plain', or 'jsonl'
+    """
+    from .pipe import process_stream
+
+    try:
+        count, errors = process_stream(sys.stdin, sys.stdout, operation, output_format)
+    except BrokenPipeError:  # e.g. piped into head
+        sys.stderr.close()
+        return
+    if errors:
+        print(f'{errors} of {count} lines failed', file=sys.stderr)
+        sys.exit(1)
+
+
 parser = ArgumentParser(description='Decode machine code or Encode MIPS Assembly Language')
-parser.add_argument('mode', type=str, nargs='?', choices={"encode", "decode"})
-parser.add_argument('input_str', type=str, nargs='?')
+parser.add_argument('mode', type=str, nargs='?',
+                    choices={"encode", "decode", "disasm", "export", "stats", "assemble", "verify", "serve"})
+parser.add_argument('input_str', type=str, nargs='?',
+                    help='the input string, or file to disassemble/assemble (stdin if omitted)')
 parser.add_argument('-i', '--interactive', action='store_true')
 parser.add_argument('-v', '--verbose', action='store_true')
-args = parser.parse_args()
+parser.add_argument('--batch', action='store_true',
+                    help='decode/encode every line of stdin without prompting (lines name their operation if no mode)')
+parser.add_argument('--emit', type=str, default='text', choices={"text", "plain", "jsonl"},
+                    help='output of --batch: the usual report, just the result of each line, or JSON lines')
+parser.add_argument('-f', '--format', type=str, default='auto', choices={"auto", "binary", "hex", "elf"},
+                    help='format of the input to disassemble, or of the assembled image')
+parser.add_argument('-e', '--endian', type=str, choices={"big", "little"}, help='byte order of the machine code')
+parser.add_argument('-b', '--base', type=lambda s: int(s, 16),
+                    help='address of the first word to disassemble, or of the assembled .text section (hex)')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help='number of processes to disassemble, count, or verify with')
+parser.add_argument('-s', '--symbols', type=str,
+                    help='ELF file or nm-style map to show disassembled branch and jump destinations as symbols')
+parser.add_argument('-o', '--output', type=str,
+                    help='file to write the assembled image or export to (stdout if omitted)')
+parser.add_argument('--to', type=str, choices={"csv", "arrow", "parquet"},
+                    help='format to export to (defaults to the output file extension, or csv)')
+parser.add_argument('--data', action='store_true', help='write the assembled .data section instead of .text')
+parser.add_argument('--top', type=int, help='number of most common mnemonics, registers, and immediates to show')
+parser.add_argument('--samples', type=int, help='random words to verify per operation')
+parser.add_argument('--exhaustive', action='store_true', help='verify every decodable word of every operation')
+parser.add_argument('--reference', action='store_true', help='also verify against MIPSInstruction (slower)')
+parser.add_argument('--host', type=str, default='127.0.0.1', help='host for the server to listen on')
+parser.add_argument('--port', type=int, default=7878, help='TCP port for the server to listen on')
+parser.add_argument('--socket', type=str, help='Unix socket for the server to listen on, instead of a TCP port')
+parser.add_argument('--profile', action='store_true',
+                    help='print the time spent in each stage of decoding/encoding to stderr on exit (in this process)')
+args = parser.parse_intermixed_args()
+
+if args.profile:
+    from .profiling import enable_profiling
+    enable_profiling(report_at_exit=True)
 
-if args.interactive:
+if args.mode == 'disasm':
+    if args.jobs > 1 and (args.input_str in [None, '-'] or args.format == 'hex'):
+        parser.error('--jobs requires a binary or ELF file path to disassemble')
+    try:
+        disassemble(args.input_str, args.format, args.endian, args.base, args.jobs, args.symbols)
+    except ValueError as e:  # e.g. a hex dump token that isn't a 32-bit hex word
+        parser.error(str(e))
+elif args.mode == 'stats':
+    if args.jobs > 1 and (args.input_str in [None, '-'] or args.format == 'hex'):
+        parser.error('--jobs requires a binary or ELF file path to count')
+    stats(args.input_str, args.format, args.endian, args.jobs, args.top)
+elif args.mode == 'export':
+    export(args.input_str, args.output, args.to, args.format, args.endian, args.base)
+elif args.mode == 'assemble':
+    if args.format == 'elf':
+        parser.error('Assembled images can only be written in binary or hex format')
+    assemble(args.input_str, args.output, args.format, args.endian, args.base, 'data' if args.data else 'text')
+elif args.mode == 'verify':
+    verify(args.exhaustive, args.samples, args.jobs, args.reference)
+elif args.mode == 'serve':
+    from .server import serve
+    serve(args.host, args.port, args.socket)
+elif args.batch:
+    if args.mode not in [None, 'decode', 'encode'] or args.input_str:
+        parser.error('--batch reads its input from stdin, and only works with the decode and encode modes')
+    batch(args.mode, args.emit)
+elif args.interactive:
     interactive_loop(getattr(args, 'mode'), args.verbose)
 elif args.mode:
     if not args.input_str:
@@ -0,0 +1,61 @@
+# Generated from func_and_opcodes.json by `python -m mdma.op_formatting` - do not edit by hand
+codes = {
+    'op': {
+        '000000': 'special',
+        '001000': 'addi',
+        '001001': 'addiu',
+        '001100': 'andi',
+        '000100': 'beq',
+        '000001': 'bgez',
+        '000111': 'bgtz',
+        '000110': 'blez',
+        '000101': 'bne',
+        '100000': 'lb',
+        '100100': 'lbu',
+        '100001': 'lh',
+        '100101': 'lhu',
+        '001111': 'lui',
+        '100011': 'lw',
+        '110001': 'lwc1',
+        '001101': 'ori',
+        '101000': 'sb',
+        '001010': 'slti',
+        '001011': 'sltiu',
+        '101001': 'sh',
+        '101011': 'sw',
+        '111001': 'swc1',
+        '001110': 'xori',
+        '000010': 'j',
+        '000011': 'jal',
+    },
+    'func': {
+        '100000': 'add',
+        '100001': 'addu',
+        '100100': 'and',
+        '001101': 'break',
+        '011010': 'div',
+        '011011': 'divu',
+        '001001': 'jalr',
+        '001000': 'jr',
+        '010000': 'mfhio',
+        '010010': 'mflo',
+        '010001': 'mthi',
+        '010011': 'mtlo',
+        '011000': 'mult',
+        '011001': 'multu',
+        '100111': 'nor',
+        '100101': 'or',
+        '000000': 'sll',
+        '000100': 'sllv',
+        '101010': 'slt',
+        '101011': 'sltu',
+        '000011': 'sra',
+        '000111': 'srav',
+        '000010': 'srl',
+        '000110': 'srlv',
+        '100010': 'sub',
+        '100011': 'subu',
+        '001100': 'syscall',
+        '100110': 'xor',
+    },
+}
@@ -0,0 +1,211 @@
+import struct
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+
+from mdma.isa import instructions, pseudo_instructions, expand_pseudo, field_kinds
+
+# Default addresses of the sections (the same as SPIM/MARS)
+DEFAULT_TEXT_ADDRESS = 0x00400000
+DEFAULT_DATA_ADDRESS = 0x10010000
+
+# Operations whose immediate is a PC-relative word offset
+branch_operations = frozenset({'beq', 'bne', 'bgez', 'bgtz', 'blez', 'bltz', 'bltzal', 'bgezal', 'bc1f', 'bc1t'})
+
+
+class AssemblyError(ValueError):
+    """Raised when a line of assembly can't be assembled
+
+    :param line_num: the (1-based) line number of the offending line
+    :param message: a description of the problem
+    """
+
+    def __init__(self, line_num: int, message: str):
+        super().__init__(f'Line {line_num}: {message}')
+        self.line_num = line_num
+
+
+class AssembledProgram(NamedTuple):
+    """The output of the assembler
+
+    :param text: The encoded .text section
+    :param data: The encoded .data section
+    :param text_address: The address of the start of the .text section
+    :param data_address: The address of the start of the .data section
+    :param symbols: A mapping of each label to its address
+    :param byteorder: The byte order the words were encoded with, either 'big' or 'little'
+    """
+
+    text: bytes
+    data: bytes
+    text_address: int
+    data_address: int
+    symbols: Dict[str, int]
+    byteorder: str
+
+    def hex_image(self, section: str = 'text') -> str:
+        """:returns: the given section ('text' or 'data') as a hex dump, one 32-bit word per line"""
+        prefix = '>' if self.byteorder == 'big' else '<'
+        return ''.join(f'{word:08x}\n' for word, in struct.iter_unpack(prefix + 'I', getattr(self, section)))
+
+
+# A statement left for the second pass: (line number, section, address, mnemonic or directive, operands)
+_Statement = Tuple[int, str, int, str, List[str]]
+
+
+def assemble(source: Union[str, Iterable[str]], byteorder: str = 'big', text_address: int = DEFAULT_TEXT_ADDRESS,
+             data_address: int = DEFAULT_DATA_ADDRESS) -> AssembledProgram:
+    """Assembles a MIPS source file in two passes: the first assigns an address to every label and statement, and the
+    second encodes each statement, resolving branch offsets and jump targets from the symbol table.
+
+    Instructions use the same operand order as MIPSInstruction (the OpFormat's syntax), and pseudo-instructions (see
+    isa.pseudo_instructions) are expanded into the instructions they stand for. Labels may be used as branch offsets,
+    jump targets, and .word values. Comments start with '#'. Supported directives are .text, .data, .word, and .align
+    (.globl/.global are accepted and ignored).
+
+    :param source: the assembly source, either as a string or an iterable of lines (e.g. an open file)
+    :param byteorder: the byte order to encode words with, either 'big' or 'little'
+    :param text_address: the address of the start of the .text section
+    :param data_address: the address of the start of the .data section
+    :returns: The encoded sections and symbol table
+    """
+    if isinstance(source, str):
+        source = source.splitlines()
+    statements, symbols, sizes = _first_pass(source, {'.text': text_address, '.data': data_address})
+    sections = {'.text': bytearray(sizes['.text']), '.data': bytearray(sizes['.data'])}
+    bases = {'.text': text_address, '.data': data_address}
+    word_format = ('>' if byteorder == 'big' else '<') + 'I'
+
+    for line_num, section, address, mnemonic, operands in statements:
+        offset = address - bases[section]
+        if mnemonic == '.word':
+            for i, operand in enumerate(operands):
+                value = _resolve_value(operand, symbols, line_num)
+                struct.pack_into(word_format, sections[section], offset + 4 * i, value & 0xffffffff)
+        else:
+            word = _encode(mnemonic, operands, address, symbols, line_num)
+            struct.pack_into(word_format, sections[section], offset, word)
+    return AssembledProgram(text=bytes(sections['.text']), data=bytes(sections['.data']), text_address=text_address,
+                            data_address=data_address, symbols=symbols, byteorder=byteorder)
+
+
+def _first_pass(lines: Iterable[str],
+                addresses: Dict[str, int]) -> Tuple[List[_Statement], Dict[str, int], Dict[str, int]]:
+    """Parses every line once, assigning addresses to labels and statements
+
+    :param lines: the lines of assembly source
+    :param addresses: the start address of each section
+    :returns: The statements to be encoded, the symbol table, and the size of each section in bytes
+    """
+    statements: List[_Statement] = []
+    symbols: Dict[str, int] = {}
+    bases = dict(addresses)
+    section = '.text'
+    for line_num, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].strip()
+        while ':' in line:  # Labels, possibly followed by a statement on the same line
+            label, line = line.split(':', 1)
+            label, line = label.strip(), line.strip()
+            if not label.replace('.', '_').isidentifier():
+                raise AssemblyError(line_num, f'Invalid label: {label}')
+            if label in symbols:
+                raise AssemblyError(line_num, f'Duplicate label: {label}')
+            symbols[label] = addresses[section]
+        if not line:
+            continue
+        mnemonic, *operands = line.replace(',', ' ').split()
+        if mnemonic in ['.text', '.data']:
+            section = mnemonic
+        elif mnemonic in ['.globl', '.global']:
+            pass
+        elif mnemonic == '.align':
+            alignment = 1 << _parse_int(operands[0] if operands else '', line_num)
+            addresses[section] += -addresses[section] % alignment
+        elif mnemonic == '.word':
+            statements.append((line_num, section, addresses[section], mnemonic, operands))
+            addresses[section] += 4 * len(operands)
+        elif mnemonic.startswith('.'):
+            raise AssemblyError(line_num, f'Unsupported directive: {mnemonic}')
+        elif mnemonic in pseudo_instructions:
+            try:
+                expansion = expand_pseudo(line)
+            except ValueError as e:
+                raise AssemblyError(line_num, str(e)) from None
+            for instruction_str in expansion:
+                mnemonic, *operands = instruction_str.split()
+                statements.append((line_num, section, addresses[section], mnemonic, operands))
+                addresses[section] += 4
+        elif mnemonic in instructions:
+            statements.append((line_num, section, addresses[section], mnemonic, operands))
+            addresses[section] += 4
+        else:
+            raise AssemblyError(line_num, f'UNKNOWN OPERATION: {mnemonic}')
+    sizes = {name: addresses[name] - bases[name] for name in addresses}
+    return statements, symbols, sizes
+
+
+def _encode(mnemonic: str, operands: List[str], address: int, symbols: Dict[str, int], line_num: int) -> int:
+    """Encodes a single instruction, resolving any labels it uses
+
+    :param mnemonic: the name of the operation
+    :param operands: the operands, in the order of the OpFormat's syntax
+    :param address: the address of the instruction
+    :param symbols: the symbol table
+    :param line_num: the line number of the instruction, for error messages
+    :returns: The 32-bit machine code word
+    """
+    instruction = instructions[mnemonic]
+    op_format = instruction.op_format
+    syntax = op_format.syntax[1:]
+    if len(operands) != len(syntax):
+        raise AssemblyError(line_num, f'{mnemonic} takes {len(syntax)} operands: {" ".join(syntax)}')
+    values = dict(instruction.encoding)
+    for segment_name, operand in zip(syntax, operands):
+        bits = op_format.fields[segment_name]
+        if segment_name in ['rs', 'rt', 'rd', 'fs', 'ft', 'fd', 'cs']:
+            try:
+                values[segment_name] = field_kinds[segment_name][1](operand, bits)
+            except ValueError:
+                raise AssemblyError(line_num, f'UNKNOWN REGISTER: {operand}') from None
+        elif segment_name == 'target':  # Absolute hex address, as with MIPSInstruction, or a label
+            target = symbols[operand] if operand in symbols else _parse_int(operand, line_num, 16)
+            if (target ^ (address + 4)) & 0xf0000000:  # The upper four bits come from the program counter
+                raise AssemblyError(line_num, f'Jump target 0x{target:08x} is outside the 256MB region of '
+                                              f'0x{address + 4:08x}')
+            values[segment_name] = target >> 2
+        elif segment_name == 'immediate' and mnemonic in branch_operations and operand in symbols:
+            offset = (symbols[operand] - (address + 4)) >> 2
+            if not -(1 << (bits - 1)) <= offset < (1 << (bits - 1)):
+                raise AssemblyError(line_num, f'Branch to {operand} is too far: offset {offset} doesn\'t fit in '
+                                              f'{bits} bits')
+            values[segment_name] = offset
+        else:
+            value = _parse_int(operand, line_num)
+            if not -(1 << (bits - 1)) <= value < (1 << bits):
+                raise AssemblyError(line_num, f'Value ({value}) too large to fit in {bits} bits')
+            values[segment_name] = value
+    return op_format.pack(values)
+
+
+def _resolve_value(operand: str, symbols: Dict[str, int], line_num: int) -> int:
+    """:returns: the address of the label, or the value of the integer, given as the operand"""
+    if operand in symbols:
+        return symbols[operand]
+    return _parse_int(operand, line_num)
+
+
+def _parse_int(operand: str, line_num: int, base: int = 0) -> int:
+    """:returns: the value of an integer operand. By default it may be in decimal, hex (0x), octal (0o), or binary (0b)"""
+    try:
+        return int(operand, base)
+    except ValueError:
+        raise AssemblyError(line_num, f'Expected an integer or known label, got: {operand!r}') from None
+
+
+def assemble_file(path: str, byteorder: str = 'big', text_address: int = DEFAULT_TEXT_ADDRESS,
+                  data_address: int = DEFAULT_DATA_ADDRESS) -> AssembledProgram:
+    """Assembles a MIPS source file. See assemble for details.
+
+    :param path: path of the source file
+    :returns: The encoded sections and symbol table
+    """
+    with open(path, 'r') as f:
+        return assemble(f, byteorder, text_address, data_address)
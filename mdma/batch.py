@@ -0,0 +1,149 @@
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from mdma.op_formatting import OpFormat, op_formats
+from mdma.isa import instructions, lookup_instruction, selector_masks
+from mdma.mips_instruction import MIPSInstruction, decode_word, encode_word
+
+# Format code of words that aren't a known instruction
+UNKNOWN_FORMAT = 255
+
+
+def _field_layout() -> Dict[str, Tuple[int, int]]:
+    """Collects the position of every field used by the pre-defined formats and the ISA's other formats (see isa.py)
+    from their OpFormat.fields. Fields with the same name are at the same position in every format
+
+    :returns: A mapping of each field name to its (shift, number of bits)
+    """
+    layout = {}
+    for op_format in [*op_formats, *(instruction.op_format for instruction in instructions.values())]:
+        shift = 32
+        for segment_name, bits in op_format.fields.items():
+            shift -= bits
+            if segment_name != 'unused':
+                layout.setdefault(segment_name, (shift, bits))
+    return layout
+
+
+class DecodedArray:
+    """A columnar representation of a batch of decoded machine code words. Every field is extracted for every word,
+    regardless of format - use format_codes (indices into formats) to tell which fields are meaningful.
+
+    :param words: The 32-bit machine code words
+    :param format_codes: The format code of each word: R_FORMAT, I_FORMAT, J_FORMAT, or S_FORMAT for op_formatting's
+            formats, a higher index into formats for the ISA's other formats, or UNKNOWN_FORMAT for unknown words
+    :param fields: A mapping of each field name to an array of its values. 'immediate' is converted from two's
+            complement, every other field is unsigned
+    :param formats: the formats the format codes refer to, starting with op_formats
+    """
+
+    def __init__(self, words: 'np.ndarray', format_codes: 'np.ndarray', fields: Dict[str, 'np.ndarray'],
+                 formats: Sequence[OpFormat] = tuple(op_formats)):
+        self.words = words
+        self.format_codes = format_codes
+        self.fields = fields
+        self.formats = list(formats)
+
+    def __getitem__(self, segment_name: str) -> 'np.ndarray':
+        """:returns: the array of values of the given field"""
+        return self.fields[segment_name]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def op_format(self, index: int) -> OpFormat:
+        """:returns: the OpFormat of the word at the given index (KeyError if it isn't a known instruction)"""
+        format_code = int(self.format_codes[index])
+        if format_code == UNKNOWN_FORMAT:
+            raise KeyError(f'UNKNOWN OPERATION: 0x{int(self.words[index]):08x}')
+        return self.formats[format_code]
+
+    def instruction(self, index: int) -> MIPSInstruction:
+        """:returns: the word at the given index decoded into a MIPSInstruction"""
+        return MIPSInstruction.from_word(int(self.words[index]))
+
+    def instruction_str(self, index: int) -> str:
+        """:returns: the human-readable instruction string of the word at the given index"""
+        return decode_word(int(self.words[index]))
+
+
+def decode_array(words: 'np.ndarray') -> DecodedArray:
+    """Decodes an array of 32-bit machine code words at once, extracting every field with vectorized shifts and masks.
+    Formats are looked up in the ISA once per distinct instruction (see isa.selector_key), not once per word.
+
+    Byte data can be viewed as words with e.g. np.frombuffer(data, dtype='>u4') for big-endian images.
+
+    :param words: An array of 32-bit machine code words
+    :returns: The per-field arrays and the format code of every word
+    """
+    if np is None:
+        raise ImportError('decode_array requires numpy to be installed')
+    words = np.asarray(words, dtype=np.uint32)
+    fields = {}
+    for segment_name, (shift, bits) in _field_layout().items():
+        fields[segment_name] = (words >> np.uint32(shift)) & np.uint32((1 << bits) - 1)
+    fields['immediate'] = fields['immediate'].astype(np.uint16).view(np.int16)
+
+    # Words with the same selecting bits are the same instruction, and there are few distinct ones
+    keys = words & np.array(selector_masks, dtype=np.uint32)[words >> np.uint32(26)]
+    values, inverse = np.unique(keys, return_inverse=True)
+    formats: List[OpFormat] = list(op_formats)
+    codes = []
+    for value in values.tolist():
+        try:
+            op_format = lookup_instruction(value).op_format
+        except KeyError:
+            codes.append(UNKNOWN_FORMAT)
+            continue
+        code = next((i for i, known in enumerate(formats) if known is op_format), len(formats))
+        if code == len(formats):
+            formats.append(op_format)
+        codes.append(code)
+    format_codes = np.array(codes, dtype=np.uint8)[inverse.reshape(-1)].reshape(words.shape)
+    return DecodedArray(words=words, format_codes=format_codes, fields=fields, formats=formats)
+
+
+def encode_many(lines: Iterable[str], byteorder: str = 'big') -> bytes:
+    """Encodes instruction strings straight into packed 32-bit words, without building binary strings or data
+    segments for each instruction.
+
+    :param lines: the instruction strings to be encoded
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :returns: The packed machine code
+    """
+    if byteorder not in ['big', 'little']:
+        raise ValueError(f"Byte order must be 'big' or 'little', not {byteorder}")
+    words = array(_WORD_TYPECODE, map(encode_word, lines))
+    if byteorder != sys.byteorder:
+        words.byteswap()
+    return words.tobytes()
+
+
+def encode_into(buffer, offset: int, lines: Iterable[str], byteorder: str = 'big') -> int:
+    """Encodes instruction strings straight into a preallocated writable buffer (e.g. a bytearray, memoryview, or
+    mmap), one packed 32-bit word at a time.
+
+    :param buffer: the buffer to write the words into
+    :param offset: the byte offset in the buffer to write the first word at
+    :param lines: the instruction strings to be encoded
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :returns: The byte offset just past the last word written
+    """
+    if byteorder not in ['big', 'little']:
+        raise ValueError(f"Byte order must be 'big' or 'little', not {byteorder}")
+    pack_into = struct.Struct('>I' if byteorder == 'big' else '<I').pack_into
+    for line in lines:
+        pack_into(buffer, offset, encode_word(line))
+        offset += 4
+    return offset
+
+
+# The array typecode of an unsigned 32-bit integer on this platform
+_WORD_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
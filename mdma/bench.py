@@ -0,0 +1,189 @@
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from mdma.op_formatting import op_formats, register_names, R_FORMAT, I_FORMAT, J_FORMAT, S_FORMAT
+from mdma.isa import instructions
+from mdma.mips_instruction import MIPSInstruction, decode_word, encode_word
+
+DEFAULT_SIZES = [1000, 100000, 10000000]
+FORMAT_NAMES = {'R': R_FORMAT, 'I': I_FORMAT, 'J': J_FORMAT, 'shift': S_FORMAT}
+
+# Number of distinct instructions generated per corpus - larger corpora cycle through them
+POOL_SIZE = 1 << 16
+
+# Maximum number of instructions run under tracemalloc (which is much slower) to measure peak memory. Inputs are
+# streamed and results discarded, so the peak doesn't grow with the size of the corpus
+DEFAULT_MEMORY_SAMPLE_SIZE = 10000
+
+
+def generate_words(format_name: str, count: int, seed: int = 0) -> List[int]:
+    """Generates random, valid machine code words of the given format, which decode and re-encode to themselves
+
+    :param format_name: one of 'R', 'I', 'J', or 'shift'
+    :param count: the number of words to generate
+    :param seed: the seed of the random number generator
+    :returns: The generated words
+    """
+    rng = random.Random(seed)
+    op_format = op_formats[FORMAT_NAMES[format_name]]
+    encodings = [instruction.encoding for instruction in instructions.values() if instruction.op_format is op_format]
+    registers = [num for num, name in enumerate(register_names) if name is not None]
+    words = []
+    for _ in range(count):
+        encoding = rng.choice(encodings)
+        values = {'rs': rng.choice(registers), 'rt': rng.choice(registers), 'rd': rng.choice(registers),
+                  'shamt': rng.getrandbits(5), 'immediate': rng.getrandbits(16), 'target': rng.getrandbits(26)}
+        # Fields that aren't shown in the instruction string are left as zero, so every word round-trips
+        values = {segment_name: values[segment_name] for segment_name in op_format.syntax if segment_name in values}
+        values.update(encoding)
+        words.append(op_format.pack(values))
+    return words
+
+
+def _verbose_table(hex_str: str) -> str:
+    """Decodes a hex string and renders its data segment table, as `python -m mdma decode -v` does"""
+    from prettytable import PrettyTable  # type: ignore
+    mc = MIPSInstruction(hex_str=hex_str)
+    t = PrettyTable(['SECTION', 'DECIMAL', 'BINARY', 'DECODED'])
+    for d in mc.data_segments:
+        t.add_row([d.name, d.decimal, d.bin_str, d.human_readable])
+    return t.get_string()
+
+
+# Benchmark name -> (function run on each input, builds the inputs from a pool of words)
+benchmarks: Dict[str, Tuple[Callable, Callable]] = {
+    'hex_decode': (lambda s: MIPSInstruction(hex_str=s), lambda words: ['0x' + format(w, '08x') for w in words]),
+    'bin_decode': (lambda s: MIPSInstruction(bin_str=s), lambda words: [format(w, '032b') for w in words]),
+    'encode': (lambda s: MIPSInstruction(instruction_str=s), lambda words: [decode_word(w) for w in words]),
+    'verbose_table': (_verbose_table, lambda words: ['0x' + format(w, '08x') for w in words]),
+    'word_decode': (decode_word, lambda words: words),
+    'word_encode': (encode_word, lambda words: [decode_word(w) for w in words]),
+}
+
+
+def _run(func: Callable, pool: List, size: int) -> float:
+    """:returns: the number of seconds taken to run func on `size` inputs cycled from the pool"""
+    inputs = itertools.islice(itertools.cycle(pool), size)
+    start = time.perf_counter()
+    for item in inputs:
+        func(item)
+    return time.perf_counter() - start
+
+
+def _peak_memory(func: Callable, pool: List, size: int) -> int:
+    """:returns: the peak number of bytes allocated while running func on `size` inputs cycled from the pool"""
+    tracemalloc.start()
+    try:
+        for item in itertools.islice(itertools.cycle(pool), size):
+            func(item)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# Commands timed to track startup cost: name -> arguments to the python interpreter
+startup_commands: Dict[str, List[str]] = {
+    'import': ['-c', 'import mdma'],
+    'cli_decode': ['-m', 'mdma', 'decode', '0x012a4020'],
+    'cli_encode': ['-m', 'mdma', 'encode', 'add $t0 $t1 $t2'],
+}
+
+
+def measure_startup(runs: int = 5) -> Dict[str, float]:
+    """Times fresh interpreter processes importing MDMA and running one-shot CLI commands
+
+    :param runs: the number of times each command is run
+    :returns: The median wall time (in seconds) of each command
+    """
+    startup = {}
+    for name, args in startup_commands.items():
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *args], stdout=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - start)
+        startup[name] = round(statistics.median(times), 6)
+    return startup
+
+
+def run_benchmarks(names: Iterable[str] = tuple(benchmarks), format_names: Iterable[str] = tuple(FORMAT_NAMES),
+                   sizes: Iterable[int] = tuple(DEFAULT_SIZES), memory_sample_size: int = DEFAULT_MEMORY_SAMPLE_SIZE,
+                   startup_runs: int = 5, progress: Optional[Callable[[str], None]] = None) -> Dict:
+    """Runs each benchmark on a corpus of each format and size
+
+    :param names: the benchmarks to run (keys of `benchmarks`)
+    :param format_names: the formats to generate corpora of ('R', 'I', 'J', and/or 'shift')
+    :param sizes: the number of instructions in each corpus
+    :param memory_sample_size: the maximum number of instructions each benchmark is run on a second time, under
+            tracemalloc, to measure peak memory. Each result's peak_memory_sample_size is the number it was measured
+            over. 0 skips measuring memory
+    :param startup_runs: the number of times each startup command is timed (see measure_startup). 0 skips them
+    :param progress: called with a description of each benchmark before it runs
+    :returns: The environment and a list of results, ready to be dumped as JSON
+    """
+    if progress and startup_runs:
+        progress('startup')
+    startup = measure_startup(startup_runs) if startup_runs else None
+    results = []
+    for format_name in format_names:
+        words = generate_words(format_name, min(max(sizes), POOL_SIZE))
+        for name in names:
+            func, build_inputs = benchmarks[name]
+            pool = build_inputs(words)
+            for size in sizes:
+                if progress:
+                    progress(f'{name} {format_name} {size}')
+                seconds = _run(func, pool, size)
+                sample_size = min(size, memory_sample_size)
+                results.append({
+                    'benchmark': name,
+                    'format': format_name,
+                    'size': size,
+                    'seconds': round(seconds, 6),
+                    'words_per_second': round(size / seconds) if seconds else None,
+                    'peak_memory_bytes': _peak_memory(func, pool, sample_size) if sample_size else None,
+                    'peak_memory_sample_size': sample_size or None,  # The peak is of a sample, not of every run
+                })
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'startup_seconds': startup,
+            'results': results}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Runs the benchmarks selected on the command line and prints (or writes) the results as JSON
+
+    :param argv: the command line arguments (defaults to sys.argv)
+    """
+    parser = ArgumentParser(description='Benchmark MDMA encode/decode throughput and peak memory. Results are JSON, '
+                                        'so they can be diffed between commits.')
+    parser.add_argument('-b', '--benchmarks', nargs='+', choices=list(benchmarks), default=list(benchmarks))
+    parser.add_argument('-f', '--formats', nargs='+', choices=list(FORMAT_NAMES), default=list(FORMAT_NAMES))
+    parser.add_argument('-s', '--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help='number of instructions in each corpus')
+    parser.add_argument('-m', '--memory-sample-size', type=int, default=DEFAULT_MEMORY_SAMPLE_SIZE,
+                        help='maximum number of instructions to measure peak memory over (0 to skip)')
+    parser.add_argument('--startup-runs', type=int, default=5,
+                        help='number of times to time each startup command (0 to skip)')
+    parser.add_argument('-o', '--output', type=str, help='file to write the JSON results to (stdout if omitted)')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.benchmarks, args.formats, args.sizes, args.memory_sample_size, args.startup_runs,
+                            progress=lambda description: print(description, file=sys.stderr, flush=True))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
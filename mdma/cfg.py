@@ -0,0 +1,321 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from mdma.isa import BRANCH, CALL, INDIRECT, JUMP, flow_opcodes, jump_target, lookup_instruction
+
+_RA = 31
+
+# Kinds of control flow instructions: those of isa (BRANCH, JUMP, CALL, and INDIRECT), which can be imported from here
+# too, and RETURN for jr $ra - an indirect jump through the return address register
+RETURN = 'return'
+
+# Kinds of edges
+FALLTHROUGH = 'fallthrough'
+
+
+def control_flow(word: int, address: int) -> Tuple[Optional[str], Optional[int]]:
+    """Classifies a machine code word as a control flow instruction by its definition in the ISA (see isa.py),
+    computing its target numerically from the offset/target fields rather than from the instruction string.
+
+    :param word: the 32-bit machine code word
+    :param address: the address of the word
+    :returns: The kind of control flow (None if it isn't a control flow instruction) and its static target address
+            (None if there isn't one)
+    """
+    if not flow_opcodes[(word >> 26) & 0x3f]:  # Cheap check that skips most words without looking them up
+        return None, None
+    try:
+        instruction = lookup_instruction(word)
+    except KeyError:
+        return None, None
+    kind = instruction.flow
+    if kind is None:
+        return None, None
+    last_operand = instruction.op_format.syntax[-1]
+    if last_operand == 'target':
+        return kind, jump_target(word, address)
+    if last_operand == 'immediate':  # PC-relative, the immediate is the low 16 bits of every format
+        offset = ((word & 0xffff) ^ 0x8000) - 0x8000
+        return kind, (address + 4 + (offset << 2)) & 0xffffffff
+    if kind == INDIRECT and (word >> 21) & 0x1f == _RA:  # Through rs
+        return RETURN, None
+    return kind, None
+
+
+def _release(counts: Dict[int, int], key: int) -> None:
+    """Decrements the count of a key, removing the key when it reaches zero"""
+    counts[key] -= 1
+    if not counts[key]:
+        del counts[key]
+
+
+class BasicBlock(NamedTuple):
+    """A straight-line run of instructions with a single entry and a single exit
+
+    :param start: the address of the first instruction
+    :param end: the address just past the last instruction
+    :param kind: the kind of control flow ending the block (None if it falls through into the next block)
+    :param target: the static target of the control flow ending the block, if there is one
+    """
+
+    start: int
+    end: int
+    kind: Optional[str]
+    target: Optional[int]
+
+    def instruction_count(self) -> int:
+        """:returns: the number of instructions in the block"""
+        return (self.end - self.start) // 4
+
+
+class Edge(NamedTuple):
+    """An edge of the control flow graph
+
+    :param source: the start address of the block the edge leaves
+    :param target: the address the edge goes to (which may be outside of the decoded words)
+    :param kind: one of 'fallthrough', 'branch', 'jump', or 'call'
+    """
+
+    source: int
+    target: int
+    kind: str
+
+
+class ControlFlowGraph:
+    """The basic blocks of a decoded stream of words and the edges between them. Building it takes one linear pass
+    to find block boundaries and one to create the blocks, and the block containing an address is found by bisecting
+    the sorted block start addresses.
+
+    Blocks end after branches, jumps, calls, and returns. With delay_slots, the instruction following each of these
+    (its delay slot) is included at the end of its block.
+
+    :param words: the 32-bit machine code words
+    :param base_address: the address of the first word
+    :param delay_slots: if True, control flow takes effect after the following instruction, as on real MIPS hardware
+    """
+
+    def __init__(self, words: Sequence[int], base_address: int = 0, delay_slots: bool = False):
+        self.base_address = base_address
+        self.end_address = base_address + 4 * len(words)
+        self.delay_slots = delay_slots
+        self.blocks: List[BasicBlock] = []
+        self.block_starts: List[int] = []
+        self.edges: List[Edge] = []
+        self.call_targets: List[int] = []
+        self._count = len(words)
+        self._slot = 1 if delay_slots else 0
+        self._flows: Dict[int, Tuple[str, Optional[int]]] = {}  # Index of a control flow instruction -> its flow
+        self._target_refs: Dict[int, int] = {}  # Index of a word -> number of control flow instructions targeting it
+        self._call_refs: Dict[int, int] = {}  # Call target -> number of calls to it
+        self._build([int(word) for word in words])
+        self._successors: Optional[Dict[int, List[Edge]]] = None
+        self._predecessors: Optional[Dict[int, List[Edge]]] = None
+
+    def _build(self, words: List[int]) -> None:
+        """Finds the block leaders, then splits the words into blocks and collects their edges"""
+        count = len(words)
+        base = self.base_address
+        slot = self._slot
+        leaders = bytearray(count + 1)
+        leaders[0] = leaders[count] = 1
+        flows: Dict[int, Tuple[str, Optional[int]]] = {}  # Index of the last instruction of a block -> control flow
+        target_refs, call_refs = self._target_refs, self._call_refs
+        for i, word in enumerate(words):
+            if not flow_opcodes[(word >> 26) & 0x3f]:
+                continue  # Cheap check that skips most words without a function call
+            kind, target = control_flow(word, base + 4 * i)
+            if kind is None:
+                continue
+            self._flows[i] = flows[min(i + slot, count - 1)] = (kind, target)
+            leaders[min(i + slot, count - 1) + 1] = 1
+            if target is not None:
+                index = (target - base) >> 2
+                if 0 <= index < count and target & 3 == 0:
+                    leaders[index] = 1
+                    target_refs[index] = target_refs.get(index, 0) + 1
+                if kind == CALL:
+                    call_refs[target] = call_refs.get(target, 0) + 1
+        self.call_targets = sorted(call_refs)
+
+        start = 0
+        for i in range(1, count + 1):
+            if not leaders[i]:
+                continue
+            kind, target = flows.get(i - 1, (None, None))
+            block = BasicBlock(base + 4 * start, base + 4 * i, kind, target)
+            self.blocks.append(block)
+            self.block_starts.append(block.start)
+            if target is not None:
+                self.edges.append(Edge(block.start, target, kind))  # type: ignore
+            if kind in [None, BRANCH, CALL] and i < count:
+                self.edges.append(Edge(block.start, block.end, FALLTHROUGH))
+            start = i
+
+    def _target_index(self, target: Optional[int]) -> Optional[int]:
+        """:returns: the index of the word at a target address, or None if it isn't one of the words"""
+        if target is None or target & 3:
+            return None
+        index = (target - self.base_address) >> 2
+        return index if 0 <= index < self._count else None
+
+    def _add_flow(self, index: int, kind: str, target: Optional[int]) -> None:
+        """Records the control flow of the instruction at an index"""
+        self._flows[index] = (kind, target)
+        target_index = self._target_index(target)
+        if target_index is not None:
+            self._target_refs[target_index] = self._target_refs.get(target_index, 0) + 1
+        if kind == CALL and target is not None:
+            self._call_refs[target] = self._call_refs.get(target, 0) + 1
+
+    def _remove_flow(self, index: int) -> None:
+        """Forgets the control flow of the instruction at an index"""
+        kind, target = self._flows.pop(index)
+        target_index = self._target_index(target)
+        if target_index is not None:
+            _release(self._target_refs, target_index)
+        if kind == CALL and target is not None:
+            _release(self._call_refs, target)
+
+    def _flow_ending_at(self, last: int) -> Tuple[Optional[str], Optional[int]]:
+        """:returns: the kind and target of the control flow ending the block whose last instruction is at an index.
+                With delay slots, that is the flow of the instruction before it - or, at the end of the words, of the
+                last instruction itself if it is a control flow instruction"""
+        flow = self._flows.get(last) if last == self._count - 1 else None
+        if flow is None and last >= self._slot:
+            flow = self._flows.get(last - self._slot)
+        return flow if flow is not None else (None, None)
+
+    def _is_leader(self, index: int) -> bool:
+        """:returns: whether a block starts at an index (or the words end there)"""
+        return (index in [0, self._count] or index in self._target_refs
+                or self._flow_ending_at(index - 1)[0] is not None)
+
+    def _block(self, start: int, end: int) -> BasicBlock:
+        """:returns: the block of the words from the start index up to the end index"""
+        kind, target = self._flow_ending_at(end - 1)
+        return BasicBlock(self.base_address + 4 * start, self.base_address + 4 * end, kind, target)
+
+    def _block_edges(self, block: BasicBlock) -> List[Edge]:
+        """:returns: the edges leaving a block"""
+        edges = []
+        if block.target is not None:
+            edges.append(Edge(block.start, block.target, block.kind))  # type: ignore
+        if block.kind in [None, BRANCH, CALL] and block.end < self.end_address:
+            edges.append(Edge(block.start, block.end, FALLTHROUGH))
+        return edges
+
+    def update(self, words: Sequence[int], indices: Iterable[int]) -> None:
+        """Updates the graph after the words at the given indices were changed. Only the blocks around changed control
+        flow - where a block used to or now ends, and where a changed branch or jump used to or now lands - are split
+        again, all other blocks (and their edges) are kept as they are.
+
+        :param words: the words, including the changed ones. Their number must be the same as before
+        :param indices: the indices of the changed words
+        """
+        if len(words) != self._count:
+            raise ValueError(f'Expected {self._count} words, not {len(words)}')
+        dirty = set()  # Indices where a block may have started or stopped starting
+        calls = set()
+        for i in indices:
+            kind, target = control_flow(int(words[i]), self.base_address + 4 * i)
+            old = self._flows.get(i)
+            new = (kind, target) if kind is not None else None
+            if old == new:
+                continue
+            for flow in [old, new]:
+                if flow is not None:
+                    dirty.add(min(i + self._slot, self._count - 1) + 1)
+                    target_index = self._target_index(flow[1])
+                    if target_index is not None:
+                        dirty.add(target_index)
+                    if flow[0] == CALL and flow[1] is not None:
+                        calls.add(flow[1])
+            if old is not None:
+                self._remove_flow(i)
+            if new is not None:
+                self._add_flow(i, *new)
+        for target in calls:
+            position = bisect_left(self.call_targets, target)
+            listed = position < len(self.call_targets) and self.call_targets[position] == target
+            if listed and target not in self._call_refs:
+                del self.call_targets[position]
+            elif not listed and target in self._call_refs:
+                self.call_targets.insert(position, target)
+
+        # Each block that may have changed is split again together with its neighbours, from a leader that is still
+        # one (it isn't dirty) up to the next one. Spans are processed from the end so the earlier positions stay valid
+        spans: List[List[int]] = []
+        for index in sorted(dirty):
+            first = self._block_index(max(index - 1, 0))
+            last = self._block_index(min(index, self._count - 1))
+            if spans and first <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], last)
+            else:
+                spans.append([first, last])
+        for first, last in reversed(spans):
+            self._resplit(first, last)
+
+    def _block_index(self, index: int) -> int:
+        """:returns: the position in blocks of the block containing the word at an index"""
+        return bisect_right(self.block_starts, self.base_address + 4 * index) - 1
+
+    def _resplit(self, first: int, last: int) -> None:
+        """Replaces the blocks from position first to last (inclusive), and their edges, with the blocks the same words
+        are split into now"""
+        base = self.base_address
+        start_address, end_address = self.blocks[first].start, self.blocks[last].end
+        blocks, edges = [], []
+        start = (start_address - base) >> 2
+        for i in range(start + 1, ((end_address - base) >> 2) + 1):
+            if self._is_leader(i):
+                block = self._block(start, i)
+                blocks.append(block)
+                edges.extend(self._block_edges(block))
+                start = i
+        self.blocks[first:last + 1] = blocks
+        self.block_starts[first:last + 1] = [block.start for block in blocks]
+
+        # Edges are in block order, so the edges of the replaced blocks are contiguous
+        edges_start = bisect_left(self.edges, (start_address,))  # type: ignore
+        edges_end = bisect_left(self.edges, (end_address,))  # type: ignore
+        old_edges = self.edges[edges_start:edges_end]
+        self.edges[edges_start:edges_end] = edges
+        if self._successors is not None:
+            for edge in old_edges:
+                self._successors.pop(edge.source, None)
+            for edge in edges:
+                self._successors.setdefault(edge.source, []).append(edge)
+        if self._predecessors is not None:
+            for edge in old_edges:
+                predecessors = self._predecessors[edge.target]
+                predecessors.remove(edge)
+                if not predecessors:
+                    del self._predecessors[edge.target]
+            for edge in edges:
+                self._predecessors.setdefault(edge.target, []).append(edge)
+
+    def block_at(self, address: int) -> Optional[BasicBlock]:
+        """Finds the block containing an address in O(log n)
+
+        :param address: the address to look up
+        :returns: The block containing the address, or None if it is outside of the decoded words
+        """
+        if not self.base_address <= address < self.end_address:
+            return None
+        return self.blocks[bisect_right(self.block_starts, address) - 1]
+
+    def successors(self, block: BasicBlock) -> List[Edge]:
+        """:returns: the edges leaving the given block"""
+        if self._successors is None:
+            self._successors = {}
+            for edge in self.edges:
+                self._successors.setdefault(edge.source, []).append(edge)
+        return self._successors.get(block.start, [])
+
+    def predecessors(self, block: BasicBlock) -> List[Edge]:
+        """:returns: the edges entering the given block"""
+        if self._predecessors is None:
+            self._predecessors = {}
+            for edge in self.edges:
+                self._predecessors.setdefault(edge.target, []).append(edge)
+        return self._predecessors.get(block.start, [])
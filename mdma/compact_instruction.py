@@ -0,0 +1,112 @@
+from __future__ import annotations
+from typing import Dict, List
+
+from mdma.op_formatting import OpFormat
+from mdma.data_segment import DataSegment
+from mdma.isa import Instruction, lookup_instruction
+from mdma.mips_instruction import MIPSInstruction, decode_word, encode_word
+
+
+class CompactInstruction:
+    """A lightweight, immutable representation of a decoded MIPS instruction, for holding large disassemblies in
+    memory. Only the 32-bit word is stored - the instruction's definition, field values, data segments, and strings
+    are computed each time they are accessed.
+
+    :param word: The 32-bit machine code as an integer
+    """
+
+    __slots__ = ('word',)
+
+    word: int
+
+    def __init__(self, word: int):
+        object.__setattr__(self, 'word', word)
+
+    @classmethod
+    def from_instruction_str(cls, instruction_str: str) -> CompactInstruction:
+        """Encodes a human-readable instruction string
+
+        :param instruction_str: the instruction string to be encoded
+        :returns: The encoded instruction
+        """
+        return cls(encode_word(instruction_str))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CompactInstruction):
+            return self.word == other.word
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.word)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(0x{self.word:08x})'
+
+    def __str__(self) -> str:
+        """:returns: the human-readable instruction string"""
+        return self.instruction_str
+
+    def __index__(self) -> int:
+        """:returns: the decimal value of the machine code"""
+        return self.word
+
+    def __reduce__(self):
+        return type(self), (self.word,)
+
+    @property
+    def instruction(self) -> Instruction:
+        """:returns: the ISA definition of the instruction (KeyError if the word isn't a known instruction)"""
+        return lookup_instruction(self.word)
+
+    @property
+    def op_format(self) -> OpFormat:
+        """:returns: the operation's formatting"""
+        return self.instruction.op_format
+
+    @property
+    def fields(self) -> Dict[str, int]:
+        """:returns: the unsigned value of each of the format's fields, in binary order"""
+        return self.op_format.unpack(self.word)
+
+    @property
+    def instruction_str(self) -> str:
+        """:returns: the human-readable instruction string"""
+        return decode_word(self.word)
+
+    @property
+    def hex_str(self) -> str:
+        """:returns: the hex string of the machine code"""
+        return '0x' + format(self.word, '08x')
+
+    @property
+    def bin_str(self) -> str:
+        """:returns: the 32-bit binary string of the machine code"""
+        return format(self.word, '032b')
+
+    @property
+    def data_segments(self) -> List[DataSegment]:
+        """:returns: the machine code's data segments, in their order in the binary"""
+        instruction = self.instruction
+        op_format = instruction.op_format
+        data_segments = [DataSegment.from_int(segment_name, value, op_format.fields[segment_name])
+                         for segment_name, value in op_format.unpack(self.word).items()]
+        for data_segment in data_segments:
+            if data_segment.name == op_format.syntax[0]:  # e.g. REGIMM ops are selected by rt, not op
+                data_segment.human_readable = instruction.mnemonic
+        return data_segments
+
+    @property
+    def ordered_data_segments(self) -> List[DataSegment]:
+        """:returns: the meaningful data segments, in the order they are displayed in a human-readable string"""
+        segments = {d.name: d for d in self.data_segments}
+        return [segments[segment_name] for segment_name in self.op_format.syntax]
+
+    def to_mips_instruction(self) -> MIPSInstruction:
+        """:returns: a full MIPSInstruction decoded from this instruction's word"""
+        return MIPSInstruction.from_word(self.word)
@@ -1,7 +1,9 @@
+from __future__ import annotations
 import math
 from typing import Optional, Sized
 
-from .op_formatting import codes, Registers
+from .op_formatting import Registers, op_names, func_names, fp_register_names, fp_register_numbers
+from .isa import instructions
 
 
 class DataSegment:
@@ -21,6 +23,7 @@ class DataSegment:
 
     def __init__(self, name: str, bin_str: Optional[str] = None, instr_str: Optional[str] = None, num_bits: Optional[int] = None):
         self.name = name
+        self._value: Optional[int] = None
         self.bin_str = bin_str
         self.instr_str = instr_str
         if self.instr_str:
@@ -33,6 +36,75 @@ class DataSegment:
         self.num_bits: int = num_bits
         self._parse()
 
+    @classmethod
+    def from_int(cls, name: str, value: int, num_bits: int) -> DataSegment:
+        """Creates a data segment from the unsigned integer value of its bits. The binary string is only built if it
+        is accessed.
+
+        :param name: The name of the data segment (e.g. "op", "rs")
+        :param value: The unsigned integer value of the data segment's bits
+        :param num_bits: The number of bits in the data segment
+        :returns: The parsed data segment
+        """
+        segment = cls.__new__(cls)
+        segment.name = name
+        segment._value = value
+        segment._bin_str = None
+        segment.instr_str = None
+        segment.num_bits = num_bits
+        segment.decimal = DataSegment.decimal_from_int(name, value, num_bits)
+        segment.human_readable = DataSegment.human_readable_from_int(name, value, num_bits)
+        return segment
+
+    @staticmethod
+    def decimal_from_int(name: str, value: int, num_bits: int) -> int:
+        """Converts the unsigned integer value of a data segment's bits into its decimal value, converting from two's
+        complement when needed.
+
+        :param name: The name of the data segment (e.g. "op", "rs")
+        :param value: The unsigned integer value of the data segment's bits
+        :param num_bits: The number of bits in the data segment
+        :returns: The decimal value of the data segment
+        """
+        if name in ['offset', 'immediate'] and value & (1 << (num_bits - 1)):  # if sign bit is set
+            return value - (1 << num_bits)
+        return value
+
+    @staticmethod
+    def human_readable_from_int(name: str, value: int, num_bits: int) -> str:
+        """Converts the unsigned integer value of a data segment's bits into its human readable form.
+
+        :param name: The name of the data segment (e.g. "op", "rs")
+        :param value: The unsigned integer value of the data segment's bits
+        :param num_bits: The number of bits in the data segment
+        :returns: The human-readable representation of the data.
+        """
+        if name == 'op':  # The mnemonic, unless the operation is selected by another field (e.g. REGIMM and FPU ops)
+            return op_names.get(value, str(value))
+        elif name == 'func':
+            return func_names.get(value, str(value))
+        elif name in ['rs', 'rt', 'rd', 'src1', 'src2']:
+            return Registers.register_name(value)
+        elif name in ['fs', 'ft', 'fd']:
+            return fp_register_names[value]
+        elif name == 'cs':  # Coprocessor 0 register
+            return f'${value}'
+        elif name == 'target':  # Upper four of program counter are assumed to be 0000
+            return '0x' + format(value << 2, '08x')
+        else:
+            return str(DataSegment.decimal_from_int(name, value, num_bits))
+
+    @property
+    def bin_str(self) -> Optional[str]:
+        """:returns: the string of the data segment's bits, built on first access if created from an integer"""
+        if self._bin_str is None and self._value is not None:
+            self._bin_str = format(self._value, f'0{self.num_bits}b')
+        return self._bin_str
+
+    @bin_str.setter
+    def bin_str(self, bin_str: Optional[str]) -> None:
+        self._bin_str = bin_str
+
     def __len__(self) -> int:
         return self.num_bits
 
@@ -65,14 +137,9 @@ class DataSegment:
 
         :returns: The human-readable representation of the data.
         """
-        if self.name in ['op', 'func']:
-            return codes[self.name][self.bin_str]
-        elif self.name in ['rs', 'rt', 'rd', 'src1', 'src2']:
-            return str(Registers(self.decimal))
-        elif self.name == 'target':  # Upper four of program counter are assumed to be 0000
-            return '0x' + hex(int(f'0000{self.bin_str}00', 2))[2:].zfill(8)
-        else:
-            return str(self.decimal)
+        if self.bin_str is None:
+            raise ValueError("Can't parse human readable value from None-valued binary string")
+        return DataSegment.human_readable_from_int(self.name, int(self.bin_str, 2), self.num_bits)
 
     def _parse_bin_str(self) -> str:
         """Parses the binary string representation of a human-readable instruction string
@@ -81,18 +148,39 @@ class DataSegment:
         """
         if self.instr_str is None:
             raise ValueError("Can't parse binary string from None-value instruction string")
-        if self.name in ['op', 'func']:
-            bin_str = next((bin_str for bin_str, op_name in codes[self.name].items() if op_name == self.instr_str), None)
-            if bin_str is None:
-                raise Exception(f'UNKNOWN OPERATION: {self.instr_str}')
-            return bin_str
-        elif self.instr_str.startswith('$'):
-            return bin(Registers.register_num(self.instr_str))[2:].zfill(5)
-        elif self.name == 'target':
+        return format(DataSegment.int_from_str(self.name, self.instr_str, self.num_bits), f'0{self.num_bits}b')
+
+    @staticmethod
+    def int_from_str(name: str, instr_str: str, num_bits: int) -> int:
+        """Converts the human-readable form of a data segment into the unsigned integer value of its bits, without
+        building a binary string.
+
+        :param name: The name of the data segment (e.g. "op", "rs")
+        :param instr_str: The human-readable representation of the data
+        :param num_bits: The number of bits in the data segment
+        :returns: The unsigned integer value of the data segment's bits
+        """
+        if name in ['op', 'func']:
+            code = instructions[instr_str].encoding.get(name) if instr_str in instructions else None
+            if code is None:
+                raise Exception(f'UNKNOWN OPERATION: {instr_str}')
+            return code
+        elif name in ['fs', 'ft', 'fd']:
+            if instr_str not in fp_register_numbers:
+                raise ValueError(f'UNKNOWN REGISTER: {instr_str}')
+            return fp_register_numbers[instr_str]
+        elif name == 'cs':
+            return int(instr_str.lstrip('$'))
+        elif instr_str.startswith('$'):
+            return Registers.register_num(instr_str)
+        elif name == 'target':
             # First four come from PC (usually 0000) and last two are 00
-            return bin(int(self.instr_str, 16))[2:].zfill(32)[4:30]
+            return (int(instr_str, 16) >> 2) & ((1 << num_bits) - 1)
         else:  # Assumed to be an immediate/offset value
-            return _twos_comp_from_int(int(self.instr_str), self.num_bits)
+            val = int(instr_str)
+            if val != 0 and num_bits < math.ceil(math.log(abs(val), 2)):
+                raise ValueError(f'Value ({val}) too large to fit in {num_bits} bits')
+            return val & ((1 << num_bits) - 1)
 
 
 def _int_from_twos_comp(twos_comp_binary_str: str) -> int:
@@ -0,0 +1,278 @@
+import io
+import struct
+import string
+from typing import TYPE_CHECKING, BinaryIO, Iterator, List, Optional, Sequence, Tuple
+
+from mdma.mips_instruction import decode_word
+
+if TYPE_CHECKING:
+    from mdma.symbols import SymbolTable
+
+# Number of bytes read from the input at a time
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+_ELF_MAGIC = b'\x7fELF'
+_HEX_DUMP_CHARS = frozenset((string.hexdigits + string.whitespace + 'xX:').encode())
+
+
+def format_line(address: int, word: int, symbols: Optional['SymbolTable'] = None) -> str:
+    """Formats a single line of disassembly. Words that can't be decoded are shown as a .word directive.
+
+    :param address: the address of the word
+    :param word: the 32-bit machine code word
+    :param symbols: if given, branch and jump destinations are shown as symbols (see SymbolTable.decode_word)
+    :returns: The address, word, and instruction string
+    """
+    try:
+        instruction_str = decode_word(word, address) if symbols is None else symbols.decode_word(word, address)
+    except (KeyError, ValueError):  # Unknown operation or register
+        instruction_str = f'.word 0x{word:08x}'
+    return f'{address:08x}:  {word:08x}  {instruction_str}'
+
+
+def words_from_bytes(data: bytes, byteorder: str = 'big') -> Tuple[int, ...]:
+    """Unpacks bytes into 32-bit words. Any trailing bytes that don't make up a full word are ignored.
+
+    :param data: the raw machine code
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :returns: The unpacked words
+    """
+    return struct.unpack_from(f'{_struct_byteorder(byteorder)}{len(data) // 4}I', data)
+
+
+def iter_binary_chunks(stream: BinaryIO, byteorder: str = 'big', chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       limit: Optional[int] = None) -> Iterator[Tuple[int, ...]]:
+    """Reads raw machine code from a stream and yields it as chunks of words
+
+    :param stream: the binary stream to be read
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :param chunk_size: the (maximum) number of bytes read at a time, a positive multiple of 4
+    :param limit: the maximum number of bytes to read, or None to read until the end of the stream
+    :returns: An iterator of word chunks
+    :raises ValueError: if the chunk size isn't a positive multiple of 4
+    """
+    if chunk_size <= 0 or chunk_size % 4:
+        raise ValueError(f'Chunk size must be a positive multiple of 4 bytes, not {chunk_size}')
+    leftover = b''
+    while limit is None or limit > 0:
+        data = stream.read(chunk_size if limit is None else min(chunk_size, limit))
+        if not data:
+            break
+        if limit is not None:
+            limit -= len(data)
+        data = leftover + data
+        usable = len(data) - len(data) % 4
+        leftover = data[usable:]
+        if usable:
+            yield words_from_bytes(data[:usable], byteorder)
+
+
+def iter_hex_chunks(stream: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[int]]:
+    """Reads a hex dump from a stream and yields it as chunks of words. Each whitespace-separated token is a 32-bit
+    word (with or without a leading 0x). Tokens ending in ':' are treated as addresses and skipped.
+
+    :param stream: the binary stream to be read
+    :param chunk_size: the approximate number of bytes read at a time
+    :returns: An iterator of word chunks
+    :raises ValueError: if a token isn't a hex number from 0 to 0xffffffff
+    """
+    while True:
+        lines = stream.readlines(chunk_size)
+        if not lines:
+            break
+        tokens = [token for line in lines for token in line.split() if not token.endswith(b':')]
+        try:
+            words = [int(token, 16) for token in tokens]
+        except ValueError:
+            token = next(token for token in tokens if not _is_hex(token))
+            raise ValueError(f'Hex dump word is not a hex number: {token.decode(errors="replace")}') from None
+        if words and not 0 <= min(words) <= max(words) <= 0xffffffff:
+            word = next(word for word in words if not 0 <= word <= 0xffffffff)
+            raise ValueError(f'Hex dump word out of the 32-bit range: {word:#x}')
+        if words:
+            yield words
+
+
+def _is_hex(token: bytes) -> bool:
+    """:returns: whether a token can be parsed as a hex number"""
+    try:
+        int(token, 16)
+    except ValueError:
+        return False
+    return True
+
+
+def elf_sections(stream: BinaryIO) -> Tuple[str, bool, List[Tuple[bytes, Tuple[int, ...]]]]:
+    """Reads the section headers of an ELF file
+
+    :param stream: the (seekable) binary stream containing the ELF file
+    :returns: The file's byte order, whether it is 64-bit, and the name and header fields (name, type, flags, addr,
+            offset, size, link, info, addralign, entsize) of each section
+    """
+    stream.seek(0)
+    ident = stream.read(16)
+    if ident[:4] != _ELF_MAGIC:
+        raise ValueError('Not an ELF file')
+    is_64_bit = ident[4] == 2
+    byteorder = 'little' if ident[5] == 1 else 'big'
+    prefix = _struct_byteorder(byteorder)
+    if is_64_bit:
+        header_format, section_format = prefix + 'HHIQQQIHHHHHH', prefix + 'IIQQQQIIQQ'
+    else:
+        header_format, section_format = prefix + 'HHIIIIIHHHHHH', prefix + 'IIIIIIIIII'
+    header = struct.unpack(header_format, stream.read(struct.calcsize(header_format)))
+    section_header_offset, section_header_size, num_sections, names_index = header[5], header[10], header[11], header[12]
+
+    sections = []
+    for i in range(num_sections):
+        stream.seek(section_header_offset + i * section_header_size)
+        sections.append(struct.unpack(section_format, stream.read(struct.calcsize(section_format))))
+    names_offset, names_size = sections[names_index][4], sections[names_index][5]
+    stream.seek(names_offset)
+    names = stream.read(names_size)
+    return byteorder, is_64_bit, [(names[section[0]:names.index(b'\0', section[0])], section)
+                                  for section in sections]
+
+
+def elf_text_section(stream: BinaryIO) -> Tuple[int, int, int, str]:
+    """Locates the .text section of an ELF file
+
+    :param stream: the (seekable) binary stream containing the ELF file
+    :returns: The file offset, size, and load address of the .text section, and the file's byte order
+    """
+    byteorder, _, sections = elf_sections(stream)
+    for name, (_, _, _, addr, offset, size, *_) in sections:
+        if name == b'.text':
+            return offset, size, addr, byteorder
+    raise ValueError('ELF file has no .text section')
+
+
+def detect_format(stream: BinaryIO) -> str:
+    """Guesses the format of the input by peeking at its first bytes without consuming them
+
+    :param stream: a binary stream supporting peek() (e.g. sys.stdin.buffer or a file opened with open(path, 'rb')),
+            or a seekable stream (e.g. io.BytesIO), which is read from and then seeked back
+    :returns: One of 'elf', 'hex', or 'binary'
+    """
+    if hasattr(stream, 'peek'):
+        head = stream.peek(512)[:512]  # type: ignore
+    elif stream.seekable():
+        position = stream.tell()
+        head = stream.read(512)
+        stream.seek(position)
+    else:
+        raise ValueError("Can't detect the format of a stream without peek() or seek(), give the input format")
+    if head.startswith(_ELF_MAGIC):
+        return 'elf'
+    if head and all(b in _HEX_DUMP_CHARS for b in head):
+        return 'hex'
+    return 'binary'
+
+
+def locate_machine_code(path: str, input_format: str = 'auto') -> Tuple[int, Optional[int], int, str]:
+    """Locates the machine code in a raw binary or ELF file, so it can be read at known offsets (e.g. split into
+    ranges or memory-mapped). Hex dumps aren't supported, as their words aren't at fixed offsets.
+
+    :param path: path of the file
+    :param input_format: one of 'auto', 'binary', or 'elf'
+    :returns: The file offset, size (None for the rest of the file), and load address of the machine code, and its
+            default byte order
+    """
+    with open(path, 'rb') as f:
+        if input_format == 'auto':
+            input_format = detect_format(f)  # type: ignore
+        if input_format == 'elf':
+            return elf_text_section(f)  # type: ignore
+        if input_format == 'binary':
+            return 0, None, 0, 'big'
+    raise ValueError(f'{input_format} input can only be read sequentially, not at file offsets')
+
+
+def iter_word_chunks(stream: BinaryIO, input_format: str = 'auto', byteorder: Optional[str] = None,
+                     base_address: Optional[int] = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[int, Sequence[int]]]:
+    """Reads a raw binary, hex dump, or ELF file chunk by chunk, so memory use stays flat regardless of the size of
+    the input.
+
+    :param stream: the binary stream to be read
+    :param input_format: one of 'auto', 'binary', 'hex', or 'elf'
+    :param byteorder: the byte order of the words, either 'big' or 'little'. Defaults to the ELF file's byte order,
+            or 'big' for raw binaries
+    :param base_address: the address of the first word. Defaults to the .text load address for ELF files, or 0
+    :param chunk_size: the (maximum) number of bytes read at a time
+    :returns: An iterator of (address of the first word, words) chunks
+    """
+    if input_format == 'auto' and not hasattr(stream, 'peek') and not stream.seekable():  # e.g. a raw pipe
+        buffered = io.BufferedReader(stream)  # type: ignore
+        try:
+            yield from iter_word_chunks(buffered, input_format, byteorder, base_address, chunk_size)
+        finally:
+            buffered.detach()  # So the caller's stream isn't closed along with the buffer
+        return
+    if input_format == 'auto':
+        input_format = detect_format(stream)
+    if input_format == 'elf':
+        if not stream.seekable():  # Section headers are at the end of the file, so a piped ELF is read in whole
+            stream = io.BytesIO(stream.read())
+        offset, size, addr, elf_byteorder = elf_text_section(stream)
+        stream.seek(offset)
+        chunks = iter_binary_chunks(stream, byteorder or elf_byteorder, chunk_size, limit=size)
+        address = addr if base_address is None else base_address
+    elif input_format == 'hex':
+        chunks = iter_hex_chunks(stream, chunk_size)  # type: ignore
+        address = base_address or 0
+    elif input_format == 'binary':
+        chunks = iter_binary_chunks(stream, byteorder or 'big', chunk_size)
+        address = base_address or 0
+    else:
+        raise ValueError(f'UNKNOWN INPUT FORMAT: {input_format}')
+
+    for words in chunks:
+        yield address, words
+        address += 4 * len(words)
+
+
+def disassemble_stream(stream: BinaryIO, input_format: str = 'auto', byteorder: Optional[str] = None,
+                       base_address: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       symbols: Optional['SymbolTable'] = None) -> Iterator[List[str]]:
+    """Disassembles a raw binary, hex dump, or ELF file chunk by chunk (see iter_word_chunks)
+
+    :param stream: the binary stream to be disassembled
+    :param input_format: one of 'auto', 'binary', 'hex', or 'elf'
+    :param byteorder: the byte order of the words, either 'big' or 'little'. Defaults to the ELF file's byte order,
+            or 'big' for raw binaries
+    :param base_address: the address of the first word. Defaults to the .text load address for ELF files, or 0
+    :param chunk_size: the (maximum) number of bytes read at a time
+    :param symbols: if given, branch and jump destinations are shown as symbols, and each symbol's address is
+            preceded by a '<name>:' line
+    :returns: An iterator of chunks of disassembly lines
+    """
+    for address, words in iter_word_chunks(stream, input_format, byteorder, base_address, chunk_size):
+        yield format_lines(address, words, symbols)
+
+
+def format_lines(address: int, words: Sequence[int], symbols: Optional['SymbolTable'] = None) -> List[str]:
+    """Formats consecutive words as lines of disassembly (see format_line)
+
+    :param address: the address of the first word
+    :param words: the 32-bit machine code words
+    :param symbols: if given, branch and jump destinations are shown as symbols, and each symbol's address is
+            preceded by a '<name>:' line
+    :returns: The disassembly lines
+    """
+    if symbols is None:
+        return [format_line(address + 4 * i, word) for i, word in enumerate(words)]
+    lines = []
+    for i, word in enumerate(words):
+        symbol = symbols.at(address + 4 * i)
+        if symbol is not None:
+            lines.append(f'<{symbol.name}>:')
+        lines.append(format_line(address + 4 * i, word, symbols))
+    return lines
+
+
+def _struct_byteorder(byteorder: str) -> str:
+    """:returns: the struct format prefix for the given byte order ('big' or 'little')"""
+    if byteorder not in ['big', 'little']:
+        raise ValueError(f"Byte order must be 'big' or 'little', not {byteorder}")
+    return '>' if byteorder == 'big' else '<'
@@ -0,0 +1,147 @@
+import csv
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from mdma.op_formatting import OpFormat, op_formats
+from mdma.isa import instructions, lookup_instruction
+from mdma.disassembler import iter_word_chunks, DEFAULT_CHUNK_SIZE
+
+EXPORT_FORMATS = ['csv', 'arrow', 'parquet']
+
+
+def _field_names() -> List[str]:
+    """:returns: every field of the pre-defined formats and then of the ISA's other formats (e.g. 'fmt' and 'fs'),
+            in the order they first appear in OpFormat.fields. Unused bits aren't a field"""
+    names: List[str] = []
+    for op_format in [*op_formats, *(instruction.op_format for instruction in instructions.values())]:
+        names.extend(segment_name for segment_name in op_format.fields
+                     if segment_name not in names and segment_name != 'unused')
+    return names
+
+
+FIELD_NAMES = _field_names()
+COLUMNS = ['address', 'word', 'format', *FIELD_NAMES, 'mnemonic']
+
+# id of a format -> (the format, and the (column index, shift, mask, sign bit) of each of its fields). The sign bit
+# is 0 for unsigned fields
+_field_positions: Dict[int, Tuple[OpFormat, List[Tuple[int, int, int, int]]]] = {}
+
+
+def _positions(op_format: OpFormat) -> List[Tuple[int, int, int, int]]:
+    """:returns: the (column index, shift, mask, sign bit) of each of a format's exported fields"""
+    cached = _field_positions.get(id(op_format))
+    if cached is not None and cached[0] is op_format:
+        return cached[1]
+    positions, shift = [], 32
+    for segment_name, bits in op_format.fields.items():
+        shift -= bits
+        if segment_name in FIELD_NAMES:  # Fields of formats defined later (see isa.define_instructions) are skipped
+            positions.append((3 + FIELD_NAMES.index(segment_name), shift, (1 << bits) - 1,
+                              1 << (bits - 1) if segment_name == 'immediate' else 0))
+    _field_positions[id(op_format)] = (op_format, positions)
+    return positions
+
+
+def _row(address: int, word: int) -> List[Any]:
+    """:returns: the columns of a single word. Fields that aren't part of the word's format are None, and so is
+            every column but the address and word of unknown words"""
+    row: List[Any] = [address, word, *[None] * (len(FIELD_NAMES) + 2)]
+    try:
+        instruction = lookup_instruction(word)
+    except KeyError:
+        return row
+    row[2], row[-1] = instruction.op_format.format_type_char, instruction.mnemonic
+    for column, shift, mask, sign_bit in _positions(instruction.op_format):
+        value = (word >> shift) & mask
+        row[column] = (value ^ sign_bit) - sign_bit  # Sign extends the immediate
+    return row
+
+
+def iter_row_batches(chunks: Iterable[Tuple[int, Sequence[int]]]) -> Iterator[List[List[Any]]]:
+    """Turns chunks of words into batches of rows with the columns in COLUMNS
+
+    :param chunks: (address of the first word, words) chunks, e.g. from iter_word_chunks
+    :returns: An iterator of row batches, one per chunk
+    """
+    for address, words in chunks:
+        yield [_row(address + 4 * i, word) for i, word in enumerate(words)]
+
+
+def write_csv(chunks: Iterable[Tuple[int, Sequence[int]]], file: TextIO) -> int:
+    """Writes decoded words as CSV, one row batch at a time
+
+    :param chunks: (address of the first word, words) chunks, e.g. from iter_word_chunks
+    :param file: the text file to write to (opened with newline='')
+    :returns: The number of rows written
+    """
+    writer = csv.writer(file)
+    writer.writerow(COLUMNS)
+    count = 0
+    for rows in iter_row_batches(chunks):
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def arrow_schema():
+    """:returns: the pyarrow schema of exported rows"""
+    import pyarrow as pa  # type: ignore
+    field_types = {'immediate': pa.int16(), 'target': pa.uint32()}
+    return pa.schema([('address', pa.uint64()), ('word', pa.uint32()), ('format', pa.string()),
+                      *[(name, field_types.get(name, pa.uint8())) for name in FIELD_NAMES],
+                      ('mnemonic', pa.string())])
+
+
+def write_arrow(chunks: Iterable[Tuple[int, Sequence[int]]], file: Any, file_format: str = 'parquet') -> int:
+    """Writes decoded words as an Arrow IPC file or a Parquet file, one record batch (or row group) at a time.
+    Requires pyarrow to be installed.
+
+    :param chunks: (address of the first word, words) chunks, e.g. from iter_word_chunks
+    :param file: the path or binary file to write to
+    :param file_format: either 'arrow' or 'parquet'
+    :returns: The number of rows written
+    """
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except ImportError:
+        raise ImportError(f'Exporting to {file_format} requires pyarrow to be installed') from None
+    if file_format not in ['arrow', 'parquet']:
+        raise ValueError(f'UNKNOWN EXPORT FORMAT: {file_format}')
+
+    schema = arrow_schema()
+    writer = pq.ParquetWriter(file, schema) if file_format == 'parquet' else pa.ipc.new_file(file, schema)
+    count = 0
+    try:
+        for rows in iter_row_batches(chunks):
+            columns = [list(column) for column in zip(*rows)]
+            batch = pa.RecordBatch.from_arrays([pa.array(column, type=field.type)
+                                                for column, field in zip(columns, schema)], schema=schema)
+            if file_format == 'parquet':
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            count += len(rows)
+    finally:
+        writer.close()
+    return count
+
+
+def export_stream(stream: BinaryIO, output: Any, file_format: str = 'csv', input_format: str = 'auto',
+                  byteorder: Optional[str] = None, base_address: Optional[int] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Decodes a raw binary, hex dump, or ELF file (see iter_word_chunks) and exports it in a columnar format. Only
+    one chunk of rows is held in memory at a time.
+
+    :param stream: the binary stream to be decoded
+    :param output: the file to write to - a text file for CSV, otherwise a path or binary file
+    :param file_format: one of 'csv', 'arrow', or 'parquet'
+    :param input_format: one of 'auto', 'binary', 'hex', or 'elf'
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :param base_address: the address of the first word
+    :param chunk_size: the (maximum) number of bytes read, and so rows written, at a time
+    :returns: The number of rows written
+    """
+    chunks = iter_word_chunks(stream, input_format, byteorder, base_address, chunk_size)
+    if file_format == 'csv':
+        return write_csv(chunks, output)
+    return write_arrow(chunks, output, file_format)
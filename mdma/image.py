@@ -0,0 +1,156 @@
+import mmap
+import sys
+from array import array
+from typing import TYPE_CHECKING, Any, List, Optional, Union
+
+from mdma.compact_instruction import CompactInstruction
+from mdma.disassembler import format_lines, locate_machine_code, _struct_byteorder
+
+if TYPE_CHECKING:
+    from mdma.symbols import SymbolTable
+
+
+class MappedImage:
+    """A raw binary or ELF file, memory-mapped and viewed as 32-bit words without being read or converted up front.
+    Words are only decoded when they are accessed, so arbitrary regions of multi-GB images can be inspected while
+    only the pages touched are resident.
+
+    Instructions are indexed by address: image[address] is the instruction at that address, and image[lo:hi] (or
+    image.range(lo, hi)) the instructions from lo up to, but not including, hi.
+
+    :param path: path of the file
+    :param input_format: one of 'auto', 'binary', or 'elf'
+    :param byteorder: the byte order of the words, either 'big' or 'little'. Defaults to the ELF file's byte order,
+            or 'big' for raw binaries
+    :param base_address: the address of the first word. Defaults to the .text load address for ELF files, or 0
+    """
+
+    def __init__(self, path: str, input_format: str = 'auto', byteorder: Optional[str] = None,
+                 base_address: Optional[int] = None):
+        offset, size, addr, default_byteorder = locate_machine_code(path, input_format)
+        self.path = path
+        self.byteorder = byteorder or default_byteorder
+        _struct_byteorder(self.byteorder)  # Validates the byte order
+        self.base_address = addr if base_address is None else base_address
+        with open(path, 'rb') as f:
+            # Empty files can't be mapped
+            self._mmap: Optional[mmap.mmap] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if f.seek(0, 2) else None
+        self._offset = offset
+        total = len(self._mmap) if self._mmap is not None else 0
+        end = total if size is None else min(offset + size, total)
+        self._count = max(end - offset, 0) // 4
+        # Native-order 32-bit view of the words. Words in the other byte order are swapped as they are read
+        self._words: Optional[memoryview] = memoryview(self._mmap)[offset:offset + 4 * self._count].cast('I') \
+            if self._mmap is not None else None
+        self._swap = self.byteorder != sys.byteorder
+
+    def __len__(self) -> int:
+        """:returns: the number of words"""
+        return self._count
+
+    def __repr__(self) -> str:
+        return f'MappedImage({self.path!r}, {self._count} words at 0x{self.base_address:08x})'
+
+    def __enter__(self) -> 'MappedImage':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmaps the file. Views returned by words() and array() must no longer be in use"""
+        if self._words is not None:
+            self._words.release()
+            self._words = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    @property
+    def end_address(self) -> int:
+        """The address just past the last word"""
+        return self.base_address + 4 * self._count
+
+    def _index(self, address: int) -> int:
+        """:returns: the index of the word at an address"""
+        if (address - self.base_address) & 3:
+            raise ValueError(f'Address 0x{address:08x} is not word-aligned')
+        index = (address - self.base_address) // 4
+        if not 0 <= index < self._count:
+            raise IndexError(f'Address 0x{address:08x} is outside of the image')
+        return index
+
+    def _bounds(self, lo: Optional[int], hi: Optional[int]) -> range:
+        """:returns: the indices of the words from address lo up to hi, clamped to the image"""
+        lo = self.base_address if lo is None else lo
+        hi = self.end_address if hi is None else hi
+        if (lo - self.base_address) & 3 or (hi - self.base_address) & 3:
+            raise ValueError(f'Address range 0x{lo:08x}-0x{hi:08x} is not word-aligned')
+        start = min(max((lo - self.base_address) // 4, 0), self._count)
+        return range(start, min(max((hi - self.base_address) // 4, start), self._count))
+
+    def word(self, address: int) -> int:
+        """:returns: the 32-bit machine code word at an address"""
+        word = self._words[self._index(address)]  # type: ignore
+        return int.from_bytes(word.to_bytes(4, sys.byteorder), self.byteorder) if self._swap else word
+
+    def words(self, lo: Optional[int] = None, hi: Optional[int] = None) -> Union[memoryview, array]:
+        """The machine code words from address lo up to hi (the whole image by default). If the words are in the
+        machine's byte order this is a zero-copy view of the file, otherwise only the requested words are converted.
+
+        :param lo: the address of the first word
+        :param hi: the address just past the last word
+        :returns: The words
+        """
+        indices = self._bounds(lo, hi)
+        view = self._words[indices.start:indices.stop] if self._words is not None else memoryview(b'').cast('I')
+        if not self._swap:
+            return view
+        words = array('I', view)
+        words.byteswap()
+        return words
+
+    def array(self, lo: Optional[int] = None, hi: Optional[int] = None) -> Any:
+        """A zero-copy NumPy view of the words from address lo up to hi (the whole image by default), in the image's
+        byte order. Requires numpy to be installed.
+
+        :param lo: the address of the first word
+        :param hi: the address just past the last word
+        :returns: The words as a read-only uint32 array, e.g. for batch.decode_array
+        """
+        import numpy as np  # type: ignore
+        indices = self._bounds(lo, hi)
+        dtype = np.dtype(_struct_byteorder(self.byteorder) + 'u4')
+        if self._mmap is None:
+            return np.zeros(0, dtype)
+        return np.frombuffer(self._mmap, dtype, len(indices), self._offset + 4 * indices.start)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[CompactInstruction, List[CompactInstruction]]:
+        """:returns: the instruction at an address, or the instructions of a slice of addresses (see range)"""
+        if isinstance(key, slice):
+            if key.step is not None:
+                raise ValueError("Slices of a MappedImage can't have a step")
+            return self.range(key.start, key.stop)
+        return CompactInstruction(self.word(key))
+
+    def range(self, lo: Optional[int] = None, hi: Optional[int] = None) -> List[CompactInstruction]:
+        """Decodes the instructions from address lo up to hi. Only those words are read from the file.
+
+        :param lo: the address of the first word
+        :param hi: the address just past the last word
+        :returns: The instructions, which are decoded to strings when their attributes are accessed
+        """
+        return [CompactInstruction(word) for word in self.words(lo, hi)]
+
+    def disassemble(self, lo: Optional[int] = None, hi: Optional[int] = None,
+                    symbols: Optional['SymbolTable'] = None) -> List[str]:
+        """Formats the words from address lo up to hi as lines of disassembly (see disassembler.format_line)
+
+        :param lo: the address of the first word
+        :param hi: the address just past the last word
+        :param symbols: if given, branch and jump destinations are shown as symbols
+        :returns: The disassembly lines
+        """
+        indices = self._bounds(lo, hi)
+        return format_lines(self.base_address + 4 * indices.start, self.words(lo, hi), symbols)
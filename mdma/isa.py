@@ -0,0 +1,452 @@
+import math
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from mdma import op_formatting
+from mdma.op_formatting import (OpFormat, op_names, func_names, format_code, op_formats, register_names,
+                                register_numbers, fp_register_names, fp_register_numbers)
+
+
+# Kinds of control flow instructions
+BRANCH = 'branch'      # Conditional, PC-relative: continues at the target or the next instruction
+JUMP = 'jump'          # Unconditional, to a static target
+CALL = 'call'          # Links and continues at the target (unknown for jalr); returns to the next instruction
+INDIRECT = 'indirect'  # Jumps through a register - the target isn't known statically
+
+
+class Instruction(NamedTuple):
+    """The declarative definition of an instruction
+
+    :param mnemonic: the name of the instruction
+    :param op_format: the format of the instruction. The first name in its syntax is where the mnemonic goes, the
+            rest are the operands
+    :param encoding: the fixed values of the fields that identify the instruction (e.g. {'op': 0, 'func': 32})
+    :param flow: the kind of control flow of the instruction (BRANCH, JUMP, CALL, or INDIRECT), or None if it
+            continues with the next instruction. Its static target is its 'target' operand, or PC-relative from its
+            'immediate' operand
+    """
+
+    mnemonic: str
+    op_format: OpFormat
+    encoding: Dict[str, int]
+    flow: Optional[str] = None
+
+
+class Pseudo(NamedTuple):
+    """The declarative definition of a pseudo-instruction, which the assembler expands into real instructions
+
+    :param mnemonic: the name of the pseudo-instruction
+    :param operands: the names of its operands, in order
+    :param expansion: the instructions it expands into, as templates formatted with the operands. Operands named
+            'value' are also available as 'value_hi' and 'value_lo', their upper and lower (signed) 16 bits
+    """
+
+    mnemonic: str
+    operands: List[str]
+    expansion: List[str]
+
+
+class DispatchTable(NamedTuple):
+    """One level of the compiled decoder: the next entry is entries[(word >> shift) & mask]
+
+    :param shift: the position of the field selecting the entry
+    :param mask: the mask of the field (so there are mask + 1 entries)
+    :param entries: a compiled instruction, another DispatchTable, or None for undefined encodings
+    """
+
+    shift: int
+    mask: int
+    entries: List[Union['_Compiled', 'DispatchTable', None]]
+
+
+# Formats of the REGIMM, coprocessor, and FPU operations, in addition to op_formatting's R, I, J, and shift formats.
+# 'sub' and 'fmt' select the coprocessor operation, 'tf' selects the branch condition
+regimm_format = OpFormat(
+    format_type_char='I',
+    fields={'op': 6, 'rs': 5, 'rt': 5, 'immediate': 16},
+    syntax=['op', 'rs', 'immediate']
+)
+cop_move_format = OpFormat(
+    format_type_char='R',
+    fields={'op': 6, 'sub': 5, 'rt': 5, 'cs': 5, 'unused': 11},
+    syntax=['op', 'rt', 'cs']
+)
+cop_format = OpFormat(
+    format_type_char='R',
+    fields={'op': 6, 'sub': 5, 'unused': 15, 'func': 6},
+    syntax=['func']
+)
+fp_move_format = OpFormat(
+    format_type_char='R',
+    fields={'op': 6, 'sub': 5, 'rt': 5, 'fs': 5, 'unused': 11},
+    syntax=['op', 'rt', 'fs']
+)
+fp_r_format = OpFormat(
+    format_type_char='R',
+    fields={'op': 6, 'fmt': 5, 'ft': 5, 'fs': 5, 'fd': 5, 'func': 6},
+    syntax=['func', 'fd', 'fs', 'ft']
+)
+fp_unary_format = OpFormat(
+    format_type_char='R',
+    fields={'op': 6, 'fmt': 5, 'ft': 5, 'fs': 5, 'fd': 5, 'func': 6},
+    syntax=['func', 'fd', 'fs']
+)
+fp_compare_format = OpFormat(
+    format_type_char='R',
+    fields={'op': 6, 'fmt': 5, 'ft': 5, 'fs': 5, 'fd': 5, 'func': 6},
+    syntax=['func', 'fs', 'ft']
+)
+fp_branch_format = OpFormat(
+    format_type_char='I',
+    fields={'op': 6, 'sub': 5, 'tf': 5, 'immediate': 16},
+    syntax=['op', 'immediate']
+)
+fp_memory_format = OpFormat(
+    format_type_char='I',
+    fields={'op': 6, 'rs': 5, 'ft': 5, 'immediate': 16},
+    syntax=['op', 'ft', 'rs', 'immediate']
+)
+
+
+# Control flow of the instructions of func_and_opcodes.json
+_base_flows = {'beq': BRANCH, 'bne': BRANCH, 'blez': BRANCH, 'bgtz': BRANCH, 'bgez': BRANCH, 'j': JUMP, 'jal': CALL,
+               'jr': INDIRECT, 'jalr': CALL}
+
+
+def base_instructions() -> List[Instruction]:
+    """:returns: the instructions of func_and_opcodes.json, in op_formatting's R, I, J, and shift formats"""
+    definitions = []
+    for op, name in op_names.items():
+        if op != 0:  # 'special' is not an instruction itself, its func code determines the operation
+            definitions.append(Instruction(name, op_formats[format_code(op << 26)], {'op': op}, _base_flows.get(name)))
+    for func, name in func_names.items():
+        definitions.append(Instruction(name, op_formats[format_code(func)], {'op': 0, 'func': func},
+                                       _base_flows.get(name)))
+    return definitions
+
+
+# REGIMM (op code 1) branches, selected by the rt field
+regimm_instructions = [Instruction(name, regimm_format, {'op': 0b000001, 'rt': rt}, flow)
+                       for name, rt, flow in [('bltz', 0b00000, BRANCH), ('bgez', 0b00001, BRANCH),
+                                              ('bltzal', 0b10000, CALL), ('bgezal', 0b10001, CALL)]]
+
+# System control coprocessor (op code 16) operations
+cop0_instructions = [
+    Instruction('mfc0', cop_move_format, {'op': 0b010000, 'sub': 0b00000}),
+    Instruction('mtc0', cop_move_format, {'op': 0b010000, 'sub': 0b00100}),
+    Instruction('eret', cop_format, {'op': 0b010000, 'sub': 0b10000, 'func': 0b011000}),
+]
+
+# Floating point coprocessor (op code 17) operations and loads/stores. These replace the I format definitions of
+# lwc1 and swc1 from func_and_opcodes.json
+fpu_instructions = [
+    Instruction('mfc1', fp_move_format, {'op': 0b010001, 'sub': 0b00000}),
+    Instruction('mtc1', fp_move_format, {'op': 0b010001, 'sub': 0b00100}),
+    Instruction('bc1f', fp_branch_format, {'op': 0b010001, 'sub': 0b01000, 'tf': 0}, BRANCH),
+    Instruction('bc1t', fp_branch_format, {'op': 0b010001, 'sub': 0b01000, 'tf': 1}, BRANCH),
+    Instruction('lwc1', fp_memory_format, {'op': 0b110001}),
+    Instruction('ldc1', fp_memory_format, {'op': 0b110101}),
+    Instruction('swc1', fp_memory_format, {'op': 0b111001}),
+    Instruction('sdc1', fp_memory_format, {'op': 0b111101}),
+]
+_fp_operations = [('add', fp_r_format, 0b000000), ('sub', fp_r_format, 0b000001), ('mul', fp_r_format, 0b000010),
+                  ('div', fp_r_format, 0b000011), ('sqrt', fp_unary_format, 0b000100),
+                  ('abs', fp_unary_format, 0b000101), ('mov', fp_unary_format, 0b000110),
+                  ('neg', fp_unary_format, 0b000111), ('cvt.s', fp_unary_format, 0b100000),
+                  ('cvt.d', fp_unary_format, 0b100001), ('cvt.w', fp_unary_format, 0b100100),
+                  ('c.eq', fp_compare_format, 0b110010), ('c.lt', fp_compare_format, 0b111100),
+                  ('c.le', fp_compare_format, 0b111110)]
+for _fmt_name, _fmt in [('s', 0b10000), ('d', 0b10001), ('w', 0b10100)]:
+    for _name, _op_format, _func in _fp_operations:
+        if _fmt_name == 'w' and not _name.startswith('cvt.'):  # Words can only be converted
+            continue
+        if _name != f'cvt.{_fmt_name}':
+            fpu_instructions.append(Instruction(f'{_name}.{_fmt_name}', _op_format,
+                                                {'op': 0b010001, 'fmt': _fmt, 'func': _func}))
+
+# Pseudo-instructions, in the operand order of the instructions they expand into
+pseudo_instructions: Dict[str, Pseudo] = {pseudo.mnemonic: pseudo for pseudo in [
+    Pseudo('nop', [], ['sll $zero $zero 0']),
+    Pseudo('move', ['rd', 'rs'], ['addu {rd} {rs} $zero']),
+    Pseudo('not', ['rd', 'rs'], ['nor {rd} {rs} $zero']),
+    Pseudo('neg', ['rd', 'rs'], ['sub {rd} $zero {rs}']),
+    Pseudo('li', ['rt', 'value'], ['lui {rt} $zero {value_hi}', 'ori {rt} {rt} {value_lo}']),
+    Pseudo('b', ['label'], ['beq $zero $zero {label}']),
+    Pseudo('beqz', ['rs', 'label'], ['beq $zero {rs} {label}']),
+    Pseudo('bnez', ['rs', 'label'], ['bne $zero {rs} {label}']),
+]}
+
+
+def _render_register(value: int) -> str:
+    name = register_names[value]
+    if name is None:
+        raise ValueError(f'{value} is not a valid register number')
+    return name
+
+
+def _parse_register(instr_str: str, num_bits: int) -> int:
+    num = register_numbers.get(instr_str)
+    if num is None:
+        raise ValueError(f'UNKNOWN REGISTER: {instr_str}')
+    return num
+
+
+def _parse_fp_register(instr_str: str, num_bits: int) -> int:
+    num = fp_register_numbers.get(instr_str)
+    if num is None:
+        raise ValueError(f'UNKNOWN REGISTER: {instr_str}')
+    return num
+
+
+def _parse_cop_register(instr_str: str, num_bits: int) -> int:
+    num = int(instr_str[1:] if instr_str.startswith('$') else instr_str)
+    if not 0 <= num < (1 << num_bits):
+        raise ValueError(f'UNKNOWN REGISTER: {instr_str}')
+    return num
+
+
+def _parse_int(instr_str: str, num_bits: int) -> int:
+    val = int(instr_str)
+    if val != 0 and num_bits < math.ceil(math.log(abs(val), 2)):
+        raise ValueError(f'Value ({val}) too large to fit in {num_bits} bits')
+    return val & ((1 << num_bits) - 1)
+
+
+# Field name -> (renders the unsigned value of the field, parses its human-readable form into the unsigned value).
+# Fields not listed are unsigned decimal integers. 'cs' is a coprocessor 0 register, shown by number
+field_kinds: Dict[str, Tuple[Callable[[int], str], Callable[[str, int], int]]] = {
+    **dict.fromkeys(['rs', 'rt', 'rd'], (_render_register, _parse_register)),
+    **dict.fromkeys(['fs', 'ft', 'fd'], (fp_register_names.__getitem__, _parse_fp_register)),
+    'cs': (lambda value: f'${value}', _parse_cop_register),
+    'immediate': (lambda value: str(((value & 0xffff) ^ 0x8000) - 0x8000), _parse_int),
+    # Upper four bits of the program counter are assumed to be 0000, and the last two are 00
+    'target': (lambda value: '0x' + format(value << 2, '08x'),
+               lambda instr_str, num_bits: (int(instr_str, 16) >> 2) & ((1 << num_bits) - 1)),
+}
+_default_kind = (str, _parse_int)
+
+
+def _layout(op_format: OpFormat) -> Dict[str, Tuple[int, int]]:
+    """:returns: the (shift, number of bits) of each of the format's fields"""
+    layout, shift = {}, 32
+    for segment_name, bits in op_format.fields.items():
+        shift -= bits
+        layout[segment_name] = (shift, bits)
+    return layout
+
+
+class _Compiled:
+    """An instruction prepared for fast decoding and encoding - its fixed bits and the position, renderer, and parser
+    of each operand"""
+
+    __slots__ = ('instruction', 'fixed', 'fixed_word', 'selector', 'operands')
+
+    def __init__(self, instruction: Instruction):
+        layout = _layout(instruction.op_format)
+        self.instruction = instruction
+        self.fixed = []
+        self.fixed_word = 0
+        self.selector = 0  # Mask of the fixed bits
+        for segment_name, value in instruction.encoding.items():
+            shift, bits = layout[segment_name]
+            self.fixed.append((shift, (1 << bits) - 1))
+            self.fixed_word |= value << shift
+            self.selector |= ((1 << bits) - 1) << shift
+        self.operands = []
+        for segment_name in instruction.op_format.syntax[1:]:
+            shift, bits = layout[segment_name]
+            render, parse = field_kinds.get(segment_name, _default_kind)
+            self.operands.append((shift, (1 << bits) - 1, bits, render, parse))
+
+    def fixed_value(self, shift: int, mask: int) -> int:
+        return (self.fixed_word >> shift) & mask
+
+    def pack(self, params: List[str]) -> int:
+        word = self.fixed_word
+        for (shift, mask, bits, _, parse), param in zip(self.operands, params):
+            word |= (parse(param, bits) & mask) << shift
+        return word
+
+    def render(self, word: int) -> str:
+        mnemonic = self.instruction.mnemonic
+        if not self.operands:
+            return mnemonic
+        return mnemonic + ' ' + ' '.join([render((word >> shift) & mask)
+                                          for shift, mask, _, render, _ in self.operands])
+
+
+# Mnemonic -> definition of every instruction, and the compiled decoder: the entry for each of the 64 op codes
+instructions: Dict[str, Instruction] = {}
+opcode_table: List[Union[_Compiled, DispatchTable, None]] = [None] * 64
+_compiled: Dict[str, _Compiled] = {}
+# Op code -> mask of every field that selects an instruction with that op code
+selector_masks: List[int] = [0x3f << 26] * 64
+# Op code -> whether any instruction with that op code changes control flow
+flow_opcodes: List[bool] = [False] * 64
+
+
+def _compile(group: List[_Compiled], used: FrozenSet[Tuple[int, int]]) -> Union[_Compiled, DispatchTable]:
+    """Builds the decoder for instructions that agree on the fields already dispatched on
+
+    :param group: the instructions
+    :param used: the (shift, mask) of the fields already dispatched on
+    :returns: The instruction, if it's the only one and none of its fixed fields are left to check, or a table
+            dispatching on a fixed field shared by every instruction in the group
+    """
+    remaining = [[position for position in compiled.fixed if position not in used] for compiled in group]
+    if len(group) == 1 and not remaining[0]:
+        return group[0]
+    shared = [position for position in remaining[0] if all(position in r for r in remaining[1:])]
+    if not shared:
+        raise ValueError(f'Ambiguous encodings: {", ".join(c.instruction.mnemonic for c in group)}')
+    shift, mask = shared[0]
+    buckets: Dict[int, List[_Compiled]] = {}
+    for compiled in group:
+        buckets.setdefault(compiled.fixed_value(shift, mask), []).append(compiled)
+    entries: List[Union[_Compiled, DispatchTable, None]] = [None] * (mask + 1)
+    for value, bucket in buckets.items():
+        entries[value] = _compile(bucket, used | {(shift, mask)})
+    return DispatchTable(shift, mask, entries)
+
+
+def define_instructions(definitions: Iterable[Instruction]) -> None:
+    """Adds instructions to the ISA (e.g. an extension) and recompiles the decoder. A definition replaces any existing
+    instruction with the same mnemonic or the same fixed bits. Decoding stays one table lookup per level, no matter
+    how many instructions are defined.
+
+    :param definitions: the instructions to be added
+    :raises ValueError: if the definitions can't be told apart by their fixed fields
+    """
+    compiled_by_mnemonic = dict(_compiled)
+    for definition in definitions:
+        compiled = _Compiled(definition)
+        for mnemonic, existing in list(compiled_by_mnemonic.items()):
+            if mnemonic == definition.mnemonic or (existing.fixed_word, existing.selector) == \
+                    (compiled.fixed_word, compiled.selector):
+                del compiled_by_mnemonic[mnemonic]
+        compiled_by_mnemonic[definition.mnemonic] = compiled
+
+    table = _compile(list(compiled_by_mnemonic.values()), frozenset())
+    if not isinstance(table, DispatchTable) or (table.shift, table.mask) != (26, 0x3f):
+        raise ValueError('Every instruction must define its op code')
+    # Only replace the ISA once the new definitions are known to compile
+    _compiled.clear()
+    _compiled.update(compiled_by_mnemonic)
+    instructions.clear()
+    instructions.update((mnemonic, compiled.instruction) for mnemonic, compiled in compiled_by_mnemonic.items())
+    opcode_table[:] = table.entries
+    masks = [0x3f << 26] * 64  # The op code always selects
+    for compiled in _compiled.values():
+        masks[compiled.fixed_word >> 26] |= compiled.selector
+    selector_masks[:] = masks
+    flow_opcodes[:] = [False] * 64
+    for compiled in _compiled.values():
+        if compiled.instruction.flow is not None:
+            flow_opcodes[compiled.fixed_word >> 26] = True
+
+
+def _find(word: int) -> _Compiled:
+    """:returns: the compiled instruction of a word, found with one table lookup per dispatch level"""
+    if word >> 32:  # Also true for negative numbers
+        raise KeyError(f'Not a 32-bit word: {word:#x}')
+    entry = opcode_table[word >> 26]
+    while entry.__class__ is DispatchTable:
+        entry = entry.entries[(word >> entry.shift) & entry.mask]  # type: ignore
+    if entry is None:
+        raise KeyError(f'UNKNOWN OPERATION: 0x{word:08x}')
+    return entry  # type: ignore
+
+
+def lookup_instruction(word: int) -> Instruction:
+    """:returns: the definition of the instruction a 32-bit machine code word encodes (KeyError if unknown)"""
+    return _find(word).instruction
+
+
+def instruction_mnemonic(word: int) -> Optional[str]:
+    """:returns: the mnemonic of the instruction a 32-bit machine code word encodes, or None if it is unknown"""
+    try:
+        return _find(word).instruction.mnemonic
+    except KeyError:
+        return None
+
+
+def selector_key(word: int) -> int:
+    """:returns: the word with every bit that doesn't select its instruction cleared. Words of the same instruction
+            share a key, which can be passed to lookup_instruction"""
+    try:
+        return word & _find(word).selector
+    except KeyError:
+        return word & selector_masks[word >> 26]
+
+
+def format_name(op_format: Optional[OpFormat]) -> str:
+    """:returns: the name of a format - 'R', 'I', 'J', or 'shift' for op_formatting's formats, the name of this
+            module's format for the others (e.g. 'fp_r'), and '?' for None"""
+    if op_format is None:
+        return '?'
+    return _format_names.get(id(op_format), op_format.format_type_char)
+
+
+def jump_target(word: int, address: int) -> Optional[int]:
+    """:returns: the destination of a jump (e.g. j or jal) at the given address - its target field shifted left two
+            bits, under the upper four bits of the address of the following instruction - or None if the word isn't
+            a jump with a target field (KeyError if it is unknown)"""
+    compiled = _find(word)
+    if compiled.instruction.op_format.syntax[-1] != 'target':
+        return None
+    shift, mask = compiled.operands[-1][:2]
+    return ((address + 4) & 0xf0000000) | (((word >> shift) & mask) << 2)
+
+
+def decode_instruction(word: int) -> str:
+    """Decodes a 32-bit machine code word into its human-readable instruction string
+
+    :param word: the 32-bit machine code to be decoded
+    :returns: The human-readable instruction string
+    """
+    return _find(word).render(word)
+
+
+def encode_instruction(instruction_str: str) -> int:
+    """Encodes a human-readable instruction string into its 32-bit machine code word. Fields that aren't part of the
+    syntax are zero.
+
+    :param instruction_str: the instruction string to be encoded (commas are ignored)
+    :returns: The 32-bit machine code as an integer
+    """
+    mnemonic, *params = instruction_str.replace(',', ' ').split()
+    compiled = _compiled.get(mnemonic)
+    if compiled is None:
+        raise Exception(f'UNKNOWN OPERATION: {mnemonic}')
+    return compiled.pack(params)
+
+
+def expand_pseudo(instruction_str: str) -> List[str]:
+    """Expands a pseudo-instruction into the instructions it stands for
+
+    :param instruction_str: the instruction string (commas are ignored)
+    :returns: The instruction strings it expands into, or the instruction string itself if it isn't a pseudo-instruction
+    """
+    mnemonic, *params = instruction_str.replace(',', ' ').split()
+    pseudo = pseudo_instructions.get(mnemonic)
+    if pseudo is None:
+        return [instruction_str]
+    if len(params) != len(pseudo.operands):
+        raise ValueError(f'{mnemonic} takes {len(pseudo.operands)} operands: {" ".join(pseudo.operands)}')
+    values = dict(zip(pseudo.operands, params))
+    if 'value' in values:
+        value = int(values['value'], 0)
+        if not -(1 << 31) <= value < (1 << 32):
+            raise ValueError(f'Value ({value}) too large to fit in 32 bits')
+        values['value_hi'] = str((value >> 16) & 0xffff)
+        values['value_lo'] = str(((value & 0xffff) ^ 0x8000) - 0x8000)
+    return [template.format(**values) for template in pseudo.expansion]
+
+
+define_instructions(base_instructions() + regimm_instructions + cop0_instructions + fpu_instructions)
+
+_format_names: Dict[int, str] = {
+    **{id(getattr(op_formatting, f'{name}_format')): label
+       for name, label in [('r', 'R'), ('i', 'I'), ('j', 'J'), ('s', 'shift')]},
+    **{id(value): name[:-len('_format')] for name, value in list(globals().items())
+       if name.endswith('_format') and isinstance(value, OpFormat) and name[0] != '_'},
+}
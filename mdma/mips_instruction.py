@@ -1,76 +1,190 @@
-from typing import List, Optional
+from __future__ import annotations
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
+from mdma import profiling
 from mdma.op_formatting import OpFormat
 from mdma.data_segment import DataSegment
+from mdma.isa import Instruction, lookup_instruction, instructions, decode_instruction, encode_instruction, _find, \
+    _compiled, jump_target
 
 
 class MIPSInstruction:
     """An object representation of a MIPS instruction, including its human-readable string as well as encoded hex and binary.
 
-    Only accepts keyword arguments for hex, binary, or instruction string. The other two are automatically en/decoded.
+    Only accepts keyword arguments for hex, binary, instruction string, or integer word. The others are automatically
+    en/decoded. When decoding from an integer word, the hex and binary strings are only built if they are accessed.
 
     :param instruction_str: The human-readable instruction string
     :param hex_str: The hex string representation of the encoded instruction
     :param bin_str: The encoded 32-bit binary string
+    :param word: The encoded 32-bit machine code as an integer
     :param op_format: A named tuple representing the operation's formatting
     :param data_segments: A list of the machine code's data segments, in their order in the binary.
     :param ordered_data_segments: A list of the meaningful data segments in the order they are displayed in a human-readable string
     """
 
-    def __init__(self, *, hex_str: str = None, bin_str: str = None, instruction_str: str = None):
+    def __init__(self, *, hex_str: str = None, bin_str: str = None, instruction_str: str = None, word: int = None):
         self.instruction_str = instruction_str.replace(',', '') if instruction_str else None
-        self.hex_str = hex_str
-        self.bin_str = bin_str
+        self._hex_str = hex_str
+        self._bin_str = bin_str
+        self.word = word
         self.op_format: OpFormat = None  #type: ignore
         self.data_segments: List[DataSegment] = []
         self.ordered_data_segments: List[DataSegment] = []
         self._decode_or_encode()
 
+    @classmethod
+    def from_word(cls, word: int) -> MIPSInstruction:
+        """Decodes a 32-bit machine code word given as an integer
+
+        :param word: the 32-bit machine code to be decoded
+        :returns: The decoded instruction
+        """
+        return cls(word=word)
+
     def __str__(self) -> str:
         """:returns: the human-readable instruction string"""
         return str(self.instruction_str)
 
     def __index__(self) -> int:
         """:returns: the decimal value of the machine code hex string"""
-        if self.hex_str is None:
+        if self.word is None:
             raise ValueError("hex string is None")
-        return int(self.hex_str, 16)
+        return self.word
+
+    @property
+    def hex_str(self) -> Optional[str]:
+        """:returns: the hex string of the machine code, built on first access if decoded from an integer word"""
+        if self._hex_str is None and self.word is not None:
+            self._hex_str = '0x' + format(self.word, '08x')  # Padding to 8 hex digits
+        return self._hex_str
+
+    @hex_str.setter
+    def hex_str(self, hex_str: Optional[str]) -> None:
+        """Replaces the hex string, as when it was a plain attribute (the instruction isn't decoded again)"""
+        self._hex_str = hex_str
+
+    @property
+    def bin_str(self) -> Optional[str]:
+        """:returns: the 32-bit binary string of the machine code, built on first access if decoded from an integer word"""
+        if self._bin_str is None and self.word is not None:
+            self._bin_str = format(self.word, '032b')
+        return self._bin_str
+
+    @bin_str.setter
+    def bin_str(self, bin_str: Optional[str]) -> None:
+        """Replaces the binary string, as when it was a plain attribute (the instruction isn't decoded again)"""
+        self._bin_str = bin_str
 
     def _decode_or_encode(self) -> None:
-        """Determines and performs the necessary operation based on the input"""
+        """Determines and performs the necessary operation based on the input, timing each stage if profiling is
+        enabled"""
+        if profiling.active is None:
+            self._run_stages(None)
+        else:
+            with profiling.active.time('encode' if self.instruction_str is not None else 'decode') as timer:
+                self._run_stages(timer)
+
+    def _run_stages(self, timer: Optional[profiling.StageTimer]) -> None:
+        """Parses the input, then decodes or encodes it
+
+        :param timer: if given, it is lapped at the end of each stage
+        """
         if self.instruction_str is not None:  # The instruction string has been given
-            self._encode()
-        elif self.bin_str is not None:  # the binary string has been given
-            self.hex_str = hex((int(self.bin_str, 2)))
-            self._decode()
-        elif self.hex_str:
-            self.hex_str = self.hex_str.replace(' ', '')
-            if not self.hex_str.startswith('0x'):
-                self.hex_str = '0x' + self.hex_str
-            self.bin_str = bin(int(self.hex_str, 16))[2:].zfill(32)
-            self._decode()
+            self._encode(timer)
+            return
+        if self.word is None:
+            if self._bin_str is not None:  # the binary string has been given
+                self.word = int(self._bin_str, 2)
+                self._hex_str = hex(self.word)
+            elif self._hex_str:
+                self._hex_str = self._hex_str.replace(' ', '')
+                if not self._hex_str.startswith('0x'):
+                    self._hex_str = '0x' + self._hex_str
+                self.word = int(self._hex_str, 16)
+            else:
+                raise RuntimeError("No instruction string, binary string, or hex string to decode or encode")
+            if timer is not None:
+                timer.lap('parse')
+        self._decode(timer)
+
+    def _decode(self, timer: Optional[profiling.StageTimer] = None) -> None:
+        """Decodes the machine code word into the human-readable instruction"""
+        if _decode_cache is not None:
+            self.op_format, data_segments, ordered_data_segments, self.instruction_str = _decode_cache(self.word)
+            self.data_segments, self.ordered_data_segments = list(data_segments), list(ordered_data_segments)
+            if timer is not None:
+                timer.op_format = self.op_format
+                timer.lap('cache')
         else:
-            raise RuntimeError("No instruction string, binary string, or hex string to decode or encode")
-
-    def _decode(self) -> None:
-        """Decodes the machine code (in either binary or hex) into the human-readable instruction"""
-        self.op_format = OpFormat.from_32bit_binary_string(self.bin_str)  #type: ignore
-        start = 0
-        for segment_name, bits in self.op_format.fields.items():
-            end = start + bits
-            bin_str = self.bin_str[start:end]  #type: ignore
-            self.data_segments.append(DataSegment(segment_name, bin_str))
-            start = end
+            self._decode_uncached(timer)
+
+    def _decode_uncached(self, timer: Optional[profiling.StageTimer] = None) -> None:
+        """Decodes the machine code word into the human-readable instruction, building new data segments"""
+        instruction = lookup_instruction(self.word)  #type: ignore
+        if timer is not None:
+            timer.op_format = instruction.op_format
+            timer.lap('lookup')
+        self._decode_segments(instruction)
+        if timer is not None:
+            timer.lap('segments')
+        self.instruction_str = ' '.join([str(d) for d in self.ordered_data_segments])
+        if timer is not None:
+            timer.lap('format')
+
+    def _decode_segments(self, instruction: Instruction) -> None:
+        """Builds the data segments of the machine code word, in their order in the binary and in the instruction
+        string"""
+        self.op_format = instruction.op_format
+        for segment_name, value in self.op_format.unpack(self.word).items():  #type: ignore
+            self.data_segments.append(DataSegment.from_int(segment_name, value, self.op_format.fields[segment_name]))
         critical_segments = [d for d in self.data_segments if d.name in self.op_format.syntax]
         self.ordered_data_segments = list(sorted(critical_segments, key=lambda d: self.op_format.syntax.index(d.name)))
-        self.instruction_str = ' '.join([str(d) for d in self.ordered_data_segments])
+        self.ordered_data_segments[0].human_readable = instruction.mnemonic  # e.g. REGIMM ops are selected by rt
 
-    def _encode(self) -> None:
+    def _encode(self, timer: Optional[profiling.StageTimer] = None) -> None:
         """Encodes the human-readable instruction string into both binary and hex machine code"""
+        if _encode_cache is not None:
+            key = _cache_key(self.instruction_str)  #type: ignore
+            self.op_format, data_segments, ordered_data_segments, self._bin_str, self.word = _encode_cache(key)
+            self.data_segments, self.ordered_data_segments = list(data_segments), list(ordered_data_segments)
+            self._hex_str = '0x' + format(self.word, '08x')
+            if timer is not None:
+                timer.op_format = self.op_format
+                timer.lap('cache')
+        else:
+            self._encode_uncached(timer)
+
+    def _encode_uncached(self, timer: Optional[profiling.StageTimer] = None) -> None:
+        """Encodes the human-readable instruction string into both binary and hex machine code, building new data
+        segments"""
         instruction_params = self.instruction_str.split()  #type: ignore
-        instruction = instruction_params[0]
+        if timer is not None:
+            timer.lap('parse')
+        instruction = self._lookup_instruction(instruction_params[0])
+        if timer is not None:
+            timer.op_format = instruction.op_format
+            timer.lap('lookup')
+        self._encode_segments(instruction, instruction_params)
+        if timer is not None:
+            timer.lap('segments')
+        self.word = int(self._bin_str, 2)  #type: ignore
+        self._hex_str = '0x' + hex(self.word)[2:].zfill(8)  # Padding to 8 hex digits
+        if timer is not None:
+            timer.lap('format')
+
+    @staticmethod
+    def _lookup_instruction(mnemonic: str) -> Instruction:
+        """:returns: the definition of the instruction with the given mnemonic"""
+        if mnemonic not in instructions:
+            raise Exception(f'UNKNOWN OPERATION: {mnemonic}')
+        return instructions[mnemonic]
+
+    def _encode_segments(self, instruction: Instruction, instruction_params: List[str]) -> None:
+        """Builds the data segments and binary string of the instruction from its mnemonic and operands"""
         data_segments = {}
-        self.op_format = OpFormat.from_instruction_str(instruction)
+        self.op_format = instruction.op_format
 
         # Making a dictionary of data segments using the syntax of the OpFormat and the instruction string
         for segment_name, instr_str in zip(self.op_format.syntax, instruction_params):
@@ -83,9 +197,179 @@ class MIPSInstruction:
         for segment_name in self.op_format.fields:
             if segment_name in data_segments:
                 segment_bits = data_segments[segment_name].bin_str
-            else:  # segments not actually in use should just be zeroes
-                segment_bits = '0'*self.op_format.fields[segment_name]
+            else:  # segments not actually in use should just be zeroes, unless they identify the instruction
+                num_bits = self.op_format.fields[segment_name]
+                segment_bits = format(instruction.encoding.get(segment_name, 0), f'0{num_bits}b')
             self.data_segments.append(DataSegment(name=segment_name, bin_str=segment_bits))
+            if segment_name == self.op_format.syntax[0]:
+                self.data_segments[-1].human_readable = instruction.mnemonic
             bin_str += segment_bits  #type: ignore
-        self.bin_str = bin_str
-        self.hex_str = '0x' + hex(int(self.bin_str, 2))[2:].zfill(8)  # Padding to 8 hex digits
+        self._bin_str = bin_str
+
+
+def decode_word(word: int, address: Optional[int] = None) -> str:
+    """Decodes a 32-bit machine code word straight into its human-readable instruction string, without building
+    binary strings or data segments.
+
+    :param word: the 32-bit machine code to be decoded
+    :param address: the address of the word. If given, jump targets include the upper four bits of the program
+            counter (see isa.jump_target) rather than assuming they are 0000
+    :returns: The human-readable instruction string
+    """
+    if profiling.active is not None:
+        instruction_str = _decode_word_profiled(word, profiling.active)
+    elif _decode_cache is not None:
+        instruction_str = _decode_cache(word).instruction_str
+    else:
+        instruction_str = decode_instruction(word)
+    if address is not None and (address + 4) & 0xf0000000:  # The target is only different outside the first region
+        target = jump_target(word, address)
+        if target is not None:  # The target is the last operand
+            instruction_str = f'{instruction_str.rsplit(" ", 1)[0]} 0x{target:08x}'
+    return instruction_str
+
+
+def encode_word(instruction_str: str) -> int:
+    """Encodes a human-readable instruction string straight into its 32-bit machine code word, without building
+    binary strings or data segments.
+
+    :param instruction_str: the instruction string to be encoded
+    :returns: The 32-bit machine code as an integer
+    """
+    if profiling.active is not None:
+        return _encode_word_profiled(instruction_str, profiling.active)
+    if _encode_cache is not None:
+        return _encode_cache(_cache_key(instruction_str)).word
+    return encode_instruction(instruction_str)
+
+
+def _decode_word_profiled(word: int, profiler: profiling.Profiler) -> str:
+    """Performs the same steps as decode_word, timing the lookup of the instruction and the formatting of its string"""
+    with profiler.time('decode') as timer:
+        if _decode_cache is not None:
+            parts = _decode_cache(word)
+            timer.op_format = parts.op_format
+            timer.lap('cache')
+            return parts.instruction_str
+        compiled = _find(word)
+        timer.op_format = compiled.instruction.op_format
+        timer.lap('lookup')
+        instruction_str = compiled.render(word)
+        timer.lap('format')
+        return instruction_str
+
+
+def _encode_word_profiled(instruction_str: str, profiler: profiling.Profiler) -> int:
+    """Performs the same steps as encode_word, timing the tokenizing of the string, the lookup of the instruction, and
+    the packing of its operands"""
+    with profiler.time('encode') as timer:
+        if _encode_cache is not None:
+            parts = _encode_cache(_cache_key(instruction_str))
+            timer.op_format = parts.op_format
+            timer.lap('cache')
+            return parts.word
+        mnemonic, *params = instruction_str.replace(',', ' ').split()
+        timer.lap('parse')
+        compiled = _compiled.get(mnemonic)
+        if compiled is None:
+            raise Exception(f'UNKNOWN OPERATION: {mnemonic}')
+        timer.op_format = compiled.instruction.op_format
+        timer.lap('lookup')
+        word = compiled.pack(params)
+        timer.lap('pack')
+        return word
+
+
+def _cache_key(instruction_str: str) -> str:
+    """:returns: the instruction string normalized like encode_instruction tokenizes it (commas separate operands too),
+            so equivalent strings share a cache entry"""
+    return ' '.join(instruction_str.replace(',', ' ').split())
+
+
+class _SharedDataSegment(DataSegment):
+    """A data segment of a cached result. It is shared by every instruction decoded or encoded from the same input, so
+    it can't be modified"""
+
+    def __setattr__(self, name, value):
+        if name != '_bin_str':  # Built on first access
+            raise AttributeError('Data segments of cached results are shared and read-only')
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError('Data segments of cached results are shared and read-only')
+
+
+def _share(data_segments: List[DataSegment]) -> Tuple[DataSegment, ...]:
+    """:returns: the data segments, made read-only to be cached"""
+    for data_segment in data_segments:
+        if data_segment.__class__ is not _SharedDataSegment:  # Decoded instructions' ordered segments are shared too
+            data_segment.__class__ = _SharedDataSegment
+    return tuple(data_segments)
+
+
+class _DecodedParts(NamedTuple):
+    """The result of decoding a word, shared by every MIPSInstruction decoded from it while the cache is enabled"""
+
+    op_format: OpFormat
+    data_segments: Tuple[DataSegment, ...]
+    ordered_data_segments: Tuple[DataSegment, ...]
+    instruction_str: str
+
+
+class _EncodedParts(NamedTuple):
+    """The result of encoding an instruction string, shared by every MIPSInstruction encoded from it while the cache
+    is enabled"""
+
+    op_format: OpFormat
+    data_segments: Tuple[DataSegment, ...]
+    ordered_data_segments: Tuple[DataSegment, ...]
+    bin_str: str
+    word: int
+
+
+def _decode_parts(word: int) -> _DecodedParts:
+    """:returns: the parts of a newly decoded MIPSInstruction, to be cached"""
+    mi = MIPSInstruction.__new__(MIPSInstruction)
+    mi.word, mi.data_segments = word, []
+    mi._decode_uncached()
+    return _DecodedParts(mi.op_format, _share(mi.data_segments), _share(mi.ordered_data_segments),
+                         mi.instruction_str)  #type: ignore
+
+
+def _encode_parts(instruction_str: str) -> _EncodedParts:
+    """:returns: the parts of a newly encoded MIPSInstruction, to be cached"""
+    mi = MIPSInstruction.__new__(MIPSInstruction)
+    mi.instruction_str, mi.data_segments = instruction_str, []
+    mi._encode_uncached()
+    return _EncodedParts(mi.op_format, _share(mi.data_segments), _share(mi.ordered_data_segments), mi._bin_str,
+                         mi.word)  #type: ignore
+
+
+# LRU caches of decoded words and encoded instruction strings. None while caching is disabled (the default)
+_decode_cache: Optional[Callable[[int], _DecodedParts]] = None
+_encode_cache: Optional[Callable[[str], _EncodedParts]] = None
+
+
+def enable_cache(maxsize: int = 4096) -> None:
+    """Enables bounded LRU caching of decoding (keyed on the 32-bit word) and encoding (keyed on the normalized
+    instruction string). Repeated words and instructions then share one result rather than being parsed again - the
+    data segments of cached results are shared between instructions, so they are read-only.
+
+    Calling this again resizes (and clears) the caches.
+
+    :param maxsize: the maximum number of results kept by each cache
+    """
+    global _decode_cache, _encode_cache
+    _decode_cache, _encode_cache = lru_cache(maxsize)(_decode_parts), lru_cache(maxsize)(_encode_parts)
+
+
+def disable_cache() -> None:
+    """Disables (and clears) the decoding and encoding caches"""
+    global _decode_cache, _encode_cache
+    _decode_cache = _encode_cache = None
+
+
+def cache_info() -> Dict[str, Optional[Any]]:
+    """:returns: the hits, misses, maxsize, and current size of the 'decode' and 'encode' caches (None if disabled)"""
+    return {'decode': _decode_cache.cache_info() if _decode_cache else None,  # type: ignore
+            'encode': _encode_cache.cache_info() if _encode_cache else None}  # type: ignore
@@ -1,8 +1,9 @@
 from __future__ import annotations
 import os
-import json
 from enum import Enum
-from typing import NamedTuple, Dict, List
+from typing import NamedTuple, Dict, List, Optional
+
+from mdma import _codes
 
 
 class OpFormat(NamedTuple):
@@ -29,21 +30,27 @@ class OpFormat(NamedTuple):
         func_bits = binary_string[26:]
         return OpFormat.from_op_and_func(op_bits, func_bits)
 
+    @staticmethod
+    def from_word(word: int) -> OpFormat:
+        """Parses the operation format of a 32-bit machine code word from its 'op' and 'func' bits, using integer
+        shifts and masks rather than a binary string.
+
+        :param word: the 32-bit machine code as an integer
+        :returns: The (pre-defined) OpFormat
+        """
+        return op_formats[format_code(word)]
+
     @staticmethod
     def from_instruction_str(instr_str: str) -> OpFormat:
-        """Determines the values of the 'op' and 'func' bits of the given instruction and uses them to
-        parse the operation format.
+        """Looks up the operation format of the given instruction in the ISA (see isa.instructions)
 
-        :param instr_str: the human-readable instruction string to be parsed
+        :param instr_str: the mnemonic of the instruction (e.g. 'add' or 'add.s')
         :returns: The (pre-defined) OpFormat
         """
-        if instr_str in codes['op'].values():
-            op_bits = next((bin_str for bin_str, op_name in codes['op'].items() if op_name == instr_str))
-            func_bits = None
-        else:  # This is a special operation with a func code
-            op_bits = '000000'
-            func_bits = next((bin_str for bin_str, func_name in codes['func'].items() if func_name == instr_str), None)
-        return OpFormat.from_op_and_func(op_bits=op_bits, func_bits=func_bits)
+        from mdma.isa import instructions
+        if instr_str not in instructions:
+            raise Exception(f'UNKNOWN OPERATION: {instr_str}')
+        return instructions[instr_str].op_format
 
     @staticmethod
     def from_op_and_func(op_bits: str, func_bits: str = None) -> OpFormat:
@@ -54,19 +61,42 @@ class OpFormat(NamedTuple):
         :param func_bits: the 6 bits defining the instruction's function, if needed
         :returns: The (pre-defined) OpFormat
         """
-        if op_bits == '000000':
+        op = int(op_bits, 2)
+        if op == 0:
             if not func_bits:
                 raise Exception(f'Op bits (000000) indicate this is a special R-type operation'
                                 f'but function bits were not provided')
-            if func_bits in ["000000", "000100", "000011", "000111", "000010", "000110"]:  # A shifting operation
-                return s_format
-            else:
-                return r_format
-        elif op_bits in ['000010', '000011']:
-            return j_format
-        else:  # Anything not specified is assumed to be an I format operation
-            return i_format
+            return op_formats[_func_format_codes[int(func_bits, 2)]]
+        return op_formats[_op_format_codes[op]]
+
+    def unpack(self, word: int) -> Dict[str, int]:
+        """Splits a 32-bit machine code word into the unsigned value of each of this format's fields.
+
+        :param word: the 32-bit machine code as an integer
+        :returns: A mapping of each field name to its (unsigned) integer value, in binary order
+        """
+        values = {}
+        shift = 32
+        for segment_name, bits in self.fields.items():
+            shift -= bits
+            values[segment_name] = (word >> shift) & ((1 << bits) - 1)
+        return values
 
+    def pack(self, values: Dict[str, int]) -> int:
+        """Combines the unsigned values of this format's fields into a 32-bit machine code word. Fields that aren't
+        given are zero.
+
+        :param values: A mapping of field names to their (unsigned) integer values
+        :returns: The 32-bit machine code as an integer
+        """
+        word = 0
+        for segment_name, bits in self.fields.items():
+            word = (word << bits) | (values.get(segment_name, 0) & ((1 << bits) - 1))
+        return word
+
+
+# Func codes of the shifting operations (sll, sllv, sra, srav, srl, srlv)
+shift_func_codes = frozenset({0b000000, 0b000100, 0b000011, 0b000111, 0b000010, 0b000110})
 
 # Represents R format operations
 r_format = OpFormat(
@@ -96,9 +126,55 @@ s_format = OpFormat(
     syntax=["func", "rs", "rt", "shamt"]
 )
 
-_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'func_and_opcodes.json')
-with open(_path, 'r') as yf:
-    codes = json.load(yf)
+# The pre-defined formats, indexed by their numeric format code (used by the batch decoders)
+op_formats: List[OpFormat] = [r_format, i_format, j_format, s_format]
+R_FORMAT, I_FORMAT, J_FORMAT, S_FORMAT = range(len(op_formats))
+
+
+def format_code(word: int) -> int:
+    """Determines the format of a 32-bit machine code word from its 'op' and 'func' bits, using the same rules as
+    OpFormat.from_op_and_func. Only the R, I, J, and shift formats are told apart - the format of any instruction,
+    including the REGIMM, coprocessor, and FPU ones, is isa.lookup_instruction(word).op_format.
+
+    :param word: the 32-bit machine code as an integer
+    :returns: The format code (index into op_formats) of the word
+    """
+    op = word >> 26
+    return _func_format_codes[word & 0x3f] if op == 0 else _op_format_codes[op]
+
+
+# Format code of each op code, and of each func code of the special op code (0). Anything not listed is assumed to
+# be an I format operation - see isa.py for the formats of the REGIMM, coprocessor, and FPU operations
+_op_format_codes: List[int] = [R_FORMAT if op == 0 else J_FORMAT if op in [0b000010, 0b000011] else I_FORMAT
+                               for op in range(64)]
+_func_format_codes: List[int] = [S_FORMAT if func in shift_func_codes else R_FORMAT for func in range(64)]
+
+
+# func_and_opcodes.json is the source of the opcode tables, but it is precompiled into _codes.py so it doesn't need
+# to be parsed on every start. Run `python -m mdma.op_formatting` to regenerate _codes.py after editing the JSON.
+_json_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'func_and_opcodes.json')
+_codes_module_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), '_codes.py')
+codes: Dict[str, Dict[str, str]] = _codes.codes
+
+
+def load_codes_json() -> Dict[str, Dict[str, str]]:
+    """:returns: the opcode tables parsed from func_and_opcodes.json"""
+    import json
+    with open(_json_path, 'r') as yf:
+        return json.load(yf)
+
+
+def generate_codes_module() -> str:
+    """:returns: the source of _codes.py, generated from func_and_opcodes.json. Tables and codes are kept in the
+            JSON's order"""
+    lines = ['# Generated from func_and_opcodes.json by `python -m mdma.op_formatting` - do not edit by hand',
+             'codes = {']
+    for table_name, table in load_codes_json().items():
+        lines.append(f'    {table_name!r}: {{')
+        lines.extend(f'        {bin_str!r}: {name!r},' for bin_str, name in table.items())
+        lines.append('    },')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
 
 
 class Registers(Enum):
@@ -147,9 +223,41 @@ class Registers(Enum):
                 are acceptable
         :returns: The register number corresponding to the register name given
         """
-        if register_name.startswith('$'):
-            register_name = register_name[1:]
-        if register_name.isdigit():  # Register name with number e.g. $4 which is a0
-            return Registers(int(register_name)).value
-        else:
-            return Registers[register_name].value
+        register_num = register_numbers.get(register_name)
+        if register_num is None:
+            raise ValueError(f'UNKNOWN REGISTER: {register_name}')
+        return register_num
+
+    @staticmethod
+    def register_name(register_num: int) -> str:
+        """Looks up the human-readable name of a register from its number
+
+        :param register_num: the number of the register
+        :returns: The register name, including the leading $
+        """
+        name = register_names[register_num] if 0 <= register_num < len(register_names) else None
+        if name is None:
+            raise ValueError(f'{register_num} is not a valid register number')
+        return name
+
+
+# Integer-keyed lookup tables, built once so encoding and decoding never scan 'codes'
+op_names: Dict[int, str] = {int(bin_str, 2): op_name for bin_str, op_name in codes['op'].items()}
+func_names: Dict[int, str] = {int(bin_str, 2): func_name for bin_str, func_name in codes['func'].items()}
+
+# Register number -> $name (None for numbers without a register), and every accepted spelling -> register number
+register_names: List[Optional[str]] = [None] * 32
+register_numbers: Dict[str, int] = {}
+for _register in Registers:
+    register_names[_register.value] = str(_register)
+    for _spelling in [_register.name, str(_register.value)]:
+        register_numbers[_spelling] = register_numbers['$' + _spelling] = _register.value
+
+# Floating point register number -> $fN, and every accepted spelling ($fN or fN) -> register number
+fp_register_names: List[str] = [f'$f{num}' for num in range(32)]
+fp_register_numbers: Dict[str, int] = {spelling: num for num in range(32) for spelling in [f'$f{num}', f'f{num}']}
+
+
+if __name__ == '__main__':
+    with open(_codes_module_path, 'w') as f:
+        f.write(generate_codes_module())
@@ -0,0 +1,144 @@
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Deque, Iterator, List, Optional, Union
+
+from mdma.disassembler import DEFAULT_CHUNK_SIZE, format_lines, locate_machine_code, words_from_bytes
+
+if TYPE_CHECKING:
+    from mdma.symbols import SymbolTable
+
+# The buffer each worker process decodes from, and the symbols it resolves destinations with, set once per process
+# by _init_worker
+_worker_buffer: Union[bytes, mmap.mmap, None] = None
+_worker_symbols: Optional['SymbolTable'] = None
+
+
+def _init_worker(source: Union[str, bytes], symbols: Optional['SymbolTable'] = None) -> None:
+    """Gives a worker process access to the input, memory-mapping it if it is a file path
+
+    :param source: path of the file to be memory-mapped, or the buffer itself
+    :param symbols: the symbols to show branch and jump destinations as, if any
+    """
+    global _worker_buffer, _worker_symbols
+    _worker_symbols = symbols
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            _worker_buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+        _worker_buffer = source
+
+
+def _decode_range(start: int, end: int, byteorder: str, address: int) -> List[str]:
+    """Disassembles the words in the worker's buffer between two byte offsets
+
+    :param start: the byte offset of the first word
+    :param end: the byte offset just past the last word
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :param address: the address of the first word
+    :returns: The disassembly lines of the range
+    """
+    words = words_from_bytes(_worker_buffer[start:end], byteorder)  # type: ignore
+    return format_lines(address, words, _worker_symbols)
+
+
+def _stats_range(start: int, end: int, byteorder: str):
+    """Counts the instruction mix of the words in the worker's buffer between two byte offsets"""
+    from mdma.stats import InstructionStats
+    return InstructionStats().update(words_from_bytes(_worker_buffer[start:end], byteorder))  # type: ignore
+
+
+def _check_range_size(range_size: int) -> None:
+    """Makes sure ranges are split on word boundaries and there is at least one word per range"""
+    if range_size <= 0 or range_size % 4:
+        raise ValueError(f'Range size must be a positive multiple of 4 bytes, not {range_size}')
+
+
+def decode_parallel(buffer: Union[str, bytes], workers: Optional[int] = None, byteorder: str = 'big',
+                    base_address: int = 0, offset: int = 0, size: Optional[int] = None,
+                    range_size: int = DEFAULT_CHUNK_SIZE,
+                    symbols: Optional['SymbolTable'] = None) -> Iterator[List[str]]:
+    """Disassembles raw machine code across several processes. The input is split into word-aligned ranges, and only
+    the offsets of each range are sent to the workers, which read from a memory-mapped file (or their own copy of the
+    buffer). The output is identical to disassembling the input serially.
+
+    :param buffer: path of the file to be memory-mapped, or the raw machine code
+    :param workers: the number of worker processes. Defaults to the number of CPUs
+    :param byteorder: the byte order of the words, either 'big' or 'little'
+    :param base_address: the address of the first word
+    :param offset: the byte offset in the buffer to start disassembling at
+    :param size: the number of bytes to disassemble, or None to disassemble until the end of the buffer
+    :param range_size: the number of bytes decoded by a worker at a time, a positive multiple of 4
+    :param symbols: if given, branch and jump destinations are shown as symbols (sent to each worker once)
+    :returns: An iterator of chunks of disassembly lines, in address order
+    :raises ValueError: if the range size isn't a positive multiple of 4
+    """
+    workers = workers or os.cpu_count() or 1
+    total = os.path.getsize(buffer) if isinstance(buffer, str) else len(buffer)
+    end = total if size is None else min(offset + size, total)
+    end -= (end - offset) % 4  # Trailing bytes that don't make up a full word are ignored
+    _check_range_size(range_size)
+    if end <= offset:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(buffer, symbols)) as executor:
+        pending: Deque = deque()
+        for start in range(offset, end, range_size):
+            stop = min(start + range_size, end)
+            pending.append(executor.submit(_decode_range, start, stop, byteorder, base_address + start - offset))
+            if len(pending) >= 4 * workers:  # Bounds the number of decoded ranges held in memory
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def disassemble_file_parallel(path: str, input_format: str = 'auto', byteorder: Optional[str] = None,
+                              base_address: Optional[int] = None, workers: Optional[int] = None,
+                              symbols: Optional['SymbolTable'] = None) -> Iterator[List[str]]:
+    """Disassembles a raw binary or ELF file across several processes. Takes the same arguments as
+    disassembler.disassemble_stream (hex dumps aren't supported, as they can't be split into fixed-size ranges).
+
+    :param path: path of the file to be disassembled
+    :param input_format: one of 'auto', 'binary', or 'elf'
+    :param byteorder: the byte order of the words, either 'big' or 'little'. Defaults to the ELF file's byte order,
+            or 'big' for raw binaries
+    :param base_address: the address of the first word. Defaults to the .text load address for ELF files, or 0
+    :param workers: the number of worker processes. Defaults to the number of CPUs
+    :param symbols: if given, branch and jump destinations are shown as symbols
+    :returns: An iterator of chunks of disassembly lines, in address order
+    """
+    offset, size, addr, elf_byteorder = locate_machine_code(path, input_format)
+    return decode_parallel(path, workers, byteorder or elf_byteorder, addr if base_address is None else base_address,
+                           offset, size, symbols=symbols)
+
+
+def collect_stats_parallel(path: str, input_format: str = 'auto', byteorder: Optional[str] = None,
+                           workers: Optional[int] = None, range_size: int = 1 << 22):
+    """Counts the instruction mix of a raw binary or ELF file across several processes, merging the counts of each
+    range as they complete
+
+    :param path: path of the file to be counted
+    :param input_format: one of 'auto', 'binary', or 'elf'
+    :param byteorder: the byte order of the words, either 'big' or 'little'. Defaults to the ELF file's byte order,
+            or 'big' for raw binaries
+    :param workers: the number of worker processes. Defaults to the number of CPUs
+    :param range_size: the number of bytes counted by a worker at a time, a positive multiple of 4
+    :returns: The merged InstructionStats of the whole file
+    :raises ValueError: if the range size isn't a positive multiple of 4
+    """
+    from mdma.stats import InstructionStats
+
+    offset, size, _, elf_byteorder = locate_machine_code(path, input_format)
+    end = os.path.getsize(path) if size is None else offset + size
+    end -= (end - offset) % 4
+    _check_range_size(range_size)
+    stats = InstructionStats()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_init_worker,
+                             initargs=(path,)) as executor:
+        futures = [executor.submit(_stats_range, start, min(start + range_size, end), byteorder or elf_byteorder)
+                   for start in range(offset, end, range_size)]
+        for future in futures:
+            stats.merge(future.result())
+    return stats
+
@@ -0,0 +1,170 @@
+import json
+from itertools import count, repeat
+from json.encoder import encode_basestring  # type: ignore
+from typing import Iterable, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+from mdma.mips_instruction import decode_word, encode_word
+
+OUTPUT_FORMATS = ['text', 'plain', 'jsonl']
+
+# Approximate number of characters read from the input (and so written to the output) at a time
+DEFAULT_READ_SIZE = 1 << 20
+
+OPERATIONS = ['decode', 'encode']
+
+
+class LineResult(NamedTuple):
+    """The outcome of decoding or encoding one input line
+
+    :param line_number: the (1-based) number of the line in the input
+    :param operation: 'decode' or 'encode', or None if the line didn't name a valid operation
+    :param input_str: the hex machine code or instruction string, without the operation prefix
+    :param result: the instruction string (decode) or padded hex machine code (encode), or None if it failed
+    :param error: the reason it failed, or None
+    """
+
+    line_number: int
+    operation: Optional[str]
+    input_str: str
+    result: Optional[str]
+    error: Optional[str]
+
+
+_format_hex = '0x{:08x}'.format
+
+# Output templates of _format_batch, filled in by str.format: (input, word, result) for text, and (line number, input,
+# result) for JSON lines
+_batch_templates = {
+    ('decode', 'text'): '=======\nMachine Code: {}\nBinary: {:032b}\nDECODED: {}\n=======\n',
+    ('encode', 'text'): '=======\nInstruction String: {}\nBinary: {:032b}\nENCODED: 0x{:08x}\n=======\n',
+    ('decode', 'jsonl'): '{{"line": {}, "op": "decode", "input": {}, "result": {}}}',
+    ('encode', 'jsonl'): '{{"line": {}, "op": "encode", "input": {}, "result": "0x{:08x}"}}',
+}
+
+
+def process_lines(lines: Sequence[str], operation: Optional[str] = None, first_line_number: int = 1) -> \
+        List[LineResult]:
+    """Decodes or encodes a batch of lines. A line that fails is reported in its result rather than stopping the
+    batch. Blank lines are skipped.
+
+    :param lines: the input lines
+    :param operation: 'decode' or 'encode'. If None, each line starts with its operation (e.g. 'decode 0x00000000')
+    :param first_line_number: the line number of the first line, so results can refer to lines of the whole input
+    :returns: The result of each non-blank line
+    """
+    results = []
+    for line_number, line in enumerate(lines, first_line_number):
+        input_str, line_operation = line.strip(), operation
+        if not input_str:
+            continue
+        if line_operation is None:
+            line_operation, _, input_str = input_str.partition(' ')
+            input_str = input_str.strip()
+            if line_operation not in OPERATIONS:
+                results.append(LineResult(line_number, None, input_str, None,
+                                          'INVALID OPERATION. Format: {encode, decode} input (e.g. decode 0x00000000)'))
+                continue
+        try:
+            if line_operation == 'decode':
+                result = decode_word(int(input_str.replace(' ', ''), 16))
+            else:
+                result = _format_hex(encode_word(input_str))
+        except Exception as e:  # Reported per line, e.g. an unknown operation, register, or malformed number
+            results.append(LineResult(line_number, line_operation, input_str, None,
+                                      str(e.args[0]) if e.args else type(e).__name__))
+        else:
+            results.append(LineResult(line_number, line_operation, input_str, result, None))
+    return results
+
+
+def format_results(results: Iterable[LineResult], output_format: str = 'text') -> str:
+    """Formats line results for output
+
+    :param results: the results, e.g. from process_lines
+    :param output_format: 'text' for the same report as `python -m mdma decode/encode`, 'plain' for just the result
+            (or 'ERROR: ...') of each line, or 'jsonl' for one JSON object per line
+    :returns: The formatted results, ending with a newline if there are any
+    """
+    if output_format == 'plain':
+        lines = [result.result if result.error is None else f'ERROR: {result.error}' for result in results]
+    elif output_format == 'jsonl':
+        lines = [json.dumps({'line': result.line_number, 'op': result.operation, 'input': result.input_str,
+                             **({'result': result.result} if result.error is None else {'error': result.error})})
+                 for result in results]
+    elif output_format == 'text':
+        lines = [_text_report(result) for result in results]
+    else:
+        raise ValueError(f'UNKNOWN OUTPUT FORMAT: {output_format}')
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def _text_report(result: LineResult) -> str:
+    """:returns: the report printed by __main__'s decode() and encode() (without the verbose table)"""
+    if result.error is not None:
+        return f'=======\nLine {result.line_number}: {result.input_str}\nERROR: {result.error}\n=======\n'
+    if result.operation == 'decode':
+        word = int(result.input_str.replace(' ', ''), 16)
+        return f'=======\nMachine Code: {result.input_str}\nBinary: {word:032b}\nDECODED: {result.result}\n=======\n'
+    return (f'=======\nInstruction String: {result.input_str}\nBinary: {int(result.result, 16):032b}\n'  # type: ignore
+            f'ENCODED: {result.result}\n=======\n')
+
+
+def _format_batch(lines: Sequence[str], operation: str, output_format: str, first_line_number: int) -> Optional[str]:
+    """Decodes or encodes a batch of lines and formats the results like format_results, using map() over the library
+    functions and str.format, so there is no per-line interpreter overhead
+
+    :returns: The formatted results, or None if any line is blank or fails (the batch then needs process_lines)
+    """
+    stripped = list(map(str.strip, lines))
+    try:
+        if operation == 'decode':
+            words = list(map(int, stripped, repeat(16)))
+            results = list(map(decode_word, words))
+        else:
+            words = results = list(map(encode_word, stripped))
+    except Exception:  # Blank lines fail too
+        return None
+    if output_format == 'plain':
+        return '\n'.join(results if operation == 'decode' else map(_format_hex, results)) + '\n'
+    template = _batch_templates[operation, output_format].format
+    if output_format == 'text':
+        return '\n'.join(map(template, stripped, words, results)) + '\n'
+    if operation == 'decode':
+        results = list(map(encode_basestring, results))
+    return '\n'.join(map(template, count(first_line_number), map(encode_basestring, stripped), results)) + '\n'
+
+
+def process_stream(stream: TextIO, output: TextIO, operation: Optional[str] = None, output_format: str = 'text',
+                   read_size: int = DEFAULT_READ_SIZE) -> Tuple[int, int]:
+    """Decodes or encodes every line of a text stream (e.g. piped into stdin) without prompting. Lines are read,
+    processed, and written in large batches, and the output is flushed after each batch. If the operation is given,
+    each batch is processed without per-line interpreter overhead unless one of its lines is blank or fails.
+
+    :param stream: the input, one hex word or instruction string per line
+    :param output: the text stream to write the results to
+    :param operation: 'decode' or 'encode'. If None, each line starts with its operation (e.g. 'decode 0x00000000')
+    :param output_format: one of 'text', 'plain', or 'jsonl' (see format_results)
+    :param read_size: the approximate number of characters read at a time
+    :returns: The number of lines processed (excluding blank lines), and how many of them failed
+    """
+    if operation is not None and operation not in OPERATIONS:
+        raise ValueError(f'INVALID OPERATION: {operation}')
+    format_results([], output_format)  # Validates the output format before reading any input
+    processed = errors = 0
+    line_number = 1
+    while True:
+        lines = stream.readlines(read_size)
+        if not lines:
+            break
+        formatted = _format_batch(lines, operation, output_format, line_number) if operation is not None else None
+        if formatted is not None:
+            processed += len(lines)
+        else:
+            results = process_lines(lines, operation, line_number)
+            processed += len(results)
+            errors += sum(result.error is not None for result in results)
+            formatted = format_results(results, output_format)
+        line_number += len(lines)
+        output.write(formatted)
+        output.flush()
+    return processed, errors
@@ -0,0 +1,159 @@
+import atexit
+import os
+import sys
+from time import perf_counter_ns
+from typing import Any, Dict, List, Optional, Sequence, TextIO, Tuple
+
+from mdma.isa import format_name
+from mdma.op_formatting import OpFormat
+
+# Setting this environment variable (to anything but '' or '0') enables profiling when mdma is imported, and prints
+# the report to stderr when the process exits
+PROFILE_ENV_VAR = 'MDMA_PROFILE'
+
+# Stages of decoding/encoding, in pipeline order: parsing the input (hex/binary string or instruction tokens), looking
+# up the instruction and its format, building data segments, packing operands into a word, and formatting the output.
+# 'cache' is the whole operation while caching is enabled, and 'error' the time until an operation failed
+STAGES = ['parse', 'lookup', 'segments', 'pack', 'format', 'cache', 'error']
+
+
+class Profiler:
+    """Per-stage and per-format timers and counters of decoding and encoding. Times are in nanoseconds.
+
+    :param stages: 'operation.stage' (e.g. 'decode.lookup') -> [calls, total time]
+    :param formats: 'operation.format' (e.g. 'encode.R') -> [instructions, total time]
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, List[int]] = {}
+        self.formats: Dict[str, List[int]] = {}
+
+    def record(self, operation: str, op_format: Optional[OpFormat], stage_times: Sequence[Tuple[str, int]]) -> None:
+        """Adds the stage times of one decoded or encoded instruction
+
+        :param operation: 'decode' or 'encode'
+        :param op_format: the format of the instruction, or None if it couldn't be determined
+        :param stage_times: (stage, time) of each stage the instruction went through
+        """
+        total = 0
+        for stage, elapsed in stage_times:
+            counts = self.stages.setdefault(f'{operation}.{stage}', [0, 0])
+            counts[0] += 1
+            counts[1] += elapsed
+            total += elapsed
+        counts = self.formats.setdefault(f'{operation}.{format_name(op_format)}', [0, 0])
+        counts[0] += 1
+        counts[1] += total
+
+    def time(self, operation: str) -> 'StageTimer':
+        """:returns: a context manager timing the stages of one instruction, recorded when it exits"""
+        return StageTimer(self, operation)
+
+    def reset(self) -> None:
+        """Clears every timer and counter"""
+        self.stages.clear()
+        self.formats.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """:returns: the calls (or instructions) and total seconds of each stage and format, ready to be dumped as
+                JSON or exported as metrics"""
+        return {group: {key: {'count': count, 'seconds': elapsed / 1e9} for key, (count, elapsed) in sorted(counts)}
+                for group, counts in [('stages', self.stages.items()), ('formats', self.formats.items())]}
+
+    def report(self) -> str:
+        """:returns: a table of the time spent in each stage and format, with each one's share of its operation"""
+        operation_totals: Dict[str, int] = {}
+        for key, (_, elapsed) in self.formats.items():
+            operation = key.split('.', 1)[0]
+            operation_totals[operation] = operation_totals.get(operation, 0) + elapsed
+        lines = []
+        for title, counts, order in [('STAGE', self.stages, STAGES), ('FORMAT', self.formats, None)]:
+            lines.append(f'{title:<20} {"COUNT":>10} {"TOTAL MS":>10} {"MEAN US":>9} {"SHARE":>6}')
+            for key, (count, elapsed) in sorted(counts.items(), key=lambda item: _sort_key(item[0], order)):
+                total = operation_totals.get(key.split('.', 1)[0]) or 1
+                lines.append(f'{key:<20} {count:>10} {elapsed / 1e6:>10.3f} {elapsed / 1e3 / count:>9.3f} '
+                             f'{100 * elapsed / total:>5.1f}%')
+            lines.append('')
+        return '\n'.join(lines)
+
+
+class StageTimer:
+    """Times consecutive stages of decoding or encoding one instruction: each call to lap() ends the current stage.
+    If the operation raises, the time since the last lap is recorded as the 'error' stage.
+
+    :param profiler: the profiler to record the times in
+    :param operation: 'decode' or 'encode'
+    """
+
+    __slots__ = ('profiler', 'operation', 'op_format', 'stage_times', 'mark')
+
+    def __init__(self, profiler: Profiler, operation: str):
+        self.profiler = profiler
+        self.operation = operation
+        self.op_format: Optional[OpFormat] = None  # Set once the instruction's format is known
+        self.stage_times: List[Tuple[str, int]] = []
+        self.mark = perf_counter_ns()
+
+    def lap(self, stage: str) -> None:
+        now = perf_counter_ns()
+        self.stage_times.append((stage, now - self.mark))
+        self.mark = now
+
+    def __enter__(self) -> 'StageTimer':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.lap('error')
+        self.profiler.record(self.operation, self.op_format, self.stage_times)
+
+
+def _sort_key(key: str, order: Optional[List[str]]) -> Tuple[str, Any]:
+    """:returns: the key sorted by operation, then by pipeline order for stages or by name for formats"""
+    operation, name = key.split('.', 1)
+    return operation, order.index(name) if order and name in order else name
+
+
+# The profiler timing decoding and encoding. None while profiling is disabled (the default), which costs a single
+# attribute check per instruction
+active: Optional[Profiler] = None
+_report_at_exit = False
+
+
+def enable_profiling(report_at_exit: bool = False, file: Optional[TextIO] = None) -> Profiler:
+    """Starts timing each stage of decoding and encoding. Calling this again keeps the existing timers.
+
+    :param report_at_exit: if True, the report is printed when the process exits
+    :param file: the file to print the report to, stderr by default
+    :returns: The profiler, whose timers can be read at any time
+    """
+    global active, _report_at_exit
+    if active is None:
+        active = Profiler()
+    if report_at_exit and not _report_at_exit:  # e.g. both MDMA_PROFILE and --profile are given
+        atexit.register(_print_report, active, file)
+        _report_at_exit = True
+    return active
+
+
+def disable_profiling() -> Optional[Profiler]:
+    """Stops timing decoding and encoding
+
+    :returns: The profiler that was active, with its timers as they were, or None if profiling wasn't enabled
+    """
+    global active
+    profiler, active = active, None
+    return profiler
+
+
+def profile_snapshot() -> Optional[Dict[str, Any]]:
+    """:returns: the snapshot of the active profiler (see Profiler.snapshot), or None if profiling is disabled"""
+    return active.snapshot() if active is not None else None
+
+
+def _print_report(profiler: Profiler, file: Optional[TextIO]) -> None:
+    print(profiler.report(), file=file or sys.stderr)
+
+
+if os.environ.get(PROFILE_ENV_VAR, '') not in ['', '0']:
+    enable_profiling(report_at_exit=True)
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Union
+
+from mdma.mips_instruction import decode_word, encode_word
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7878
+
+# Maximum length of a single request line (batched requests can be large)
+LINE_LIMIT = 1 << 26
+
+# Number of recent latencies kept per operation to compute percentiles from
+LATENCY_WINDOW = 10000
+
+
+def _decode(value: Union[int, str]) -> str:
+    """:returns: the instruction string of a word given as an integer or a hex string"""
+    return decode_word(value if isinstance(value, int) else int(value.replace(' ', ''), 16))
+
+
+def _encode(instruction_str: str) -> str:
+    """:returns: the padded hex string of an encoded instruction string"""
+    return '0x' + format(encode_word(instruction_str), '08x')
+
+
+class LatencyStats:
+    """Tracks the latency of handled requests, per operation. Requests may be recorded from several threads"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self.totals: Dict[str, float] = {}
+        self.maxes: Dict[str, float] = {}
+        self.recent: Dict[str, Deque[float]] = {}
+
+    def record(self, operation: str, seconds: float) -> None:
+        """Records the latency of a request
+
+        :param operation: the operation requested
+        :param seconds: the time taken to handle the request
+        """
+        with self._lock:
+            if operation not in self.counts:
+                self.counts[operation], self.totals[operation], self.maxes[operation] = 0, 0.0, 0.0
+                self.recent[operation] = deque(maxlen=self.window)
+            self.counts[operation] += 1
+            self.totals[operation] += seconds
+            self.maxes[operation] = max(self.maxes[operation], seconds)
+            self.recent[operation].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """:returns: the count and the mean, p50, p99, and max latency (in microseconds) of each operation"""
+        summary = {}
+        with self._lock:
+            for operation, count in self.counts.items():
+                recent = sorted(self.recent[operation])
+                summary[operation] = {
+                    'count': count,
+                    'mean_us': round(1e6 * self.totals[operation] / count, 1),
+                    'p50_us': round(1e6 * recent[len(recent) // 2], 1),
+                    'p99_us': round(1e6 * recent[min(len(recent) - 1, len(recent) * 99 // 100)], 1),
+                    'max_us': round(1e6 * self.maxes[operation], 1),
+                }
+        return summary
+
+
+class MDMAServer:
+    """A persistent encode/decode server speaking newline-delimited JSON, so tools can share one warm process.
+
+    Each request is a JSON object on its own line: {"id": ..., "op": "decode" | "encode" | "stats", "input": ...}.
+    "input" is a single word (integer or hex string) or instruction string, or a list of them for a batched request.
+    Each response is a JSON object on its own line: {"id": ..., "result": ...} or {"id": ..., "error": "..."}. Failed
+    items of a batched request are null in "result" and listed in "errors" as [index, message] pairs. Requests can be
+    pipelined - responses are written in the order the requests were received on each connection. Batched requests
+    are handled in a worker thread, so a large batch doesn't hold up the other connections.
+    """
+
+    operations = {'decode': _decode, 'encode': _encode}
+
+    def __init__(self):
+        self.stats = LatencyStats()
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Handles a single decoded request
+
+        :param request: the request object
+        :returns: The response object
+        """
+        start = time.perf_counter()
+        response: Dict[str, Any] = {'id': request.get('id')}
+        operation = request.get('op')
+        if operation == 'stats':
+            response['result'] = self.stats.summary()
+            return response
+        if not isinstance(operation, str) or operation not in self.operations:  # Unhashable ops can't be looked up
+            response['error'] = f'INVALID OPERATION: {operation}'
+            return response
+        func = self.operations[operation]
+        value = request.get('input')
+        if isinstance(value, list):
+            results: List[Optional[str]] = []
+            errors = []
+            for i, item in enumerate(value):
+                try:
+                    results.append(func(item))
+                except Exception as e:
+                    results.append(None)
+                    errors.append([i, repr(e)])
+            response['result'] = results
+            if errors:
+                response['errors'] = errors
+        else:
+            try:
+                response['result'] = func(value)
+            except Exception as e:
+                response['error'] = repr(e)
+        self.stats.record(operation, time.perf_counter() - start)
+        return response
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Handles requests from one client until it disconnects"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if isinstance(request.get('input'), list):  # Batches are handled off the event loop, so other
+                        response = await asyncio.get_running_loop().run_in_executor(  # connections are still served
+                            None, self.handle_request, request)
+                    else:
+                        response = self.handle_request(request)
+                except (ValueError, AttributeError) as e:  # Malformed JSON or not an object
+                    response = {'id': None, 'error': f'INVALID REQUEST: {e}'}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()  # Only waits if the client isn't keeping up with its responses
+        except (ConnectionError, ValueError):  # Disconnected, or a line longer than LINE_LIMIT
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Starts listening, on a Unix socket if a path is given or on a TCP port otherwise
+
+        :param host: the host to listen on
+        :param port: the TCP port to listen on (0 to pick a free one)
+        :param path: the path of the Unix socket to listen on
+        :returns: The listening server
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path, limit=LINE_LIMIT)
+        return await asyncio.start_server(self.handle_connection, host, port, limit=LINE_LIMIT)
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None) -> None:
+    """Runs an MDMAServer until interrupted
+
+    :param host: the host to listen on
+    :param port: the TCP port to listen on
+    :param path: the path of the Unix socket to listen on, instead of a TCP port
+    """
+    async def run():
+        server = await MDMAServer().start(host, port, path)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+class MDMAClient:
+    """A client for MDMAServer
+
+    :param host: the host the server is listening on
+    :param port: the TCP port the server is listening on
+    :param path: the path of the server's Unix socket, instead of a TCP port
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None):
+        if path is not None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(path)
+        else:
+            self._socket = socket.create_connection((host, port))
+        self._file = self._socket.makefile('rwb')
+        self._next_id = 0
+
+    def __enter__(self) -> 'MDMAClient':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the connection to the server"""
+        self._file.close()
+        self._socket.close()
+
+    def request_many(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Sends several requests at once (pipelined) and waits for all of their responses
+
+        :param requests: the request objects, with "op" and "input" (an "id" is added if missing)
+        :returns: The response objects, in the same order
+        """
+        for request in requests:
+            if 'id' not in request:
+                request = dict(request, id=self._next_id)
+                self._next_id += 1
+            self._file.write(json.dumps(request).encode() + b'\n')
+        self._file.flush()
+        return [json.loads(self._file.readline()) for _ in requests]
+
+    def request(self, operation: str, value: Any = None) -> Any:
+        """Sends a single request and waits for its result
+
+        :param operation: one of 'decode', 'encode', or 'stats'
+        :param value: the input of the request
+        :returns: The result of the request
+        """
+        response = self.request_many([{'op': operation, 'input': value}])[0]
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    def decode(self, value: Union[int, str, List[Union[int, str]]]) -> Any:
+        """:returns: the instruction string(s) of the given word(s), each an integer or hex string"""
+        return self.request('decode', value)
+
+    def encode(self, instruction_str: Union[str, List[str]]) -> Any:
+        """:returns: the hex string(s) of the given instruction string(s)"""
+        return self.request('encode', instruction_str)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """:returns: the server's per-operation latency statistics"""
+        return self.request('stats')
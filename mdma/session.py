@@ -0,0 +1,151 @@
+import struct
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from mdma.cfg import control_flow, ControlFlowGraph
+from mdma.disassembler import format_line, _struct_byteorder
+
+
+class SessionUpdate(NamedTuple):
+    """The effects of re-decoding changed byte ranges of a DisassemblySession
+
+    :param changed: the addresses of the words that differ from before
+    :param dependents: the addresses of branches, jumps, and calls (outside of the changed words) whose targets are
+            changed words
+    :param labels_added: the addresses that became branch/jump targets
+    :param labels_removed: the addresses that are no longer branch/jump targets
+    """
+
+    changed: List[int]
+    dependents: List[int]
+    labels_added: List[int]
+    labels_removed: List[int]
+
+
+class DisassemblySession:
+    """Holds the disassembly of a buffer so that, after the buffer is patched, only the words in the changed byte
+    ranges are decoded again. Branch/jump targets are tracked per word, so labels and the instructions referring to
+    changed words are updated in time proportional to the size of the patch.
+
+    :param buffer: the machine code. If it is mutable it can be patched in place, followed by a call to update()
+    :param byteorder: the byte order of the words, 'big' or 'little'
+    :param base_address: the address of the first word
+    :param delay_slots: if True, the control flow graph puts each branch's delay slot in the branch's block
+    """
+
+    def __init__(self, buffer: bytes, byteorder: str = 'big', base_address: int = 0, delay_slots: bool = False):
+        self.buffer = buffer
+        self.base_address = base_address
+        self.delay_slots = delay_slots
+        self._word_format = _struct_byteorder(byteorder) + 'I'
+        count = len(buffer) // 4
+        self.words: List[int] = list(struct.unpack_from(f'{self._word_format[0]}{count}I', buffer))
+        self.lines: List[str] = [format_line(base_address + 4 * i, word) for i, word in enumerate(self.words)]
+        self._targets: Dict[int, int] = {}  # Index of a word -> its static branch/jump target
+        self._referrers: Dict[int, Set[int]] = {}  # Target address -> indices of the words referring to it
+        self._cfg: Optional[ControlFlowGraph] = None
+        for i, word in enumerate(self.words):
+            self._add_target(i, control_flow(word, base_address + 4 * i)[1])
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _add_target(self, index: int, target: Optional[int]) -> None:
+        """Records the static branch/jump target of a word, if it has one"""
+        if target is not None:
+            self._targets[index] = target
+            self._referrers.setdefault(target, set()).add(index)
+
+    def _remove_target(self, index: int) -> None:
+        """Forgets the static branch/jump target of a word, if it had one"""
+        target = self._targets.pop(index, None)
+        if target is not None:
+            referrers = self._referrers[target]
+            referrers.discard(index)
+            if not referrers:
+                del self._referrers[target]
+
+    def update(self, ranges: Iterable[Tuple[int, int]]) -> SessionUpdate:
+        """Re-decodes the words overlapping the given byte ranges of the buffer
+
+        :param ranges: (start, stop) byte offsets of the changed parts of the buffer, with stop exclusive
+        :returns: The words that changed, the instructions depending on them, and the labels added and removed
+        """
+        indices: Set[int] = set()
+        for start, stop in ranges:
+            if not 0 <= start <= stop <= len(self.buffer):
+                raise ValueError(f'Byte range {start}-{stop} is outside of the buffer')
+            indices.update(range(start // 4, min((stop + 3) // 4, len(self.words))))
+
+        was_label: Dict[int, bool] = {}  # Target address -> whether it was a label before this update
+        changed = []
+        flow_changed = []  # Indices of the words whose control flow may have changed
+        for index in sorted(indices):
+            word = struct.unpack_from(self._word_format, self.buffer, 4 * index)[0]
+            old_word = self.words[index]
+            if word == old_word:
+                continue
+            address = self.base_address + 4 * index
+            changed.append(address)
+            self.words[index] = word
+            self.lines[index] = format_line(address, word)
+            old_kind, old_target = control_flow(old_word, address)
+            kind, target = control_flow(word, address)
+            for label in [old_target, target]:
+                if label is not None and label not in was_label:
+                    was_label[label] = label in self._referrers
+            self._remove_target(index)
+            self._add_target(index, target)
+            if old_kind is not None or kind is not None:
+                flow_changed.append(index)
+        if self._cfg is not None and flow_changed:
+            self._cfg.update(self.words, flow_changed)  # Only the blocks around the changed control flow are split
+
+        dependents = sorted({self.base_address + 4 * referrer for address in changed
+                             for referrer in self._referrers.get(address, ())} - set(changed))
+        labels_added, labels_removed = [], []
+        for label, was in sorted(was_label.items()):
+            now = label in self._referrers
+            if was != now and self._in_buffer(label):
+                (labels_added if now else labels_removed).append(label)
+        return SessionUpdate(changed, dependents, labels_added, labels_removed)
+
+    def patch(self, offset: int, data: bytes) -> SessionUpdate:
+        """Writes bytes into the (mutable) buffer and re-decodes the words they overlap
+
+        :param offset: the byte offset to write the data at
+        :param data: the bytes to write
+        :returns: The result of update()
+        """
+        if offset < 0 or offset + len(data) > len(self.buffer):
+            raise ValueError(f'Patch at offset {offset} of {len(data)} bytes is outside of the buffer')
+        self.buffer[offset:offset + len(data)] = data  # type: ignore
+        return self.update([(offset, offset + len(data))])
+
+    @property
+    def labels(self) -> List[int]:
+        """:returns: the sorted addresses, within the buffer, that are branch/jump targets"""
+        return sorted(address for address in self._referrers if self._in_buffer(address))
+
+    def referrers(self, address: int) -> List[int]:
+        """:returns: the addresses of the branches, jumps, and calls targeting the given address"""
+        return sorted(self.base_address + 4 * index for index in self._referrers.get(address, ()))
+
+    @property
+    def cfg(self) -> ControlFlowGraph:
+        """The control flow graph of the words. It is built on first use, and afterwards patches that change control
+        flow only split the affected blocks again (see ControlFlowGraph.update)"""
+        if self._cfg is None:
+            self._cfg = ControlFlowGraph(self.words, self.base_address, self.delay_slots)
+        return self._cfg
+
+    def listing(self) -> Iterator[str]:
+        """Yields the lines of disassembly, with a label line before each branch/jump target"""
+        referrers = self._referrers
+        for i, line in enumerate(self.lines):
+            address = self.base_address + 4 * i
+            if address in referrers:
+                yield f'L_{address:08x}:'
+            yield line
+
+    def _in_buffer(self, address: int) -> bool:
+        return self.base_address <= address < self.base_address + 4 * len(self.words) and address & 3 == 0
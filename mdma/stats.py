@@ -0,0 +1,183 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from mdma.op_formatting import register_names
+from mdma.isa import format_name, instruction_mnemonic, lookup_instruction, selector_key, selector_masks
+
+
+class _Operands(NamedTuple):
+    """Where the counted operands of an instruction are
+
+    :param format_name: the name of the instruction's format (see isa.format_name), or '.word' for unknown words
+    :param registers: the (shift, mask) of each integer register operand, in the instruction's syntax
+    :param immediate: the (shift, number of bits) of the immediate operand, or None if there isn't one
+    """
+
+    format_name: str
+    registers: Tuple[Tuple[int, int], ...]
+    immediate: Optional[Tuple[int, int]]
+
+
+def _operands(key: int) -> _Operands:
+    """:returns: the operands of the instruction with a selector key (see isa.selector_key)"""
+    try:
+        op_format = lookup_instruction(key).op_format
+    except KeyError:
+        return _Operands('.word', (), None)
+    layout, shift = {}, 32
+    for segment_name, bits in op_format.fields.items():
+        shift -= bits
+        layout[segment_name] = (shift, bits)
+    registers = tuple((layout[segment_name][0], (1 << layout[segment_name][1]) - 1)
+                      for segment_name in op_format.syntax if segment_name in ['rs', 'rt', 'rd'])
+    immediate = layout['immediate'] if 'immediate' in op_format.syntax else None
+    return _Operands(format_name(op_format), registers, immediate)
+
+
+class InstructionStats:
+    """Histograms of the instruction mix of a stream of words, tallied from the integer fields without decoding any
+    instruction strings. Stats of separate chunks (or processes) can be merged, so large inputs can be summarized in
+    one streaming pass.
+
+    :param count: the number of words counted
+    :param opcodes: counts of selector keys - words with only the bits that select their instruction (e.g. op and
+            func) kept, see isa.selector_key
+    :param formats: counts of format names (see isa.format_name, e.g. 'R' or 'fp_r'), '.word' for unknown words
+    :param registers: counts of register numbers, for each integer register operand shown in the instruction string
+    :param immediates: counts of (sign-extended) immediate operands
+    """
+
+    def __init__(self, count: int = 0, opcodes: Optional[Counter] = None, formats: Optional[Counter] = None,
+                 registers: Optional[Counter] = None, immediates: Optional[Counter] = None):
+        self.count = count
+        self.opcodes: Counter = opcodes if opcodes is not None else Counter()
+        self.formats: Counter = formats if formats is not None else Counter()
+        self.registers: Counter = registers if registers is not None else Counter()
+        self.immediates: Counter = immediates if immediates is not None else Counter()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, InstructionStats):
+            return NotImplemented
+        return (self.count, self.opcodes, self.formats, self.registers, self.immediates) == \
+            (other.count, other.opcodes, other.formats, other.registers, other.immediates)
+
+    def __repr__(self) -> str:
+        return f'InstructionStats(count={self.count})'
+
+    def update(self, words: Sequence[int], vectorized: Optional[bool] = None) -> 'InstructionStats':
+        """Counts a chunk of words
+
+        :param words: the 32-bit machine code words (a sequence of ints or a numpy array)
+        :param vectorized: if True, the words are counted with numpy. Defaults to True when numpy is installed
+        :returns: This object, updated
+        """
+        if vectorized is None:
+            vectorized = np is not None
+        if vectorized:
+            self._update_vectorized(words)
+        else:
+            self._update_counter(words)
+        self.count += len(words)
+        return self
+
+    def _update_counter(self, words: Sequence[int]) -> None:
+        """Tallies the words one at a time with Counters"""
+        keys = list(map(selector_key, words))
+        operands = {key: _operands(key) for key in set(keys)}  # Few distinct keys
+        self.opcodes.update(keys)
+        formats, registers, immediates = self.formats, self.registers, self.immediates
+        for word, key in zip(words, keys):
+            found = operands[key]
+            formats[found.format_name] += 1
+            for shift, mask in found.registers:
+                registers[(word >> shift) & mask] += 1
+            if found.immediate is not None:
+                shift, bits = found.immediate
+                immediates[(((word >> shift) & ((1 << bits) - 1)) ^ (1 << (bits - 1))) - (1 << (bits - 1))] += 1
+
+    def _update_vectorized(self, words: Sequence[int]) -> None:
+        """Tallies the words with numpy, by counting the distinct values of each field of each group of words with
+        the same operands"""
+        words = np.asarray(words, dtype=np.uint32)
+        keys = words & np.array(selector_masks, dtype=np.uint32)[words >> np.uint32(26)]
+        values, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        groups: Dict[_Operands, int] = {}
+        group_of_value = []
+        for value, count in zip(values.tolist(), counts.tolist()):  # Few distinct values, narrowed to exact keys
+            key = selector_key(value)
+            self.opcodes[key] += count
+            found = _operands(key)
+            self.formats[found.format_name] += count
+            group_of_value.append(groups.setdefault(found, len(groups)))
+        word_groups = np.array(group_of_value, dtype=np.intp)[inverse.reshape(-1)]
+        for (_, register_fields, immediate), group in groups.items():
+            if not register_fields and immediate is None:
+                continue
+            group_words = words[word_groups == group]
+            for shift, mask in register_fields:
+                _add_counts(self.registers, np.bincount((group_words >> np.uint32(shift)) & np.uint32(mask),
+                                                        minlength=32))
+            if immediate is not None:
+                shift, bits = immediate
+                values = ((group_words >> np.uint32(shift)) & np.uint32((1 << bits) - 1)).astype(np.int64)
+                values, counts = np.unique((values ^ (1 << (bits - 1))) - (1 << (bits - 1)), return_counts=True)
+                self.immediates.update(dict(zip(values.tolist(), counts.tolist())))
+
+    def merge(self, other: 'InstructionStats') -> 'InstructionStats':
+        """Adds the counts of another InstructionStats (e.g. of another chunk or process) to these
+
+        :param other: the stats to add
+        :returns: This object, updated
+        """
+        self.count += other.count
+        self.opcodes.update(other.opcodes)
+        self.formats.update(other.formats)
+        self.registers.update(other.registers)
+        self.immediates.update(other.immediates)
+        return self
+
+    def mnemonics(self) -> Counter:
+        """:returns: the counts of each mnemonic. Words of unknown instructions are counted as '.word'"""
+        mnemonics: Counter = Counter()
+        for key, count in self.opcodes.items():
+            mnemonics[instruction_mnemonic(key) or '.word'] += count
+        return mnemonics
+
+    def summary(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """Names the counted values, most common first
+
+        :param top: the maximum number of mnemonics, registers, and immediates to include (all of them if None)
+        :returns: The histograms, ready to be dumped as JSON
+        """
+        return {
+            'count': self.count,
+            'formats': dict(self.formats.most_common()),
+            'mnemonics': dict(self.mnemonics().most_common(top)),
+            'registers': {(register_names[num] or f'${num}'): count
+                          for num, count in self.registers.most_common(top)},
+            'immediates': {str(value): count for value, count in self.immediates.most_common(top)},
+        }
+
+
+def _add_counts(counter: Counter, counts: 'np.ndarray') -> None:
+    """Adds the non-zero entries of a bincount to a Counter"""
+    for value in np.flatnonzero(counts).tolist():
+        counter[value] += int(counts[value])
+
+
+def collect_stats(chunks: Iterable[Sequence[int]], vectorized: Optional[bool] = None) -> InstructionStats:
+    """Counts the instruction mix of a stream of word chunks, e.g. the words of iter_word_chunks
+
+    :param chunks: the chunks of 32-bit machine code words
+    :param vectorized: if True, the words are counted with numpy. Defaults to True when numpy is installed
+    :returns: The merged counts of every chunk
+    """
+    stats = InstructionStats()
+    for words in chunks:
+        stats.update(words, vectorized)
+    return stats
@@ -0,0 +1,150 @@
+import io
+import struct
+from bisect import bisect_right
+from typing import BinaryIO, Iterable, List, NamedTuple, Optional, Tuple
+
+from mdma.cfg import control_flow
+from mdma.disassembler import elf_sections, _struct_byteorder, _ELF_MAGIC
+from mdma.mips_instruction import decode_word
+
+# ELF symbol types kept in symbol tables: STT_NOTYPE, STT_OBJECT, and STT_FUNC (sections and files are skipped)
+_ELF_SYMBOL_TYPES = frozenset({0, 1, 2})
+_STT_FUNC = 2
+_SHT_SYMTAB = 2
+
+
+class Symbol(NamedTuple):
+    """A named address
+
+    :param address: the address of the symbol
+    :param name: the name of the symbol
+    :param size: the number of bytes the symbol covers, or 0 if unknown (it then covers everything up to the next
+            symbol)
+    """
+
+    address: int
+    name: str
+    size: int = 0
+
+
+class SymbolTable:
+    """Symbols sorted by address, so the symbol containing an address is found by bisecting - O(log n) per lookup, no
+    matter how many symbols there are. Where several symbols share an address, the first one given is kept.
+
+    :param symbols: the symbols, in any order
+    """
+
+    def __init__(self, symbols: Iterable[Symbol] = ()):
+        self.symbols: List[Symbol] = []
+        for symbol in sorted(symbols, key=lambda symbol: symbol.address):  # Stable, so the first one given is kept
+            if not self.symbols or self.symbols[-1].address != symbol.address:
+                self.symbols.append(symbol)
+        self.addresses: List[int] = [symbol.address for symbol in self.symbols]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __repr__(self) -> str:
+        return f'SymbolTable({len(self.symbols)} symbols)'
+
+    def at(self, address: int) -> Optional[Symbol]:
+        """:returns: the symbol starting at an address, if there is one"""
+        index = bisect_right(self.addresses, address) - 1
+        return self.symbols[index] if index >= 0 and self.addresses[index] == address else None
+
+    def lookup(self, address: int) -> Optional[Tuple[Symbol, int]]:
+        """:returns: the symbol containing an address and the address' offset into it, or None if no symbol does"""
+        index = bisect_right(self.addresses, address) - 1
+        if index < 0:
+            return None
+        symbol = self.symbols[index]
+        offset = address - symbol.address
+        if symbol.size and offset >= symbol.size:
+            return None
+        return symbol, offset
+
+    def symbolize(self, address: int) -> str:
+        """:returns: the address as 'symbol' or 'symbol+0x1c', or as a hex address if no symbol contains it"""
+        found = self.lookup(address)
+        if found is None:
+            return f'0x{address:08x}'
+        symbol, offset = found
+        return f'{symbol.name}+0x{offset:x}' if offset else symbol.name
+
+    def decode_word(self, word: int, address: int) -> str:
+        """Decodes a 32-bit machine code word, showing the destination of a branch or jump as a symbol. Destinations
+        are computed from the word's real address, including the upper bits of the program counter for jumps.
+
+        :param word: the 32-bit machine code to be decoded
+        :param address: the address of the word
+        :returns: The human-readable instruction string, e.g. 'jal func' or 'bne $zero $t0 loop+0x8'
+        """
+        instruction_str = decode_word(word)
+        target = control_flow(word, address)[1]
+        if target is None:
+            return instruction_str
+        return instruction_str.rsplit(' ', 1)[0] + ' ' + self.symbolize(target)  # The destination is the last operand
+
+
+def load_elf_symbols(stream: BinaryIO) -> SymbolTable:
+    """Reads the function and object symbols of an ELF file's .symtab section. Function symbols are preferred over
+    other symbols at the same address.
+
+    :param stream: the (seekable) binary stream containing the ELF file
+    :returns: The symbol table
+    """
+    byteorder, is_64_bit, sections = elf_sections(stream)
+    prefix = _struct_byteorder(byteorder)
+    symbols = []
+    for _, (_, section_type, _, _, offset, size, link, _, _, entry_size) in sections:
+        if section_type != _SHT_SYMTAB:
+            continue
+        _, (_, _, _, _, names_offset, names_size, *_) = sections[link]
+        stream.seek(names_offset)
+        names = stream.read(names_size)
+        stream.seek(offset)
+        data = stream.read(size)
+        for entry in range(0, size - size % entry_size, entry_size):
+            if is_64_bit:
+                name, info, _, section_index, value, symbol_size = struct.unpack_from(prefix + 'IBBHQQ', data, entry)
+            else:
+                name, value, symbol_size, info, _, section_index = struct.unpack_from(prefix + 'IIIBBH', data, entry)
+            if info & 0xf not in _ELF_SYMBOL_TYPES or section_index == 0 or name == 0:  # Skip undefined symbols
+                continue
+            symbols.append((info & 0xf != _STT_FUNC, Symbol(value, names[name:names.index(b'\0', name)].decode(),
+                                                             symbol_size)))
+    symbols.sort(key=lambda preference_and_symbol: preference_and_symbol[0])
+    return SymbolTable(symbol for _, symbol in symbols)
+
+
+def load_symbol_map(lines: Iterable[str]) -> SymbolTable:
+    """Reads an nm-style symbol map: one 'address [size] [type] name' line per symbol, with the address and size in
+    hex (as printed by `nm` or `nm -S`). Lines without an address (e.g. undefined symbols) are skipped.
+
+    :param lines: the lines of the map
+    :returns: The symbol table
+    """
+    symbols = []
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) < 2:
+            continue
+        try:
+            address = int(tokens[0], 16)
+            size = int(tokens[1], 16) if len(tokens) == 4 else 0
+        except ValueError:
+            continue
+        symbols.append(Symbol(address, tokens[-1], size))
+    return SymbolTable(symbols)
+
+
+def load_symbols(path: str) -> SymbolTable:
+    """Loads a symbol table from an ELF file's .symtab, or from an nm-style symbol map (see load_symbol_map)
+
+    :param path: path of the ELF file or map
+    :returns: The symbol table
+    """
+    with open(path, 'rb') as f:
+        if f.peek(4)[:4] == _ELF_MAGIC:
+            return load_elf_symbols(f)  # type: ignore
+        return load_symbol_map(io.TextIOWrapper(f))
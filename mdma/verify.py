@@ -0,0 +1,175 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from mdma.op_formatting import OpFormat, register_names
+from mdma.isa import instructions
+from mdma.mips_instruction import MIPSInstruction, decode_word, encode_word
+
+DEFAULT_SAMPLES = 10000
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_MAX_MISMATCHES = 100
+
+# The register numbers that have names (and so can be decoded)
+_registers = [num for num, name in enumerate(register_names) if name is not None]
+
+
+class Mismatch(NamedTuple):
+    """A word that didn't survive being decoded and re-encoded
+
+    :param word: the original 32-bit machine code word
+    :param instruction_str: the word decoded into an instruction string (or the error raised while decoding)
+    :param reencoded: the instruction string encoded back into a word, or None if it couldn't be
+    :param reason: a description of the mismatch
+    """
+
+    word: int
+    instruction_str: str
+    reencoded: Optional[int]
+    reason: str
+
+
+class VerifyReport(NamedTuple):
+    """The result of a verification sweep
+
+    :param checked: the number of words that were checked
+    :param mismatch_count: the total number of mismatches found
+    :param mismatches: the mismatches found (up to the maximum requested)
+    """
+
+    checked: int
+    mismatch_count: int
+    mismatches: List[Mismatch]
+
+
+def _operand_choices(op_format: OpFormat) -> List[Tuple[str, Sequence[int]]]:
+    """:returns: every value each operand field of the format can take, in the order of the format's syntax"""
+    choices: List[Tuple[str, Sequence[int]]] = []
+    for segment_name in op_format.syntax[1:]:
+        if segment_name in ['rs', 'rt', 'rd']:
+            choices.append((segment_name, _registers))
+        else:
+            choices.append((segment_name, range(1 << op_format.fields[segment_name])))
+    return choices
+
+
+def space_size(mnemonic: str) -> int:
+    """:returns: the number of distinct words of the given operation that can be decoded"""
+    size = 1
+    for _, choices in _operand_choices(instructions[mnemonic].op_format):
+        size *= len(choices)
+    return size
+
+
+def operation_words(mnemonic: str, start: int, stop: int, seed: Optional[str] = None) -> List[int]:
+    """Generates words of the given operation. Fields that aren't shown in the instruction string are zero.
+
+    :param mnemonic: the name of the operation
+    :param start: the index of the first word in the operation's space (or of the first random sample)
+    :param stop: the index just past the last word
+    :param seed: if given, words are sampled randomly with this seed rather than enumerated in order
+    :returns: The generated words
+    """
+    instruction = instructions[mnemonic]
+    op_format = instruction.op_format
+    choices = _operand_choices(op_format)
+    rng = random.Random(seed) if seed is not None else None
+    words = []
+    for index in range(start, stop):
+        values = dict(instruction.encoding)
+        if rng is not None:
+            for segment_name, options in choices:
+                values[segment_name] = rng.choice(options)
+        else:  # The index is a mixed-radix number, with one digit per operand
+            for segment_name, options in reversed(choices):
+                index, digit = divmod(index, len(options))
+                values[segment_name] = options[digit]
+        words.append(op_format.pack(values))
+    return words
+
+
+def verify_words(words: Iterable[int], reference: bool = False,
+                 max_mismatches: int = DEFAULT_MAX_MISMATCHES) -> Tuple[int, int, List[Mismatch]]:
+    """Decodes each word and re-encodes it, checking the original word is produced again
+
+    :param words: the words to be checked
+    :param reference: if True, the fast integer paths (decode_word and encode_word) are also checked against
+            decoding and encoding with MIPSInstruction
+    :param max_mismatches: the maximum number of mismatches to return
+    :returns: The number of words checked, the number of mismatches, and the mismatches (up to the maximum)
+    """
+    checked, mismatch_count, mismatches = 0, 0, []
+    for word in words:
+        checked += 1
+        mismatch = _check(word, reference)
+        if mismatch is not None:
+            mismatch_count += 1
+            if len(mismatches) < max_mismatches:
+                mismatches.append(mismatch)
+    return checked, mismatch_count, mismatches
+
+
+def _check(word: int, reference: bool) -> Optional[Mismatch]:
+    """:returns: the mismatch found when decoding and re-encoding the word, or None if it round-trips"""
+    try:
+        instruction_str = decode_word(word)
+    except Exception as e:
+        return Mismatch(word, repr(e), None, 'decode failed')
+    try:
+        reencoded = encode_word(instruction_str)
+    except Exception as e:
+        return Mismatch(word, instruction_str, None, f'encode failed: {e!r}')
+    if reencoded != word:
+        return Mismatch(word, instruction_str, reencoded, 're-encoded word differs')
+    if reference:
+        if str(MIPSInstruction(bin_str=format(word, '032b'))) != instruction_str:
+            return Mismatch(word, instruction_str, reencoded, 'decode_word differs from MIPSInstruction')
+        if MIPSInstruction(instruction_str=instruction_str).word != reencoded:
+            return Mismatch(word, instruction_str, reencoded, 'encode_word differs from MIPSInstruction')
+    return None
+
+
+def _verify_range(mnemonic: str, start: int, stop: int, seed: Optional[str], reference: bool,
+                  max_mismatches: int) -> Tuple[int, int, List[Mismatch]]:
+    """Generates and verifies one batch of words - only these arguments are sent to worker processes"""
+    return verify_words(operation_words(mnemonic, start, stop, seed), reference, max_mismatches)
+
+
+def verify_round_trip(exhaustive: bool = False, samples: int = DEFAULT_SAMPLES, seed: int = 0, workers: int = 1,
+                      reference: bool = False, mnemonics: Optional[Iterable[str]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE,
+                      max_mismatches: int = DEFAULT_MAX_MISMATCHES) -> VerifyReport:
+    """Sweeps every operation of the ISA (see isa.py), decoding and re-encoding words with either every possible
+    (or randomly sampled) register, shift amount, immediate, and target field. Words are generated and checked in
+    batches, optionally across several processes.
+
+    :param exhaustive: if True, every decodable word of each operation is checked (billions, for I and J formats)
+    :param samples: the number of random words checked per operation when not exhaustive
+    :param seed: the seed for random sampling
+    :param workers: the number of processes to check batches with
+    :param reference: if True, the integer paths are also checked against MIPSInstruction (much slower)
+    :param mnemonics: the operations to check. Defaults to every operation
+    :param batch_size: the number of words generated and checked at a time
+    :param max_mismatches: the maximum number of mismatches to report
+    :returns: The number of words checked and the mismatches found
+    """
+    batches = []
+    for mnemonic in (mnemonics or instructions):
+        count = space_size(mnemonic) if exhaustive else samples
+        for start in range(0, count, batch_size):
+            batch_seed = None if exhaustive else f'{seed}:{mnemonic}:{start}'
+            batches.append((mnemonic, start, min(start + batch_size, count), batch_seed, reference, max_mismatches))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_verify_range, *zip(*batches))) if batches else []
+    else:
+        results = [_verify_range(*batch) for batch in batches]
+
+    checked, mismatch_count = 0, 0
+    mismatches: List[Mismatch] = []
+    for batch_checked, batch_mismatch_count, batch_mismatches in results:
+        checked += batch_checked
+        mismatch_count += batch_mismatch_count
+        mismatches.extend(batch_mismatches[:max_mismatches - len(mismatches)])
+    return VerifyReport(checked, mismatch_count, mismatches)
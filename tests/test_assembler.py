@@ -0,0 +1,61 @@
+import subprocess
+import sys
+
+import pytest
+
+from mdma.assembler import assemble, AssemblyError
+from mdma.mips_instruction import MIPSInstruction
+
+source = '''
+# Counts down from 10
+        .text
+        .globl main
+main:   addi $t0, $zero, 10     # counter
+loop:   addi $t0 $t0 -1
+        bne $zero $t0 loop
+        j end
+        sll $zero $zero 0
+end:    jal main
+        .data
+        .word 7
+        .align 3
+vals:   .word 1, -1, main, vals
+'''
+
+
+def test_assemble():
+    program = assemble(source)
+    assert program.symbols == {'main': 0x00400000, 'loop': 0x00400004, 'end': 0x00400014, 'vals': 0x10010008}
+    assert program.hex_image().split() == ['2008000a', '2108ffff', '1500fffe', '08100005', '00000000', '0c100000']
+    assert program.hex_image('data').split() == ['00000007', '00000000', '00000001', 'ffffffff', '00400000',
+                                                 '10010008']
+
+
+@pytest.mark.parametrize("instr_str", ["sll $zero $zero 0", "add $t0 $t1 $t2", "addi $a0 $s3 -77",
+                                       "addi $a0 $s3 77", "j 0x00c40ab0"])
+def test_assemble_matches_mips_instruction(instr_str):
+    program = assemble(instr_str, byteorder='little')
+    assert int.from_bytes(program.text, 'little') == MIPSInstruction(instruction_str=instr_str).word
+
+
+@pytest.mark.parametrize("bad_source, line_num", [("add $t0 $t1 $t2\nfoo $t0", 2),
+                                                  ("a: add $t0 $t1 $t2\na: add $t0 $t1 $t2", 2),
+                                                  ("bne $t0 $t1 nowhere", 1),
+                                                  ("addi $t0 $t1 70000", 1),
+                                                  ("add $t0", 1), ("add $t0 $t1 $t2 $t3", 1),
+                                                  (".byte 1", 1),
+                                                  ("nop\nbeq $t0 $t1 far\n.align 18\nfar: nop", 2),  # Offset too large
+                                                  ("far: nop\n.align 18\nbne $t0 $t1 far", 3),
+                                                  ("j far\n.align 28\nfar: nop", 1)])  # Another 256MB region
+def test_assembly_errors(bad_source, line_num):
+    with pytest.raises(AssemblyError) as e:
+        assemble(bad_source)
+    assert e.value.line_num == line_num
+
+
+@pytest.mark.parametrize("base_args, expected_jump", [([], '08100000'), (['-b', '0'], '08000000'),
+                                                      (['-b', '400100'], '08100040')])
+def test_cli_base_address(base_args, expected_jump):
+    result = subprocess.run([sys.executable, '-m', 'mdma', 'assemble', *base_args], input='start: j start\n',
+                            capture_output=True, text=True, check=True)
+    assert result.stdout == expected_jump + '\n'
@@ -0,0 +1,94 @@
+import pytest
+
+from mdma.isa import field_kinds, instructions, instruction_mnemonic, lookup_instruction
+from mdma.mips_instruction import MIPSInstruction, decode_word
+from mdma.op_formatting import R_FORMAT, I_FORMAT, J_FORMAT, S_FORMAT
+
+from mdma.batch import decode_array, encode_many, encode_into, UNKNOWN_FORMAT
+from mdma.verify import operation_words
+from tests.test_encoding_and_decoding import instr_str_and_expected_hex
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
+
+requires_numpy = pytest.mark.skipif(np is None, reason='numpy is not installed')
+
+words_and_expected_format = [(0x00000000, S_FORMAT),
+                             (0x012a4020, R_FORMAT),
+                             (0x2264ffb3, I_FORMAT),
+                             (0x2264004d, I_FORMAT),
+                             (0x083102ac, J_FORMAT)]
+
+
+@requires_numpy
+def test_decode_array_formats():
+    words = np.array([w for w, _ in words_and_expected_format], dtype=np.uint32)
+    decoded = decode_array(words)
+    assert len(decoded) == len(words)
+    assert list(decoded.format_codes) == [f for _, f in words_and_expected_format]
+    _assert_matches_instructions(decoded, [w for w, _ in words_and_expected_format])
+
+
+def _assert_matches_instructions(decoded, words):
+    for i, word in enumerate(words):
+        mi = MIPSInstruction.from_word(word)
+        assert decoded.op_format(i) == mi.op_format
+        assert decoded.instruction_str(i) == str(mi)
+        for d in mi.data_segments:
+            if d.name != 'unused':
+                assert decoded[d.name][i] == d.decimal
+
+
+@requires_numpy
+def test_decode_array_isa_formats():
+    # add.s, bgezal, mfc0, and lwc1 aren't in the four pre-defined formats, jalr is R format
+    words = [0x46020000, 0x0411000c, 0x40026000, 0xc7a4fff8, 0x0100f809]
+    decoded = decode_array(np.array(words, dtype=np.uint32))
+    assert all(decoded.format_codes[:4] > S_FORMAT)
+    assert decoded.format_codes[4] == R_FORMAT
+    _assert_matches_instructions(decoded, words)
+
+
+@requires_numpy
+def test_decode_array_matches_op_format():
+    words = np.random.default_rng(0).integers(0, 1 << 32, size=10000, dtype=np.uint64).astype(np.uint32)
+    decoded = decode_array(words)
+    for i, word in enumerate(words.tolist()):
+        try:
+            op_format = lookup_instruction(word).op_format
+        except KeyError:
+            assert decoded.format_codes[i] == UNKNOWN_FORMAT
+            with pytest.raises(KeyError):
+                decoded.op_format(i)
+        else:
+            assert decoded.op_format(i) is op_format
+
+
+@requires_numpy
+@pytest.mark.parametrize("mnemonic", sorted(instructions))
+def test_decode_array_matches_decode_word(mnemonic):
+    op_format = instructions[mnemonic].op_format
+    words = operation_words(mnemonic, 0, 64, seed=mnemonic)
+    decoded = decode_array(np.array(words, dtype=np.uint32))
+    for i, word in enumerate(words):
+        assert decoded.op_format(i) is op_format
+        operands = [field_kinds.get(name, (str,))[0](int(decoded[name][i])) for name in op_format.syntax[1:]]
+        assert ' '.join([instruction_mnemonic(word), *operands]) == decode_word(word)
+
+
+@pytest.mark.parametrize("byteorder", ['big', 'little'])
+def test_encode_many(byteorder):
+    lines = [instr_str for instr_str, _ in instr_str_and_expected_hex]
+    expected = b''.join(int(hex_str, 16).to_bytes(4, byteorder) for _, hex_str in instr_str_and_expected_hex)
+    assert encode_many(lines, byteorder) == expected
+    assert encode_many(iter(lines), byteorder) == expected
+
+
+@pytest.mark.parametrize("byteorder", ['big', 'little'])
+def test_encode_into(byteorder):
+    lines = [instr_str for instr_str, _ in instr_str_and_expected_hex]
+    buffer = bytearray(8 + 4 * len(lines))
+    assert encode_into(memoryview(buffer), 8, lines, byteorder) == len(buffer)
+    assert bytes(buffer) == bytes(8) + encode_many(lines, byteorder)
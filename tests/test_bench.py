@@ -0,0 +1,29 @@
+import pytest
+
+from mdma.bench import benchmarks, generate_words, run_benchmarks, FORMAT_NAMES
+from mdma.op_formatting import OpFormat, op_formats
+from mdma.mips_instruction import decode_word, encode_word
+
+
+@pytest.mark.parametrize("format_name", list(FORMAT_NAMES))
+def test_generated_words_round_trip(format_name):
+    for word in generate_words(format_name, 200):
+        assert OpFormat.from_word(word) == op_formats[FORMAT_NAMES[format_name]]
+        assert encode_word(decode_word(word)) == word
+
+
+def test_run_benchmarks():
+    report = run_benchmarks(sizes=[20], format_names=['R', 'J'], startup_runs=1)
+    assert set(report['startup_seconds']) == {'import', 'cli_decode', 'cli_encode'}
+    assert len(report['results']) == len(benchmarks) * 2
+    for result in report['results']:
+        assert result['size'] == 20
+        assert result['peak_memory_bytes'] > 0
+        assert result['peak_memory_sample_size'] == 20
+
+
+def test_peak_memory_is_labelled_as_sampled():
+    report = run_benchmarks(['word_decode'], ['R'], sizes=[50], memory_sample_size=10, startup_runs=0)
+    assert [(r['size'], r['peak_memory_sample_size']) for r in report['results']] == [(50, 10)]
+    report = run_benchmarks(['word_decode'], ['R'], sizes=[50], memory_sample_size=0, startup_runs=0)
+    assert [(r['peak_memory_bytes'], r['peak_memory_sample_size']) for r in report['results']] == [(None, None)]
@@ -0,0 +1,82 @@
+import pytest
+
+from mdma.assembler import assemble
+from mdma.cfg import control_flow, ControlFlowGraph, BasicBlock, Edge
+
+source = '''
+main:   addi $t0, $zero, 10
+loop:   addi $t0 $t0 -1
+        bne $zero $t0 loop
+        jal func
+        j main
+func:   addi $v0 $zero 1
+'''
+base = 0x00400000
+jr_ra = 0x03e00008
+
+
+def _words(program):
+    return [int.from_bytes(program.text[i:i + 4], 'big') for i in range(0, len(program.text), 4)]
+
+
+@pytest.mark.parametrize("word, address, expected", [(0x1500fffe, 0x00400008, ('branch', 0x00400004)),
+                                                     (0x10000003, 0x00400000, ('branch', 0x00400010)),
+                                                     (0x04110002, 0x00400000, ('call', 0x0040000c)),
+                                                     (0x45010002, 0x00400000, ('branch', 0x0040000c)),
+                                                     (0x0500fffe, 0x00400008, ('branch', 0x00400004)),  # bltz
+                                                     (0x05010002, 0x00400000, ('branch', 0x0040000c)),  # bgez
+                                                     (0x45000002, 0x00400000, ('branch', 0x0040000c)),  # bc1f
+                                                     (0x08100005, 0x00400000, ('jump', 0x00400014)),
+                                                     (0x0c100000, 0xf0000000, ('call', 0xf0400000)),
+                                                     (jr_ra, 0, ('return', None)),
+                                                     (0x01000008, 0, ('indirect', None)),
+                                                     (0x0100f809, 0, ('call', None)),
+                                                     (0x012a4020, 0, (None, None)),
+                                                     (0x46020000, 0, (None, None)),  # add.s
+                                                     (0xffffffff, 0, (None, None))])
+def test_control_flow(word, address, expected):
+    assert control_flow(word, address) == expected
+
+
+def test_indirect_call_falls_through():
+    cfg = ControlFlowGraph([0x0100f809, 0x012a4020, jr_ra], base)  # jalr $t0
+    assert cfg.blocks == [BasicBlock(base, base + 4, 'call', None), BasicBlock(base + 4, base + 12, 'return', None)]
+    assert cfg.edges == [Edge(base, base + 4, 'fallthrough')]
+    assert cfg.call_targets == []
+
+
+def test_blocks_and_edges():
+    words = _words(assemble(source)) + [jr_ra]
+    cfg = ControlFlowGraph(words, base)
+    assert cfg.blocks == [BasicBlock(base, base + 4, None, None),
+                          BasicBlock(base + 4, base + 12, 'branch', base + 4),
+                          BasicBlock(base + 12, base + 16, 'call', base + 20),
+                          BasicBlock(base + 16, base + 20, 'jump', base),
+                          BasicBlock(base + 20, base + 28, 'return', None)]
+    assert cfg.call_targets == [base + 20]
+    assert cfg.successors(cfg.blocks[1]) == [Edge(base + 4, base + 4, 'branch'),
+                                             Edge(base + 4, base + 12, 'fallthrough')]
+    assert cfg.successors(cfg.blocks[4]) == []
+    assert sorted(edge.source for edge in cfg.predecessors(cfg.blocks[0])) == [base + 16]
+    assert cfg.blocks[4].instruction_count() == 2
+
+
+def test_block_at():
+    cfg = ControlFlowGraph(_words(assemble(source)) + [jr_ra], base)
+    assert cfg.block_at(base + 8).start == base + 4
+    assert cfg.block_at(base + 24).start == base + 20
+    assert cfg.block_at(base - 4) is None
+    assert cfg.block_at(base + 28) is None
+
+
+def test_delay_slots():
+    words = [0x10000002, 0x00000000, 0x00000000, 0x00000000, jr_ra, 0x00000000]  # beq to 12, return at 16
+    cfg = ControlFlowGraph(words, 0, delay_slots=True)
+    assert [(block.start, block.end) for block in cfg.blocks] == [(0, 8), (8, 12), (12, 24)]
+    assert cfg.blocks[0].target == 12
+
+
+def test_external_targets():
+    cfg = ControlFlowGraph([0x08000400, 0x00000000], base)  # j 0x00001000, outside the words
+    assert cfg.edges == [Edge(base, 0x1000, 'jump')]
+    assert [(block.start, block.end) for block in cfg.blocks] == [(base, base + 4), (base + 4, base + 8)]
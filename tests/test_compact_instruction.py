@@ -0,0 +1,46 @@
+import pickle
+
+import pytest
+
+from mdma.compact_instruction import CompactInstruction
+from mdma.mips_instruction import MIPSInstruction
+from tests.test_encoding_and_decoding import instr_str_and_expected_hex
+
+
+@pytest.mark.parametrize("instr_str, hex_str", instr_str_and_expected_hex)
+def test_compact_matches_mips_instruction(instr_str, hex_str):
+    ci = CompactInstruction(int(hex_str, 16))
+    mi = MIPSInstruction(hex_str=hex_str)
+    assert str(ci) == instr_str
+    assert ci.hex_str == mi.hex_str
+    assert ci.bin_str == mi.bin_str
+    assert ci.op_format == mi.op_format
+    assert [(d.name, d.decimal, str(d)) for d in ci.data_segments] == \
+           [(d.name, d.decimal, str(d)) for d in mi.data_segments]
+    assert [d.name for d in ci.ordered_data_segments] == [d.name for d in mi.ordered_data_segments]
+    assert CompactInstruction.from_instruction_str(instr_str) == ci
+
+
+@pytest.mark.parametrize("word, expected_segments", [
+    (0x46020000, ['add.s', '$f0', '$f0', '$f2']),
+    (0x0411000c, ['bgezal', '$zero', '12']),
+    (0x40026000, ['mfc0', '$v0', '$12']),
+    (0xc7a4fff8, ['lwc1', '$f4', '$sp', '-8']),
+])
+def test_compact_isa_formats(word, expected_segments):
+    ci = CompactInstruction(word)
+    mi = MIPSInstruction.from_word(word)
+    assert [str(d) for d in ci.ordered_data_segments] == expected_segments == str(ci).split()
+    assert ci.op_format == mi.op_format
+    assert [(d.name, d.decimal, str(d)) for d in ci.data_segments] == \
+           [(d.name, d.decimal, str(d)) for d in mi.data_segments]
+    assert ci.fields == {d.name: int(d.bin_str, 2) for d in mi.data_segments}
+
+
+def test_compact_instruction_is_immutable_and_slotted():
+    ci = CompactInstruction(0x012a4020)
+    with pytest.raises(AttributeError):
+        ci.word = 0  # type: ignore
+    assert not hasattr(ci, '__dict__')
+    assert pickle.loads(pickle.dumps(ci)) == ci
+    assert len({ci, CompactInstruction(0x012a4020)}) == 1
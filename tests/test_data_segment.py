@@ -31,3 +31,11 @@ def test_data_segment_from_instr_str(segment_name, instr_str, num_bits, expected
 def test_data_segment_from_instr_str(segment_name, bin_str, expected_instr_str):
     d = DataSegment(name=segment_name, bin_str=bin_str)
     assert str(d) == expected_instr_str
+
+
+@pytest.mark.parametrize('segment_name, bin_str, expected_instr_str', bin_input_and_expected)
+def test_data_segment_from_int(segment_name, bin_str, expected_instr_str):
+    d = DataSegment.from_int(segment_name, int(bin_str, 2), len(bin_str))
+    assert str(d) == expected_instr_str
+    assert d.bin_str == bin_str
+    assert d.decimal == DataSegment(name=segment_name, bin_str=bin_str).decimal
@@ -0,0 +1,117 @@
+import io
+import struct
+import subprocess
+import sys
+
+import pytest
+
+from mdma.disassembler import disassemble_stream, detect_format, elf_text_section, format_line, iter_binary_chunks
+
+words = [0x012a4020, 0x00000000, 0x2264ffb3, 0x083102ac, 0xffffffff]
+expected_lines = ['00000000:  012a4020  add $t0 $t1 $t2',
+                  '00000004:  00000000  sll $zero $zero 0',
+                  '00000008:  2264ffb3  addi $a0 $s3 -77',
+                  '0000000c:  083102ac  j 0x00c40ab0',
+                  '00000010:  ffffffff  .word 0xffffffff']
+
+
+def _elf(text: bytes, byteorder: str = 'big', text_addr: int = 0x400000) -> bytes:
+    """Builds a minimal 32-bit ELF file containing only a .text section"""
+    prefix = '>' if byteorder == 'big' else '<'
+    names = b'\0.text\0.shstrtab\0'
+    header_size, section_header_size = 52, 40
+    text_offset = header_size
+    names_offset = text_offset + len(text)
+    section_headers_offset = names_offset + len(names)
+    ident = b'\x7fELF' + bytes([1, 2 if byteorder == 'big' else 1, 1]) + bytes(9)
+    header = ident + struct.pack(prefix + 'HHIIIIIHHHHHH', 2, 8, 1, text_addr, 0, section_headers_offset, 0,
+                                 header_size, 0, 0, section_header_size, 3, 2)
+    sections = [struct.pack(prefix + 'IIIIIIIIII', *[0]*10),
+                struct.pack(prefix + 'IIIIIIIIII', 1, 1, 6, text_addr, text_offset, len(text), 0, 0, 4, 0),
+                struct.pack(prefix + 'IIIIIIIIII', 7, 3, 0, 0, names_offset, len(names), 0, 0, 1, 0)]
+    return header + text + names + b''.join(sections)
+
+
+class TrickleStream(io.RawIOBase):
+    """Returns at most 3 bytes per read, like a slow pipe"""
+    def __init__(self, data):
+        self.data = data
+
+    def readinto(self, b):
+        n = min(3, len(b), len(self.data))
+        b[:n], self.data = self.data[:n], self.data[n:]
+        return n
+
+    def readable(self):
+        return True
+
+
+def _disassemble(data: bytes, **kwargs):
+    return [line for lines in disassemble_stream(io.BufferedReader(io.BytesIO(data)), **kwargs) for line in lines]
+
+
+@pytest.mark.parametrize('byteorder', ['big', 'little'])
+def test_disassemble_binary(byteorder):
+    data = b''.join(w.to_bytes(4, byteorder) for w in words)
+    assert _disassemble(data, byteorder=byteorder, chunk_size=8) == expected_lines
+
+
+def test_disassemble_hex_dump():
+    data = b'00000000: 012a4020 00000000\n0x2264ffb3\n083102ac ffffffff\n'
+    assert detect_format(io.BufferedReader(io.BytesIO(data))) == 'hex'
+    assert _disassemble(data) == expected_lines
+
+
+@pytest.mark.parametrize('byteorder', ['big', 'little'])
+def test_disassemble_elf(byteorder):
+    data = _elf(b''.join(w.to_bytes(4, byteorder) for w in words), byteorder)
+    assert elf_text_section(io.BytesIO(data)) == (52, 20, 0x400000, byteorder)
+    lines = _disassemble(data)
+    assert [line[10:] for line in lines] == [line[10:] for line in expected_lines]
+    assert lines[0].startswith('00400000:')
+
+
+@pytest.mark.parametrize('stream_type', [io.BytesIO, TrickleStream])  # Without peek(), seekable or not
+def test_detect_format_without_peek(stream_type):
+    data = b'012a4020 00000000\n0x2264ffb3\n083102ac ffffffff\n'
+    stream = stream_type(data)
+    lines = [line for lines in disassemble_stream(stream) for line in lines]
+    assert lines == expected_lines
+    assert not stream.closed
+    stream = io.BytesIO(data)
+    assert detect_format(stream) == 'hex' and stream.tell() == 0
+
+
+def test_words_out_of_range():
+    assert format_line(0, 0x123456789) == '00000000:  123456789  .word 0x123456789'
+    with pytest.raises(ValueError):
+        _disassemble(b'012a4020\n123456789\n', input_format='hex')
+
+
+@pytest.mark.parametrize("chunk_size", [0, 3, 6, -4])
+def test_binary_chunk_size_must_be_whole_words(chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_binary_chunks(io.BytesIO(bytes(16)), chunk_size=chunk_size))
+
+
+def test_cli_invalid_hex_word():
+    result = subprocess.run([sys.executable, '-m', 'mdma', 'disasm', '-f', 'hex'], input='012a4020\nzz\n',
+                            capture_output=True, text=True)
+    assert result.returncode == 2
+    assert 'Traceback' not in result.stderr
+    assert 'error: Hex dump word is not a hex number: zz' in result.stderr
+
+
+def test_binary_chunks_carry_partial_words():
+    data = b''.join(w.to_bytes(4, 'big') for w in words)
+    chunks = list(iter_binary_chunks(TrickleStream(data), chunk_size=8))  # type: ignore
+    assert [w for chunk in chunks for w in chunk] == words
+
+
+@pytest.mark.parametrize("address, expected", [(0, '0c000405  jal 0x00001014'),
+                                                (0x8000100c, '0c000405  jal 0x80001014'),
+                                                (0x8ffffffc, '0c000405  jal 0x90001014'),  # The delay slot's region
+                                                (0x80001000, '1408fffe  bne $t0 $zero -2')])
+def test_jump_targets_use_program_counter(address, expected):
+    word = int(expected[:8], 16)
+    assert format_line(address, word) == f'{address:08x}:  {expected}'
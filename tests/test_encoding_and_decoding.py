@@ -1,6 +1,6 @@
 import pytest
 
-from mdma.mips_instruction import MIPSInstruction
+from mdma.mips_instruction import MIPSInstruction, decode_word, encode_word, enable_cache, disable_cache, cache_info
 
 # ToDo: Add j format test once j format support is better
 instr_str_and_expected_hex = [("sll $zero $zero 0", '0x00000000'),
@@ -32,3 +32,86 @@ def test_encoding(expected_instr_str, hex_str):
     assert str(mi) == expected_instr_str
     decoded_str_encoded = MIPSInstruction(instruction_str=mi.instruction_str)
     assert decoded_str_encoded.hex_str == hex_str
+
+
+@pytest.mark.parametrize("expected_instr_str, hex_str", instr_str_and_expected_hex)
+def test_decoding_from_word(expected_instr_str, hex_str):
+    """Test that decoding from an integer word matches decoding from the hex string"""
+    word = int(hex_str, 16)
+    mi = MIPSInstruction.from_word(word)
+    assert str(mi) == expected_instr_str
+    assert decode_word(word) == expected_instr_str
+    assert mi.hex_str == hex_str
+    assert mi.bin_str == bin(word)[2:].zfill(32)
+    from_hex = MIPSInstruction(hex_str=hex_str)
+    assert [(d.name, d.bin_str, d.decimal) for d in mi.data_segments] == \
+           [(d.name, d.bin_str, d.decimal) for d in from_hex.data_segments]
+
+
+@pytest.mark.parametrize("instr_str, expected_hex", instr_str_and_expected_hex)
+def test_encode_word(instr_str, expected_hex):
+    assert encode_word(instr_str) == int(expected_hex, 16)
+    assert encode_word(instr_str.replace(' ', ', ', 2).replace(',', '', 1)) == int(expected_hex, 16)
+
+
+@pytest.fixture
+def cache():
+    enable_cache(maxsize=2)
+    yield
+    disable_cache()
+
+
+def test_cache_hits_and_misses(cache):
+    first = MIPSInstruction(hex_str='0x012a4020')
+    second = MIPSInstruction.from_word(0x012a4020)
+    assert str(first) == str(second) == decode_word(0x012a4020) == 'add $t0 $t1 $t2'
+    assert first.data_segments[0] is second.data_segments[0]  # Shared, not rebuilt
+    assert first.data_segments is not second.data_segments
+    assert cache_info()['decode'].hits == 2
+    assert cache_info()['decode'].misses == 1
+
+    encoded = [MIPSInstruction(instruction_str='add $t0, $t1, $t2'), MIPSInstruction(instruction_str='add $t0 $t1 $t2')]
+    assert [mi.hex_str for mi in encoded] == ['0x012a4020'] * 2
+    assert encode_word('add   $t0 $t1 $t2') == 0x012a4020
+    assert (cache_info()['encode'].hits, cache_info()['encode'].misses) == (2, 1)
+
+    for word in [0, 0x2264ffb3, 0x083102ac]:
+        decode_word(word)
+    assert cache_info()['decode'].currsize == 2  # Bounded
+
+
+@pytest.mark.parametrize("instr_str", ['add $t0,$t1,$t2', 'addi $a0,$s3, -77', 'j 0x00c40ab0'])
+def test_cached_encoding_matches_uncached(instr_str):
+    expected = encode_word(instr_str)
+    enable_cache()
+    try:
+        assert encode_word(instr_str) == encode_word(instr_str) == expected
+    finally:
+        disable_cache()
+
+
+def test_cached_data_segments_are_read_only(cache):
+    for instruction in [MIPSInstruction.from_word(0x012a4020), MIPSInstruction(instruction_str='add $t0 $t1 $t2')]:
+        for segment in instruction.data_segments + instruction.ordered_data_segments:
+            with pytest.raises(AttributeError):
+                segment.human_readable = '$zero'
+        assert [str(d) for d in instruction.ordered_data_segments] == ['add', '$t0', '$t1', '$t2']
+
+
+def test_hex_and_bin_str_are_assignable():
+    mi = MIPSInstruction.from_word(0x012a4020)
+    mi.hex_str, mi.bin_str = '0x012A4020', '1' * 32
+    assert (mi.hex_str, mi.bin_str, mi.word) == ('0x012A4020', '1' * 32, 0x012a4020)
+
+
+def test_cache_disabled_by_default():
+    assert cache_info() == {'decode': None, 'encode': None}
+
+
+def test_lazy_package_exports():
+    import mdma
+    assert mdma.MIPSInstruction is MIPSInstruction
+    assert mdma.encode_word is encode_word
+    assert set(mdma.__all__) <= set(dir(mdma))
+    for name in mdma.__all__:
+        getattr(mdma, name)
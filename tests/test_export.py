@@ -0,0 +1,66 @@
+import csv
+import io
+
+import pytest
+
+try:
+    import pyarrow  # type: ignore
+except ImportError:  # pyarrow is an optional dependency
+    pyarrow = None
+
+from mdma.export import COLUMNS, export_stream, iter_row_batches, write_csv, write_arrow
+
+requires_pyarrow = pytest.mark.skipif(pyarrow is None, reason='pyarrow is not installed')
+
+words = [0x012a4020, 0x00000000, 0x2264ffb3, 0x083102ac, 0xffffffff, 0x46020000, 0x0411000c, 0x40026000]
+_ = None
+expected_rows = [[0, 0x012a4020, 'R', 0, 9, 10, 8, 0, 32, _, _, _, _, _, _, _, _, _, 'add'],
+                 [4, 0x00000000, 'R', 0, 0, 0, 0, 0, 0, _, _, _, _, _, _, _, _, _, 'sll'],
+                 [8, 0x2264ffb3, 'I', 8, 19, 4, _, _, _, -77, _, _, _, _, _, _, _, _, 'addi'],
+                 [12, 0x083102ac, 'J', 2, _, _, _, _, _, _, 0x3102ac, _, _, _, _, _, _, _, 'j'],
+                 [16, 0xffffffff, _, _, _, _, _, _, _, _, _, _, _, _, _, _, _, _, _],  # Unknown
+                 [20, 0x46020000, 'R', 17, _, _, _, _, 0, _, _, _, _, 0, _, 2, 16, 0, 'add.s'],
+                 [24, 0x0411000c, 'I', 1, 0, 17, _, _, _, 12, _, _, _, _, _, _, _, _, 'bgezal'],
+                 [28, 0x40026000, 'R', 16, _, 2, _, _, _, _, _, 0, 12, _, _, _, _, _, 'mfc0']]
+
+
+def test_columns():
+    assert COLUMNS == ['address', 'word', 'format', 'op', 'rs', 'rt', 'rd', 'shamt', 'func', 'immediate', 'target',
+                       'sub', 'cs', 'fs', 'tf', 'ft', 'fmt', 'fd', 'mnemonic']
+
+
+def test_row_batches():
+    batches = list(iter_row_batches([(0, words[:2]), (8, words[2:])]))
+    assert [len(rows) for rows in batches] == [2, 6]
+    assert [row for rows in batches for row in rows] == expected_rows
+
+
+def test_write_csv():
+    output = io.StringIO(newline='')
+    assert write_csv([(0, words)], output) == len(words)
+    rows = list(csv.reader(io.StringIO(output.getvalue())))
+    assert rows[0] == COLUMNS
+    assert rows[3] == ['8', str(0x2264ffb3), 'I', '8', '19', '4', '', '', '', '-77', *[''] * 8, 'addi']
+
+
+def test_export_stream_chunks():
+    data = b''.join(w.to_bytes(4, 'big') for w in words)
+    output = io.StringIO(newline='')
+    count = export_stream(io.BufferedReader(io.BytesIO(data)), output, 'csv', 'binary', base_address=0x400000,
+                          chunk_size=8)
+    assert count == len(words)
+    assert output.getvalue().splitlines()[5] == f'{0x400010},{0xffffffff}' + ',' * 17
+
+
+@requires_pyarrow
+@pytest.mark.parametrize('file_format', ['arrow', 'parquet'])
+def test_write_arrow(tmp_path, file_format):
+    import pyarrow.parquet as pq  # type: ignore
+    path = str(tmp_path / f'out.{file_format}')
+    assert write_arrow([(0, words[:2]), (8, words[2:])], path, file_format) == len(words)
+    if file_format == 'parquet':
+        table = pq.read_table(path)
+    else:
+        table = pyarrow.ipc.open_file(path).read_all()
+    assert table.column_names == COLUMNS
+    assert [list(row.values()) for row in table.to_pylist()] == expected_rows
@@ -0,0 +1,76 @@
+import pytest
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from mdma.disassembler import disassemble_stream
+from mdma.image import MappedImage
+from mdma.symbols import Symbol, SymbolTable
+from tests.test_disassembler import _elf
+
+requires_numpy = pytest.mark.skipif(np is None, reason='numpy is not installed')
+
+words = [0x012a4020, 0x00000000, 0x2264ffb3, 0x083102ac, 0xffffffff]
+
+
+@pytest.fixture(params=['big', 'little'])
+def image_path(request, tmp_path):
+    path = tmp_path / f'{request.param}.bin'
+    path.write_bytes(b''.join(w.to_bytes(4, request.param) for w in words) + b'\x01')  # Trailing byte is ignored
+    return str(path), request.param
+
+
+def test_random_access(image_path):
+    path, byteorder = image_path
+    with MappedImage(path, 'binary', byteorder, base_address=0x1000) as image:
+        assert len(image) == 5 and image.end_address == 0x1014
+        assert str(image[0x1008]) == 'addi $a0 $s3 -77'
+        assert image.word(0x1010) == 0xffffffff
+        assert [str(instruction) for instruction in image[0x1000:0x1008]] == ['add $t0 $t1 $t2', 'sll $zero $zero 0']
+        assert [instruction.word for instruction in image.range(0x100c)] == words[3:]
+        assert list(image.words(0x0ff0, 0x2000)) == words  # Clamped to the image
+        assert list(image.words(0x1010, 0x1004)) == []
+        with pytest.raises(IndexError):
+            image[0x1014]
+        with pytest.raises(ValueError):
+            image[0x1002]
+
+
+def test_disassemble_matches_stream(image_path):
+    path, byteorder = image_path
+    with open(path, 'rb') as f:
+        expected = [line for lines in disassemble_stream(f, 'binary', byteorder) for line in lines]
+    with MappedImage(path, 'binary', byteorder) as image:
+        assert image.disassemble() == expected
+        assert image.disassemble(8, 12) == expected[2:3]
+        assert image.disassemble(0, 8, SymbolTable([Symbol(4, 'f')])) == [expected[0], '<f>:', expected[1]]
+
+
+@requires_numpy
+def test_array(image_path):
+    path, byteorder = image_path
+    with MappedImage(path, 'binary', byteorder) as image:
+        array = image.array(4, 16)
+        assert array.tolist() == words[1:4] and not array.flags.writeable
+        del array
+
+
+def test_elf(tmp_path):
+    path = tmp_path / 'program.elf'
+    path.write_bytes(_elf(b''.join(w.to_bytes(4, 'little') for w in words), 'little', text_addr=0x400000))
+    with MappedImage(str(path)) as image:
+        assert (image.base_address, image.byteorder, len(image)) == (0x400000, 'little', 5)
+        assert image[0x40000c].word == 0x083102ac
+
+
+def test_empty_and_hex(tmp_path):
+    path = tmp_path / 'empty.bin'
+    path.write_bytes(b'')
+    with MappedImage(str(path), 'binary') as image:
+        assert len(image) == 0 and image.range() == []
+    path = tmp_path / 'words.hex'
+    path.write_text('012a4020\n')
+    with pytest.raises(ValueError):
+        MappedImage(str(path))
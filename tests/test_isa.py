@@ -0,0 +1,117 @@
+import pytest
+
+from mdma import isa
+from mdma.assembler import assemble
+from mdma.bench import generate_words
+from mdma.cfg import control_flow
+from mdma.isa import (Instruction, DispatchTable, cop_format, opcode_table, define_instructions, lookup_instruction,
+                      instruction_mnemonic, selector_key, decode_instruction, encode_instruction, expand_pseudo)
+from mdma.mips_instruction import MIPSInstruction, decode_word, encode_word
+
+
+@pytest.fixture
+def restore_isa():
+    saved = list(isa.instructions.values())
+    yield
+    isa.instructions.clear()
+    isa._compiled.clear()
+    define_instructions(saved)
+
+
+def test_opcode_table():
+    assert len(opcode_table) == 64
+    assert isinstance(opcode_table[0], DispatchTable) and opcode_table[0].shift == 0  # Dispatched on func
+    assert isinstance(opcode_table[0b000001], DispatchTable) and opcode_table[0b000001].shift == 16  # On rt
+    assert opcode_table[0b111111] is None
+
+
+@pytest.mark.parametrize("word, instruction_str", [(0x04110003, 'bgezal $zero 3'),
+                                                   (0x0620fffe, 'bltz $s1 -2'),
+                                                   (0x40886000, 'mtc0 $t0 $12'),
+                                                   (0x42000018, 'eret'),
+                                                   (0x44843000, 'mtc1 $a0 $f6'),
+                                                   (0x46041080, 'add.s $f2 $f2 $f4'),
+                                                   (0x46202004, 'sqrt.d $f0 $f4'),
+                                                   (0x4600103c, 'c.lt.s $f2 $f0'),
+                                                   (0x45010002, 'bc1t 2'),
+                                                   (0xc7a40008, 'lwc1 $f4 $sp 8')])
+def test_extended_instructions(word, instruction_str):
+    assert decode_instruction(word) == instruction_str
+    assert encode_instruction(instruction_str) == word
+    assert decode_word(word) == instruction_str
+    assert encode_word(instruction_str) == word
+    assert MIPSInstruction(hex_str=f'0x{word:08x}').instruction_str == instruction_str
+    assert MIPSInstruction(instruction_str=instruction_str).hex_str == f'0x{word:08x}'
+
+
+@pytest.mark.parametrize("format_name", ['R', 'I', 'J', 'shift'])
+def test_base_instructions_match_legacy(format_name):
+    for word in generate_words(format_name, 200):
+        assert decode_instruction(word) == MIPSInstruction.from_word(word).instruction_str
+        assert encode_instruction(decode_instruction(word)) == word
+
+
+def test_lookup():
+    assert lookup_instruction(0x012a4020).mnemonic == 'add'
+    assert instruction_mnemonic(0x46041080) == 'add.s'
+    assert instruction_mnemonic(0xffffffff) is None
+    assert selector_key(0x46041080) == selector_key(0x46000000) == 0x46000000 != selector_key(0x46200000)
+    with pytest.raises(KeyError, match='UNKNOWN OPERATION'):
+        lookup_instruction(0x04050000)  # REGIMM with an undefined rt
+
+
+@pytest.mark.parametrize("instruction_str, expected", [('nop', ['sll $zero $zero 0']),
+                                                       ('move $t0, $t1', ['addu $t0 $t1 $zero']),
+                                                       ('li $t0 0x12345678', ['lui $t0 $zero 4660',
+                                                                              'ori $t0 $t0 22136']),
+                                                       ('li $t0 -1', ['lui $t0 $zero 65535', 'ori $t0 $t0 -1']),
+                                                       ('bnez $t0 loop', ['bne $zero $t0 loop']),
+                                                       ('add $t0 $t1 $t2', ['add $t0 $t1 $t2'])])
+def test_expand_pseudo(instruction_str, expected):
+    assert expand_pseudo(instruction_str) == expected
+
+
+def test_expand_pseudo_errors():
+    with pytest.raises(ValueError):
+        expand_pseudo('move $t0')
+    with pytest.raises(ValueError):
+        expand_pseudo('li $t0 0x100000000')
+
+
+def test_assemble_pseudo_and_extended():
+    program = assemble('''
+    main:   li $t0 0x00010002
+            move $a0 $t0
+            lwc1 $f2 $sp 4
+            bnez $t0 main
+            nop
+    ''')
+    words = [int.from_bytes(program.text[i:i + 4], 'big') for i in range(0, len(program.text), 4)]
+    assert [decode_instruction(word) for word in words] == ['lui $t0 $zero 1', 'ori $t0 $t0 2',
+                                                           'addu $a0 $t0 $zero', 'lwc1 $f2 $sp 4',
+                                                           'bne $zero $t0 -5', 'sll $zero $zero 0']
+
+
+def test_define_instructions(restore_isa):
+    define_instructions([Instruction('wait', cop_format, {'op': 0b010000, 'sub': 0b10000, 'func': 0b100000})])
+    assert decode_instruction(encode_instruction('wait')) == 'wait'
+    assert decode_instruction(0x42000018) == 'eret'
+    # Same fixed bits as eret, so it replaces eret
+    define_instructions([Instruction('rfe', cop_format, {'op': 0b010000, 'sub': 0b10000, 'func': 0b011000})])
+    assert decode_instruction(0x42000018) == 'rfe'
+    assert 'eret' not in isa.instructions
+
+
+def test_define_control_flow_instruction(restore_isa):
+    assert control_flow(0x49010002, 0x00400000) == (None, None)
+    define_instructions([Instruction('bc2t', isa.fp_branch_format, {'op': 0b010010, 'sub': 0b01000, 'tf': 1},
+                                     isa.BRANCH)])
+    assert control_flow(0x49010002, 0x00400000) == ('branch', 0x0040000c)
+
+
+def test_define_ambiguous_instructions(restore_isa):
+    with pytest.raises(ValueError, match='Ambiguous'):
+        define_instructions([Instruction('mfc2', isa.cop_move_format, {'op': 0b010010}),
+                             Instruction('mtc2', isa.cop_move_format, {'op': 0b010010, 'sub': 0b00100})])
+    assert 'mfc2' not in isa.instructions  # Nothing is defined if the definitions don't compile
+    assert instruction_mnemonic(0x48000000) is None
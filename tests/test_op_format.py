@@ -1,11 +1,16 @@
 import pytest
-from mdma.op_formatting import OpFormat, r_format, i_format, j_format, s_format
+from mdma.isa import regimm_format, fp_r_format, fp_memory_format
+from mdma.op_formatting import OpFormat, Registers, r_format, i_format, j_format, s_format, codes, op_names, func_names
+from mdma.op_formatting import load_codes_json, generate_codes_module, _codes_module_path
 
 
 instr_str_and_expected_format = [('add', r_format),
                                  ('addi', i_format),
                                  ('j', j_format),
-                                 ('sll', s_format)]
+                                 ('sll', s_format),
+                                 ('bgez', regimm_format),
+                                 ('add.s', fp_r_format),
+                                 ('lwc1', fp_memory_format)]
 
 op_and_func_bits_and_expected_format = [('000000', '100000', r_format),
                                         ('001000', '123456', i_format),
@@ -19,7 +24,64 @@ def test_from_instruction_str(instr_str, expected_op_format):
     assert op_format == expected_op_format
 
 
+@pytest.mark.parametrize("instr_str", ['lwel', 'special', 'foo'])
+def test_from_unknown_instruction_str(instr_str):
+    with pytest.raises(Exception):
+        OpFormat.from_instruction_str(instr_str)
+
+
 @pytest.mark.parametrize("op_bits, func_bits, expected_op_format", op_and_func_bits_and_expected_format)
 def test_from_op_and_func_bits(op_bits, func_bits, expected_op_format):
     op_format = OpFormat.from_op_and_func(op_bits, func_bits)
     assert op_format == expected_op_format
+
+
+word_bits_and_expected_format = [('000000', '100000', r_format),
+                                 ('001000', '101010', i_format),
+                                 ('000010', '000000', j_format),
+                                 ('000000', '000000', s_format)]
+
+
+@pytest.mark.parametrize("op_bits, func_bits, expected_op_format", word_bits_and_expected_format)
+def test_from_word(op_bits, func_bits, expected_op_format):
+    word = int(op_bits + '0'*20 + func_bits, 2)
+    assert OpFormat.from_word(word) == expected_op_format
+
+
+def test_unpack():
+    assert r_format.unpack(0x012a4020) == {'op': 0, 'rs': 9, 'rt': 10, 'rd': 8, 'shamt': 0, 'func': 0b100000}
+    assert i_format.unpack(0x2264ffb3) == {'op': 0b001000, 'rs': 19, 'rt': 4, 'immediate': 0xffb3}
+
+
+def test_names_match_codes():
+    for bin_str, op_name in codes['op'].items():
+        assert op_names[int(bin_str, 2)] == op_name
+        if op_name not in ['special', 'bgez', 'lwc1', 'swc1']:  # The ISA has REGIMM and FPU formats for these
+            assert OpFormat.from_instruction_str(op_name) == OpFormat.from_op_and_func(bin_str)
+    for bin_str, func_name in codes['func'].items():
+        assert func_names[int(bin_str, 2)] == func_name
+        assert OpFormat.from_instruction_str(func_name) == OpFormat.from_op_and_func('000000', bin_str)
+
+
+@pytest.mark.parametrize("register_name, expected_num", [('$t0', 8), ('t0', 8), ('$8', 8), ('$zero', 0), ('$31', 31)])
+def test_register_lookup(register_name, expected_num):
+    assert Registers.register_num(register_name) == expected_num
+    assert Registers.register_name(expected_num) == str(Registers(expected_num))
+
+
+@pytest.mark.parametrize("register_name", ['$26', '$32', '$foo'])
+def test_unknown_register(register_name):
+    with pytest.raises(ValueError):
+        Registers.register_num(register_name)
+
+
+@pytest.mark.parametrize("op_format, word", [(r_format, 0x012a4020), (i_format, 0x2264ffb3), (j_format, 0x083102ac)])
+def test_pack_is_inverse_of_unpack(op_format, word):
+    assert op_format.pack(op_format.unpack(word)) == word
+
+
+def test_generated_codes_module_is_up_to_date():
+    """_codes.py must be regenerated (python -m mdma.op_formatting) whenever func_and_opcodes.json changes"""
+    assert codes == load_codes_json()
+    with open(_codes_module_path) as f:
+        assert f.read() == generate_codes_module()
@@ -0,0 +1,44 @@
+import io
+import random
+
+import pytest
+
+from mdma.disassembler import disassemble_stream
+from mdma.parallel import collect_stats_parallel, decode_parallel, disassemble_file_parallel
+from tests.test_disassembler import _elf
+
+random.seed(0)
+data = bytes(random.getrandbits(8) for _ in range(4 * 1000 + 3))
+
+
+def _serial(data: bytes, **kwargs):
+    return [line for lines in disassemble_stream(io.BufferedReader(io.BytesIO(data)), **kwargs) for line in lines]
+
+
+@pytest.mark.parametrize('byteorder', ['big', 'little'])
+def test_decode_parallel_matches_serial(byteorder):
+    lines = [line for lines in decode_parallel(data, workers=2, byteorder=byteorder, range_size=256) for line in lines]
+    assert lines == _serial(data, input_format='binary', byteorder=byteorder)
+
+
+def test_disassemble_file_parallel_elf(tmp_path):
+    elf = _elf(data[:400], 'little')
+    path = tmp_path / 'test.elf'
+    path.write_bytes(elf)
+    lines = [line for lines in disassemble_file_parallel(str(path), workers=2) for line in lines]
+    assert lines == _serial(elf)
+    assert lines[0].startswith('00400000:')
+
+
+def test_decode_parallel_empty():
+    assert list(decode_parallel(b'\x00\x00', workers=2)) == []
+
+
+@pytest.mark.parametrize("range_size", [0, 2, 6, -4])
+def test_range_size_must_be_whole_words(range_size, tmp_path):
+    with pytest.raises(ValueError):
+        list(decode_parallel(data, workers=2, range_size=range_size))
+    path = tmp_path / 'test.bin'
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        collect_stats_parallel(str(path), workers=2, range_size=range_size)
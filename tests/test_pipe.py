@@ -0,0 +1,63 @@
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+from mdma.pipe import LineResult, process_lines, format_results, process_stream
+
+lines = ['0x012a4020\n', '2264ffb3\n', '0x083102ac\n']
+expected_text = '''=======
+Machine Code: 0x012a4020
+Binary: 00000001001010100100000000100000
+DECODED: add $t0 $t1 $t2
+=======
+
+'''
+
+
+def _process(data: str, operation=None, output_format='plain', read_size=1 << 20):
+    output = io.StringIO()
+    counts = process_stream(io.StringIO(data), output, operation, output_format, read_size)
+    return output.getvalue(), counts
+
+
+def test_process_lines():
+    assert process_lines(['decode 0x012a4020', '', 'encode add $t0, $t1, $t2', 'decode zz', 'bogus 1'], None, 10) == [
+        LineResult(10, 'decode', '0x012a4020', 'add $t0 $t1 $t2', None),
+        LineResult(12, 'encode', 'add $t0, $t1, $t2', '0x012a4020', None),
+        LineResult(13, 'decode', 'zz', None, "invalid literal for int() with base 16: 'zz'"),
+        LineResult(14, None, '1', None, 'INVALID OPERATION. Format: {encode, decode} input (e.g. decode 0x00000000)')]
+
+
+@pytest.mark.parametrize("output_format", ['plain', 'text', 'jsonl'])
+@pytest.mark.parametrize("operation, data", [('decode', ''.join(lines)),
+                                             ('encode', 'add $t0 $t1 $t2\naddi $a0 $s3 -77\nj 0x00c40ab0\n')])
+def test_batches_match_line_by_line(operation, data, output_format):
+    """Batches without errors are formatted without LineResults, which must give the same output"""
+    expected = format_results(process_lines(data.splitlines(), operation), output_format)
+    assert _process(data, operation, output_format, read_size=8) == (expected, (3, 0))
+    assert _process(''.join(f'{operation} {line}\n' for line in data.splitlines()), None, output_format) == \
+        (expected, (3, 0))
+
+
+def test_output_formats():
+    assert _process(''.join(lines), 'decode', 'text')[0].startswith(expected_text)
+    assert _process(''.join(lines), 'decode')[0] == 'add $t0 $t1 $t2\naddi $a0 $s3 -77\nj 0x00c40ab0\n'
+    output, counts = _process('0x012a4020\n\nencode\nzz\n', 'decode', 'jsonl', read_size=1)
+    assert [json.loads(line) for line in output.splitlines()] == [
+        {'line': 1, 'op': 'decode', 'input': '0x012a4020', 'result': 'add $t0 $t1 $t2'},
+        {'line': 3, 'op': 'decode', 'input': 'encode', 'error': "invalid literal for int() with base 16: 'encode'"},
+        {'line': 4, 'op': 'decode', 'input': 'zz', 'error': "invalid literal for int() with base 16: 'zz'"}]
+    assert counts == (3, 2)
+    with pytest.raises(ValueError):
+        _process('', 'decode', 'xml')
+
+
+def test_cli_batch():
+    result = subprocess.run([sys.executable, '-m', 'mdma', 'encode', '--batch', '--emit', 'plain'],
+                            input='add $t0 $t1 $t2\nbogus\nj 0x00c40ab0\n', capture_output=True, text=True)
+    assert result.returncode == 1
+    assert result.stdout == '0x012a4020\nERROR: UNKNOWN OPERATION: bogus\n0x083102ac\n'
+    assert result.stderr == '1 of 3 lines failed\n'
@@ -0,0 +1,72 @@
+import subprocess
+import sys
+
+import pytest
+
+from mdma import profiling
+from mdma.mips_instruction import MIPSInstruction, decode_word, encode_word, enable_cache, disable_cache
+from mdma.profiling import Profiler, enable_profiling, disable_profiling, profile_snapshot, format_name
+
+
+@pytest.fixture
+def profiler():
+    yield enable_profiling()
+    disable_profiling()
+
+
+def test_disabled_by_default():
+    assert profiling.active is None and profile_snapshot() is None
+    assert decode_word(0x012a4020) == 'add $t0 $t1 $t2'
+
+
+def test_instruction_stages(profiler):
+    assert MIPSInstruction(hex_str='0x012a4020').instruction_str == 'add $t0 $t1 $t2'
+    assert MIPSInstruction(instruction_str='addi $a0 $s3 -77').hex_str == '0x2264ffb3'
+    assert MIPSInstruction.from_word(0x000a4080).instruction_str == 'sll $zero $t2 2'
+    assert MIPSInstruction(instruction_str='sll $zero $t2 2').word == 0x000a0080
+    snapshot = profile_snapshot()
+    assert {key: value['count'] for key, value in snapshot['stages'].items()} == \
+        {'decode.parse': 1, 'decode.lookup': 2, 'decode.segments': 2, 'decode.format': 2,
+         'encode.parse': 2, 'encode.lookup': 2, 'encode.segments': 2, 'encode.format': 2}
+    assert {key: value['count'] for key, value in snapshot['formats'].items()} == \
+        {'decode.R': 1, 'decode.shift': 1, 'encode.I': 1, 'encode.shift': 1}
+    assert all(value['seconds'] > 0 for value in snapshot['stages'].values())
+
+
+def test_word_stages(profiler):
+    assert decode_word(0x46041080) == 'add.s $f2 $f2 $f4'
+    assert encode_word('j 0x00c40ab0') == 0x083102ac
+    with pytest.raises(Exception, match='UNKNOWN OPERATION'):
+        encode_word('bogus $t0')
+    assert sorted(profiler.stages) == ['decode.format', 'decode.lookup', 'encode.error', 'encode.lookup',
+                                       'encode.pack', 'encode.parse']
+    assert profiler.stages['encode.parse'][0] == 2 and profiler.stages['encode.error'][0] == 1
+    assert profiler.formats['encode.?'][0] == 1  # The failed encoding's format is unknown
+    assert sorted(profiler.formats) == ['decode.fp_r', 'encode.?', 'encode.J']
+
+
+def test_cached_stages(profiler):
+    enable_cache()
+    try:
+        decode_word(0x012a4020)
+        MIPSInstruction(instruction_str='add $t0 $t1 $t2')
+    finally:
+        disable_cache()
+    assert sorted(profiler.stages) == ['decode.cache', 'encode.cache']
+
+
+def test_report():
+    profiler = Profiler()
+    profiler.record('decode', None, [('lookup', 1000), ('parse', 3000)])
+    report = profiler.report()
+    assert report.index('decode.parse') < report.index('decode.lookup')  # In pipeline order
+    assert 'decode.?' in report and '75.0%' in report
+    profiler.reset()
+    assert profiler.snapshot() == {'stages': {}, 'formats': {}}
+    assert format_name(None) == '?'
+
+
+def test_env_var_report():
+    result = subprocess.run([sys.executable, '-c', 'from mdma import decode_word; decode_word(0)'],
+                            env={'MDMA_PROFILE': '1'}, capture_output=True, text=True, check=True)
+    assert 'decode.lookup' in result.stderr and 'decode.shift' in result.stderr
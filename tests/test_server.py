@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+import pytest
+
+from mdma.server import MDMAClient, MDMAServer
+from tests.test_encoding_and_decoding import instr_str_and_expected_hex
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    yield from _serve(MDMAServer(), str(tmp_path / 'mdma.sock'))
+
+
+def _serve(mdma_server, path):
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    async def run():
+        server = await mdma_server.start(path=path)
+        started.set()
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(run(),), daemon=True)
+    thread.start()
+    started.wait(5)
+    yield path
+    loop.call_soon_threadsafe(lambda: [task.cancel() for task in asyncio.all_tasks(loop)])
+    thread.join(5)
+
+
+def test_single_and_batched_requests(socket_path):
+    with MDMAClient(path=socket_path) as client:
+        for instr_str, hex_str in instr_str_and_expected_hex:
+            assert client.decode(hex_str) == instr_str
+            assert client.decode(int(hex_str, 16)) == instr_str
+            assert client.encode(instr_str) == hex_str
+        assert client.decode([hex_str for _, hex_str in instr_str_and_expected_hex]) == \
+               [instr_str for instr_str, _ in instr_str_and_expected_hex]
+        stats = client.stats()
+        assert stats['decode']['count'] == 2 * len(instr_str_and_expected_hex) + 1
+        assert stats['encode']['p99_us'] <= stats['encode']['max_us']
+
+
+def test_errors_and_pipelining(socket_path):
+    with MDMAClient(path=socket_path) as client, MDMAClient(path=socket_path) as other_client:
+        responses = client.request_many([{'id': 'a', 'op': 'decode', 'input': ['0x012a4020', 'zz']},
+                                         {'id': 'b', 'op': 'encode', 'input': 'foo $t0'},
+                                         {'id': 'c', 'op': 'bogus'}, {'id': 'd', 'op': ['decode']}] +
+                                        [{'op': 'encode', 'input': 'add $t0 $t1 $t2'}] * 100)
+        assert other_client.decode('0x00000000') == 'sll $zero $zero 0'
+        assert responses[0]['result'] == ['add $t0 $t1 $t2', None]
+        assert responses[0]['errors'][0][0] == 1
+        assert 'UNKNOWN OPERATION' in responses[1]['error']
+        assert responses[2]['id'] == 'c' and 'error' in responses[2]
+        assert responses[3] == {'id': 'd', 'error': "INVALID OPERATION: ['decode']"}
+        assert [r['result'] for r in responses[4:]] == ['0x012a4020'] * 100
+        with pytest.raises(RuntimeError):
+            client.encode('foo')
+
+
+def test_batches_do_not_block_other_connections(tmp_path):
+    batch_started, other_served = threading.Event(), threading.Event()
+
+    def wait(_):
+        batch_started.set()
+        return 'done' if other_served.wait(5) else 'timed out'
+
+    class WaitingServer(MDMAServer):
+        operations = {**MDMAServer.operations, 'wait': wait}
+
+    for path in _serve(WaitingServer(), str(tmp_path / 'mdma.sock')):
+        with MDMAClient(path=path) as client, MDMAClient(path=path) as other_client:
+            results = []
+            thread = threading.Thread(target=lambda: results.append(client.request('wait', [None])))
+            thread.start()
+            assert batch_started.wait(5)
+            assert other_client.decode('0x00000000') == 'sll $zero $zero 0'  # While the batch is still waiting
+            other_served.set()
+            thread.join(5)
+            assert results == [['done']]
@@ -0,0 +1,97 @@
+import random
+import struct
+
+import pytest
+
+from mdma.assembler import assemble
+from mdma.batch import encode_many
+from mdma.cfg import ControlFlowGraph
+from mdma.disassembler import format_line
+from mdma.mips_instruction import encode_word
+from mdma.session import DisassemblySession, SessionUpdate
+
+source = '''
+main:   addi $t0, $zero, 10
+loop:   addi $t0 $t0 -1
+        bne $zero $t0 loop
+        j main
+        add $t0 $t1 $t2
+'''
+base = 0x00400000
+
+
+@pytest.fixture
+def session():
+    return DisassemblySession(bytearray(assemble(source).text), base_address=base)
+
+
+def test_initial_listing(session):
+    assert session.labels == [base, base + 4]
+    assert list(session.listing())[:3] == ['L_00400000:', format_line(base, 0x2008000a), 'L_00400004:']
+    assert session.referrers(base + 4) == [base + 8]
+
+
+def test_patch_changed_word(session):
+    update = session.patch(4, encode_word('addi $t0 $t0 -2').to_bytes(4, 'big'))
+    assert update == SessionUpdate([base + 4], [base + 8], [], [])
+    assert session.lines[1] == format_line(base + 4, encode_word('addi $t0 $t0 -2'))
+
+
+def test_patch_branch_target(session):
+    before = session.cfg
+    update = session.patch(8, encode_word('bne $zero $t0 0').to_bytes(4, 'big'))  # Now branches to the next word
+    assert update == SessionUpdate([base + 8], [], [base + 12], [base + 4])
+    assert session.labels == [base, base + 12]
+    assert session.cfg is before  # Updated in place
+    assert session.cfg.block_at(base + 4).start == base
+
+
+def test_unchanged_words_keep_derived_data(session):
+    cfg = session.cfg
+    session.buffer[16:20] = encode_word('sub $t0 $t1 $t2').to_bytes(4, 'big')
+    update = session.update([(0, 4), (16, 20)])  # The first word didn't really change
+    assert update == SessionUpdate([base + 16], [], [], [])
+    assert session.cfg is cfg  # Not a control flow instruction, so the blocks are the same
+
+
+def test_update_out_of_range(session):
+    with pytest.raises(ValueError):
+        session.update([(16, 24)])
+
+
+def test_patch_keeps_unaffected_blocks():
+    lines = ['addi $t0 $zero 10', 'addi $t0 $t0 -1', 'bne $zero $t0 -2', 'add $t0 $t1 $t2', 'jr $ra',
+             'addi $t1 $zero 1', 'j 0x00400014', 'add $t0 $t1 $t2']
+    session = DisassemblySession(bytearray(encode_many(lines)), base_address=base)
+    before = list(session.cfg.blocks)
+    session.cfg.successors(before[0])  # Build the edge indexes too, so they are updated
+    session.cfg.predecessors(before[0])
+    session.patch(8, encode_word('bne $zero $t0 0').to_bytes(4, 'big'))  # Now branches to the next word
+    cfg = session.cfg
+    assert cfg.blocks[-2] is before[-2] and cfg.blocks[-1] is before[-1]  # Past the jr, nothing changed
+    _assert_same_graph(cfg, ControlFlowGraph(session.words, base))
+
+
+@pytest.mark.parametrize("delay_slots", [False, True])
+def test_patches_match_rebuilt_graph(delay_slots):
+    rng = random.Random(0)
+    flows = ['beq $t0 $t1 {}', 'bgez $t0 {}', 'j 0x{:08x}', 'jal 0x{:08x}', 'jr $ra', 'jalr $t0', 'add $t0 $t1 $t2']
+    words = [encode_word('add $t0 $t1 $t2')] * 64
+    session = DisassemblySession(bytearray(struct.pack('>64I', *words)), base_address=base, delay_slots=delay_slots)
+    for _ in range(200):
+        index = rng.randrange(64)
+        line = rng.choice(flows)
+        operand = rng.randrange(-8, 8) if '{}' in line else base + 4 * rng.randrange(70)
+        session.cfg.predecessors(session.cfg.blocks[0])
+        session.patch(4 * index, encode_word(line.format(operand)).to_bytes(4, 'big'))
+        _assert_same_graph(session.cfg, ControlFlowGraph(session.words, base, delay_slots))
+
+
+def _assert_same_graph(cfg, expected):
+    assert cfg.blocks == expected.blocks
+    assert cfg.block_starts == expected.block_starts
+    assert cfg.edges == expected.edges
+    assert cfg.call_targets == expected.call_targets
+    for block in expected.blocks:
+        assert cfg.successors(block) == expected.successors(block)
+        assert sorted(cfg.predecessors(block)) == sorted(expected.predecessors(block))
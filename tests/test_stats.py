@@ -0,0 +1,56 @@
+import pytest
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from mdma.bench import generate_words
+from mdma.parallel import collect_stats_parallel
+from mdma.stats import InstructionStats, collect_stats
+
+requires_numpy = pytest.mark.skipif(np is None, reason='numpy is not installed')
+
+# add $t0 $t1 $t2, sll $zero $zero 0, addi $a0 $s3 -77, addi $a0 $s3 -77, j 0x00c40ab0, unknown op
+words = [0x012a4020, 0x00000000, 0x2264ffb3, 0x2264ffb3, 0x083102ac, 0xffffffff]
+# add.s $f0 $f0 $f2, bgezal $zero 12, mfc0 $v0 $12, lwc1 $f4 $sp -8
+isa_words = [0x46020000, 0x0411000c, 0x40026000, 0xc7a4fff8]
+
+
+@pytest.mark.parametrize("vectorized", [False, pytest.param(True, marks=requires_numpy)])
+def test_summary(vectorized):
+    summary = InstructionStats().update(words, vectorized).summary()
+    assert summary['count'] == 6
+    assert summary['formats'] == {'I': 2, 'R': 1, 'shift': 1, 'J': 1, '.word': 1}
+    assert summary['mnemonics'] == {'addi': 2, 'add': 1, 'sll': 1, 'j': 1, '.word': 1}
+    assert summary['registers'] == {'$a0': 2, '$s3': 2, '$zero': 2, '$t0': 1, '$t1': 1, '$t2': 1}
+    assert summary['immediates'] == {'-77': 2}
+
+
+@pytest.mark.parametrize("vectorized", [False, pytest.param(True, marks=requires_numpy)])
+def test_summary_of_isa_formats(vectorized):
+    summary = InstructionStats().update(isa_words, vectorized).summary()
+    assert summary['formats'] == {'fp_r': 1, 'regimm': 1, 'cop_move': 1, 'fp_memory': 1}
+    assert summary['mnemonics'] == {'add.s': 1, 'bgezal': 1, 'mfc0': 1, 'lwc1': 1}
+    assert summary['registers'] == {'$zero': 1, '$v0': 1, '$sp': 1}  # Floating point registers aren't counted
+    assert summary['immediates'] == {'12': 1, '-8': 1}
+
+
+@requires_numpy
+def test_vectorized_matches_counter():
+    sample = [w for name in ['R', 'I', 'J', 'shift'] for w in generate_words(name, 500)] + isa_words * 10
+    assert InstructionStats().update(sample, True) == InstructionStats().update(sample, False)
+
+
+def test_merge():
+    merged = InstructionStats().update(words[:2]).merge(InstructionStats().update(words[2:]))
+    assert merged == InstructionStats().update(words)
+    assert collect_stats([words[:3], words[3:]]) == merged
+    assert merged.summary(top=1)['mnemonics'] == {'addi': 2}
+
+
+def test_collect_stats_parallel(tmp_path):
+    path = tmp_path / 'words.bin'
+    path.write_bytes(b''.join(w.to_bytes(4, 'little') for w in words * 100) + b'\x01')
+    assert collect_stats_parallel(str(path), 'binary', 'little', workers=2, range_size=40) == \
+        collect_stats([words * 100])
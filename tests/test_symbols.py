@@ -0,0 +1,90 @@
+import io
+import struct
+
+import pytest
+
+from mdma.disassembler import disassemble_stream, format_line
+from mdma.parallel import decode_parallel
+from mdma.symbols import Symbol, SymbolTable, load_elf_symbols, load_symbol_map, load_symbols
+
+text_addr = 0x80001000
+# main: addi $t0 $zero 10; loop: addi $t0 $t0 -1; bne $t0 $zero loop; jal func; jr $ra; func: jr $ra
+words = [0x2008000a, 0x2108ffff, 0x1408fffe, 0x0c000405, 0x03e00008, 0x03e00008]
+symbols = [Symbol(text_addr, 'main', 20), Symbol(text_addr + 4, 'loop'), Symbol(text_addr + 20, 'func', 4)]
+
+
+def _elf_with_symbols(text: bytes, elf_symbols, byteorder: str = 'big') -> bytes:
+    """Builds a minimal 32-bit ELF file with a .text section and a .symtab of (name, value, size, type) symbols"""
+    prefix = '>' if byteorder == 'big' else '<'
+    names = b'\0.text\0.symtab\0.strtab\0.shstrtab\0'
+    strtab, symtab = b'\0', struct.pack(prefix + 'IIIBBH', 0, 0, 0, 0, 0, 0)
+    for name, value, size, symbol_type in elf_symbols:
+        symtab += struct.pack(prefix + 'IIIBBH', len(strtab), value, size, 0x10 | symbol_type, 0, 1)
+        strtab += name.encode() + b'\0'
+    symtab += struct.pack(prefix + 'IIIBBH', len(strtab), 0x1234, 0, 0x10, 0, 0)  # Undefined, so skipped
+    strtab += b'undefined\0'
+    text_offset = 52
+    symtab_offset = text_offset + len(text)
+    strtab_offset = symtab_offset + len(symtab)
+    names_offset = strtab_offset + len(strtab)
+    section_headers_offset = names_offset + len(names)
+    ident = b'\x7fELF' + bytes([1, 2 if byteorder == 'big' else 1, 1]) + bytes(9)
+    header = ident + struct.pack(prefix + 'HHIIIIIHHHHHH', 2, 8, 1, text_addr, 0, section_headers_offset, 0,
+                                 52, 0, 0, 40, 5, 4)
+    sections = [struct.pack(prefix + 'IIIIIIIIII', *[0] * 10),
+                struct.pack(prefix + 'IIIIIIIIII', 1, 1, 6, text_addr, text_offset, len(text), 0, 0, 4, 0),
+                struct.pack(prefix + 'IIIIIIIIII', 7, 2, 0, 0, symtab_offset, len(symtab), 3, 1, 4, 16),
+                struct.pack(prefix + 'IIIIIIIIII', 15, 3, 0, 0, strtab_offset, len(strtab), 0, 0, 1, 0),
+                struct.pack(prefix + 'IIIIIIIIII', 23, 3, 0, 0, names_offset, len(names), 0, 0, 1, 0)]
+    return header + text + symtab + strtab + names + b''.join(sections)
+
+
+@pytest.mark.parametrize("address, expected", [(text_addr, 'main'), (text_addr + 4, 'loop'),
+                                               (text_addr + 0x1c, '0x8000101c'),  # Past func's size
+                                               (text_addr + 16, 'loop+0xc'), (text_addr - 4, '0x80000ffc'),
+                                               (text_addr + 20, 'func')])
+def test_symbolize(address, expected):
+    assert SymbolTable(symbols).symbolize(address) == expected
+
+
+def test_lookup_large_table():
+    table = SymbolTable(Symbol(0x1000 * i, f'f{i}') for i in reversed(range(200000)))
+    assert table.lookup(0x1000 * 12345 + 0x1c) == (Symbol(0x1000 * 12345, 'f12345'), 0x1c)
+    assert table.at(0x1000 * 7) == Symbol(0x7000, 'f7') and table.at(0x7004) is None
+
+
+def test_disassemble_with_symbols():
+    data = b''.join(w.to_bytes(4, 'big') for w in words)
+    lines = [line for chunk in disassemble_stream(io.BufferedReader(io.BytesIO(data)), base_address=text_addr,
+                                                   chunk_size=8, symbols=SymbolTable(symbols)) for line in chunk]
+    assert lines == ['<main>:',
+                     '80001000:  2008000a  addi $t0 $zero 10',
+                     '<loop>:',
+                     '80001004:  2108ffff  addi $t0 $t0 -1',
+                     '80001008:  1408fffe  bne $t0 $zero loop',
+                     '8000100c:  0c000405  jal func',  # Upper bits of the target come from the PC
+                     '80001010:  03e00008  jr $zero $ra $zero',
+                     '<func>:',
+                     '80001014:  03e00008  jr $zero $ra $zero']
+    assert format_line(text_addr + 12, words[3]) == '8000100c:  0c000405  jal 0x80001014'
+    assert list(decode_parallel(data, workers=2, base_address=text_addr, range_size=8,
+                                symbols=SymbolTable(symbols))) == [lines[:4], lines[4:6], lines[6:]]
+
+
+@pytest.mark.parametrize('byteorder', ['big', 'little'])
+def test_load_elf_symbols(byteorder, tmp_path):
+    text = b''.join(w.to_bytes(4, byteorder) for w in words)
+    data = _elf_with_symbols(text, [('loop', text_addr + 4, 0, 0), ('main', text_addr, 20, 2),
+                                    ('main_data', text_addr, 4, 1), ('func', text_addr + 20, 4, 2)], byteorder)
+    assert load_elf_symbols(io.BytesIO(data)).symbols == symbols  # Functions are kept over objects
+    path = tmp_path / 'program.elf'
+    path.write_bytes(data)
+    assert load_symbols(str(path)).symbols == symbols
+
+
+def test_load_symbol_map(tmp_path):
+    lines = ['80001000 00000014 T main', '80001004 t loop', '         U printf', '80001014 00000004 T func', '']
+    assert load_symbol_map(lines).symbols == symbols
+    path = tmp_path / 'program.map'
+    path.write_text('\n'.join(lines))
+    assert load_symbols(str(path)).symbols == symbols
@@ -0,0 +1,28 @@
+import mdma.verify
+from mdma.verify import verify_round_trip, operation_words, space_size
+
+
+def test_verify_sampled():
+    report = verify_round_trip(samples=50, reference=True)
+    assert report.checked > 0
+    assert report.mismatch_count == 0
+
+
+def test_verify_exhaustive_shift():
+    assert space_size('sll') == 30 * 30 * 32
+    report = verify_round_trip(exhaustive=True, mnemonics=['sll'], batch_size=5000)
+    assert report.checked == space_size('sll')
+    assert report.mismatch_count == 0
+    assert len(set(operation_words('sll', 0, 100))) == 100
+
+
+def test_verify_parallel_matches_serial():
+    assert verify_round_trip(samples=20, workers=2) == verify_round_trip(samples=20)
+
+
+def test_verify_reports_mismatches(monkeypatch):
+    monkeypatch.setattr(mdma.verify, 'encode_word', lambda instruction_str: 0)
+    report = verify_round_trip(samples=10, mnemonics=['add', 'j'], max_mismatches=3)
+    assert report.mismatch_count == 20
+    assert len(report.mismatches) == 3
+    assert report.mismatches[0].reencoded == 0